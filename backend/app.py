@@ -6,8 +6,18 @@ from routes.chat import chat_bp
 from routes.knowledge import knowledge_bp
 from routes.agent import agent_bp
 from routes.voice import voice_bp
+from routes.profiling import profiling_bp
+from routes.tracing import tracing_bp
 from middleware.error_handler import handle_error
 from middleware.rate_limiter import limiter
+from middleware.metrics import metrics
+from middleware.server_timing import server_timing
+from middleware.compression import compression
+from middleware.profiler import profiling
+from middleware.tracing import tracer
+from middleware.deadline import deadline
+from middleware.admission import admission
+from middleware.json_provider import json_provider_class
 
 load_dotenv()
 
@@ -16,14 +26,32 @@ app = Flask(__name__, static_folder='../frontend/build', static_url_path='')
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 
+app.json = json_provider_class()(app)
+
 CORS(app, supports_credentials=True)
 
+tracer.init_app(app)
+
+deadline.init_app(app)
+
+compression.init_app(app)
+
+server_timing.init_app(app)
+
+admission.init_app(app)
+
 limiter.init_app(app)
 
+metrics.init_app(app)
+
+profiling.init_app(app)
+
 app.register_blueprint(chat_bp, url_prefix='/api/chat')
 app.register_blueprint(knowledge_bp, url_prefix='/api/knowledge')
 app.register_blueprint(agent_bp, url_prefix='/api/agent')
 app.register_blueprint(voice_bp, url_prefix='/api/voice')
+app.register_blueprint(profiling_bp, url_prefix='/api/profiling')
+app.register_blueprint(tracing_bp, url_prefix='/api/tracing')
 
 @app.route('/')
 def serve_react_app():
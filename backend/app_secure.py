@@ -8,12 +8,22 @@ from routes.chat import chat_bp
 from routes.knowledge import knowledge_bp
 from routes.agent import agent_bp
 from routes.voice import voice_bp
+from routes.profiling import profiling_bp
+from routes.tracing import tracing_bp
 from routes.security import security_bp
 from middleware.error_handler import handle_error
 from middleware.rate_limiter import limiter
+from middleware.metrics import metrics
+from middleware.server_timing import server_timing
+from middleware.compression import compression
+from middleware.profiler import profiling
+from middleware.tracing import tracer
+from middleware.deadline import deadline
+from middleware.admission import admission
+from middleware.json_provider import json_provider_class
 from middleware.security_middleware import SecurityMiddleware
+from middleware.async_logging import log_writer, json_file_handler, attach_security_events_log
 import logging
-from logging.handlers import RotatingFileHandler
 import secrets
 
 load_dotenv()
@@ -26,6 +36,9 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', secrets.token_hex(32))
 app.config['FORCE_HTTPS'] = os.getenv('FORCE_HTTPS', 'false').lower() == 'true'
 app.config['SECURE_COOKIES'] = os.getenv('SECURE_COOKIES', 'false').lower() == 'true'
 
+# jsonify() and request.get_json() use orjson when it is installed (JSON_PROVIDER)
+app.json = json_provider_class()(app)
+
 # Enhanced CORS configuration
 allowed_origins = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 cors_credentials = os.getenv('CORS_CREDENTIALS', 'true').lower() == 'true'
@@ -65,29 +78,42 @@ if os.getenv('CSP_ENABLED', 'true').lower() == 'true':
                  'payment': ['none']
              })
 
+# Distributed tracing (registered first so the server span covers every hook)
+tracer.init_app(app)
+
+# Time budget for upstream calls, from nginx's X-Request-Timeout-Ms
+deadline.init_app(app)
+
+# gzip/brotli for large buffered responses (registered before server_timing so
+# its after_request hook sees the final body)
+compression.init_app(app)
+
+# Per-request phase timing (registered early so `total` covers the other hooks)
+server_timing.init_app(app)
+
 # Initialize security middleware
 security_middleware = SecurityMiddleware()
-app.before_request(security_middleware.before_request)
+app.before_request(tracer.traced('security')(server_timing.timed('security')(security_middleware.before_request)))
 app.after_request(security_middleware.after_request)
 
+# Per route class in-flight budgets; sheds excess with 503 + Retry-After
+admission.init_app(app)
+
 # Enhanced rate limiting
 limiter.init_app(app)
 
-# Security logging
+# Prometheus metrics (/metrics)
+metrics.init_app(app)
+
+# Opt-in sampling profiler for hot request paths
+profiling.init_app(app)
+
+# Security events are always recorded (JSON lines, written off the request path by a background thread)
+attach_security_events_log()
+
+# Optional application security log
 if os.getenv('SECURITY_LOGGING', 'false').lower() == 'true':
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    file_handler = RotatingFileHandler(
-        'logs/security.log', 
-        maxBytes=10240000, 
-        backupCount=10
-    )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
+    app.logger.addHandler(log_writer.attach(json_file_handler('logs/security.log')))
     app.logger.setLevel(logging.INFO)
 
 # Register blueprints
@@ -96,6 +122,8 @@ app.register_blueprint(knowledge_bp, url_prefix='/api/knowledge')
 app.register_blueprint(agent_bp, url_prefix='/api/agent')
 app.register_blueprint(voice_bp, url_prefix='/api/voice')
 app.register_blueprint(security_bp, url_prefix='/api/security')
+app.register_blueprint(profiling_bp, url_prefix='/api/profiling')
+app.register_blueprint(tracing_bp, url_prefix='/api/tracing')
 
 @app.route('/')
 def serve_react_app():
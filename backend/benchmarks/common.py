@@ -0,0 +1,112 @@
+"""Shared helpers for the benchmark scripts: percentiles, RSS sampling and baseline files."""
+
+import os
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(values: List[float]) -> Dict:
+    """p50/p95/p99/mean/max summary of a list of samples"""
+    ordered = sorted(values)
+    if not ordered:
+        return {'count': 0, 'p50': 0, 'p95': 0, 'p99': 0, 'mean': 0, 'max': 0}
+    return {
+        'count': len(ordered),
+        'p50': round(percentile(ordered, 50), 3),
+        'p95': round(percentile(ordered, 95), 3),
+        'p99': round(percentile(ordered, 99), 3),
+        'mean': round(sum(ordered) / len(ordered), 3),
+        'max': round(ordered[-1], 3)
+    }
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB, read from /proc (Linux only)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024.0, 2)
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def child_pids(parent_pid: int) -> List[int]:
+    """PIDs whose parent is `parent_pid` (e.g. gunicorn workers of a master)"""
+    children = []
+    if not os.path.isdir('/proc'):
+        return children
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[1]) == parent_pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def current_rss_mb() -> float:
+    """RSS of the current process in MB"""
+    rss = read_rss_mb(os.getpid())
+    if rss is not None:
+        return rss
+    import resource
+    # ru_maxrss is a peak value (KB on Linux, bytes on macOS); good enough as a fallback
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 2)
+
+
+def environment_info() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def write_results(results: Dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"📄 Results written to {path}")
+
+
+def load_results(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_metric(name: str, current: float, baseline: float, tolerance: float, higher_is_better: bool = False) -> Optional[str]:
+    """Return a regression message if `current` is worse than `baseline` beyond `tolerance`"""
+    if not baseline:
+        return None
+    change = (current - baseline) / baseline
+    regressed = change < -tolerance if higher_is_better else change > tolerance
+    if regressed:
+        return f"{name}: {baseline} -> {current} ({change:+.1%})"
+    return None
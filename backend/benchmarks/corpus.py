@@ -0,0 +1,94 @@
+"""Synthetic technical-English corpus generator for benchmarking FileProcessor."""
+
+import os
+import random
+from typing import Iterator, List, Tuple
+
+TOPIC_TERMS = {
+    'ai': [
+        'neural', 'network', 'training', 'inference', 'gradient', 'dataset', 'model', 'transformer',
+        'embedding', 'classifier', 'overfitting', 'regularization', 'tokenizer', 'attention', 'backpropagation'
+    ],
+    'iot': [
+        'sensor', 'gateway', 'firmware', 'microcontroller', 'bluetooth', 'protocol', 'telemetry', 'edge',
+        'actuator', 'bandwidth', 'latency', 'mqtt', 'zigbee', 'provisioning', 'battery'
+    ],
+    'chips': [
+        'semiconductor', 'transistor', 'wafer', 'lithography', 'silicon', 'cache', 'pipeline', 'register',
+        'fabrication', 'doping', 'substrate', 'photomask', 'yield', 'packaging', 'interconnect'
+    ],
+}
+
+GENERAL_WORDS = [
+    'students', 'teacher', 'lesson', 'explain', 'example', 'system', 'design', 'process', 'signal',
+    'energy', 'memory', 'speed', 'device', 'data', 'software', 'hardware', 'control', 'measure',
+    'vocabulary', 'grammar', 'sentence', 'practice', 'exercise', 'diagram', 'describe', 'compare'
+]
+
+TEMPLATES = [
+    "The {a} sends {b} data to the {c} every second.",
+    "Students should explain how a {a} differs from a {b}.",
+    "In this lesson we compare {a}, {b} and {c} using simple English.",
+    "A {a} can reduce {b} when the {c} is designed carefully.",
+    "Teachers often describe the {a} as the heart of the {b}.",
+    "Write three sentences about {a} and {b} for the vocabulary exercise.",
+    "The {a} stage happens before the {b} stage in most {c} systems.",
+    "Ask the class why {a} matters for {b} performance.",
+]
+
+
+class CorpusGenerator:
+    """Deterministic generator of technical-English teaching documents"""
+
+    def __init__(self, seed: int = 42, min_words: int = 200, max_words: int = 2000):
+        self.rng = random.Random(seed)
+        self.min_words = min_words
+        self.max_words = max_words
+        self.topics = list(TOPIC_TERMS)
+
+    def document(self) -> Tuple[str, str]:
+        """Return (topic, text) for one document"""
+        topic = self.rng.choice(self.topics)
+        terms = TOPIC_TERMS[topic]
+        # Mostly on-topic words with some general vocabulary mixed in
+        pool = terms * 3 + GENERAL_WORDS
+        target = self.rng.randint(self.min_words, self.max_words)
+
+        sentences = [f"{topic.upper()} teaching notes: {' '.join(self.rng.sample(terms, 3))}."]
+        words = len(sentences[0].split())
+        while words < target:
+            template = self.rng.choice(TEMPLATES)
+            sentence = template.format(
+                a=self.rng.choice(pool), b=self.rng.choice(pool), c=self.rng.choice(pool)
+            )
+            sentences.append(sentence)
+            words += len(sentence.split())
+        return topic, " ".join(sentences)
+
+    def documents(self, count: int) -> Iterator[Tuple[str, str]]:
+        for _ in range(count):
+            yield self.document()
+
+    def queries(self, count: int, words_per_query: int = 3) -> List[str]:
+        """Search queries in the style teachers type into the agent chat"""
+        queries = []
+        for _ in range(count):
+            terms = TOPIC_TERMS[self.rng.choice(self.topics)]
+            picked = self.rng.sample(terms, min(words_per_query, len(terms)))
+            queries.append(f"How do I explain {' and '.join(picked)} to my students?")
+        return queries
+
+    def keyword_sets(self, count: int, size: int = 2) -> List[List[str]]:
+        """Keyword lists for /api/agent/files/search style lookups"""
+        return [self.rng.sample(TOPIC_TERMS[self.rng.choice(self.topics)], size) for _ in range(count)]
+
+    def write_corpus(self, directory: str, count: int) -> List[Tuple[str, str]]:
+        """Write `count` .txt documents into `directory`, returning (file_path, original_filename) pairs"""
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for i, (topic, text) in enumerate(self.documents(count)):
+            filename = f"{i:06d}_{topic}_notes.txt"
+            with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+                f.write(text)
+            files.append((filename, filename))
+        return files
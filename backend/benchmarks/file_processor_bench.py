@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for FileProcessor on synthetic corpora.
+
+Times ingestion (process_file), keyword extraction, keyword search and
+agent context assembly for each corpus size, and records memory growth
+of the in-memory index.
+
+    python -m benchmarks.file_processor_bench --sizes 10,100,1000,10000 \\
+        --output benchmarks/results/file_processor.json
+
+    python -m benchmarks.file_processor_bench --baseline benchmarks/results/file_processor.json
+
+Exits with status 1 when a stage regresses beyond --tolerance.
+"""
+
+import gc
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+from benchmarks.common import (
+    summarize, current_rss_mb, environment_info,
+    write_results, load_results, compare_metric
+)
+from benchmarks.corpus import CorpusGenerator
+from services.file_processor import FileProcessor
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def bench_size(size, args):
+    generator = CorpusGenerator(seed=args.seed, min_words=args.min_words, max_words=args.max_words)
+    corpus_dir = tempfile.mkdtemp(prefix=f'veron_corpus_{size}_')
+    try:
+        files = generator.write_corpus(corpus_dir, size)
+        queries = generator.queries(args.queries)
+        keyword_sets = generator.keyword_sets(args.queries)
+        processor = FileProcessor(upload_dir=corpus_dir)
+
+        gc.collect()
+        rss_before = current_rss_mb()
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        ingest_ms = []
+        started = time.perf_counter()
+        for file_path, original_filename in files:
+            elapsed, _ = timed(processor.process_file, file_path, original_filename)
+            ingest_ms.append(elapsed)
+        ingest_wall = time.perf_counter() - started
+
+        traced_mb = None
+        if args.tracemalloc:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            traced_mb = {'current': round(current / 1048576, 2), 'peak': round(peak / 1048576, 2)}
+        gc.collect()
+        rss_after = current_rss_mb()
+
+        texts = [f['extracted_text'] for f in processor.get_all_processed_files()[:args.keyword_samples]]
+        keyword_ms = [timed(processor._extract_keywords, text)[0] for text in texts]
+
+        search_ms = [timed(processor.get_files_by_keywords, keywords)[0] for keywords in keyword_sets]
+        context_ms = [timed(processor.get_context_for_agent, query)[0] for query in queries]
+
+        total_bytes = sum(f['file_size'] for f in processor.get_all_processed_files())
+        return {
+            'documents': size,
+            'total_bytes': total_bytes,
+            'ingest': {
+                'per_doc_ms': summarize(ingest_ms),
+                'docs_per_s': round(size / ingest_wall, 2) if ingest_wall else 0,
+                'mb_per_s': round(total_bytes / 1048576 / ingest_wall, 3) if ingest_wall else 0
+            },
+            'extract_keywords_ms': summarize(keyword_ms),
+            'search_ms': summarize(search_ms),
+            'context_ms': summarize(context_ms),
+            'memory': {
+                'rss_growth_mb': round(rss_after - rss_before, 2),
+                'rss_mb': rss_after,
+                'traced_mb': traced_mb
+            }
+        }
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+def check_regressions(results, baseline, tolerance):
+    regressions = []
+    for size, current in results['sizes'].items():
+        previous = baseline.get('sizes', {}).get(size)
+        if not previous:
+            continue
+        checks = [
+            compare_metric(f'{size} docs ingest docs/s', current['ingest']['docs_per_s'],
+                           previous['ingest']['docs_per_s'], tolerance, higher_is_better=True),
+            compare_metric(f'{size} docs extract_keywords p95 ms', current['extract_keywords_ms']['p95'],
+                           previous['extract_keywords_ms']['p95'], tolerance),
+            compare_metric(f'{size} docs search p95 ms', current['search_ms']['p95'], previous['search_ms']['p95'], tolerance),
+            compare_metric(f'{size} docs context p95 ms', current['context_ms']['p95'], previous['context_ms']['p95'], tolerance),
+            compare_metric(f'{size} docs rss growth mb', current['memory']['rss_growth_mb'],
+                           previous['memory']['rss_growth_mb'], tolerance),
+        ]
+        regressions.extend(c for c in checks if c)
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'docs':>7} {'ingest/s':>9} {'kw p95':>8} {'search p95':>11} {'context p95':>12} {'rss +MB':>8}")
+    for size, r in results['sizes'].items():
+        print(f"{size:>7} {r['ingest']['docs_per_s']:>9} {r['extract_keywords_ms']['p95']:>8} "
+              f"{r['search_ms']['p95']:>11} {r['context_ms']['p95']:>12} {r['memory']['rss_growth_mb']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FileProcessor micro-benchmarks')
+    parser.add_argument('--sizes', default='10,100,1000', help='Comma separated corpus sizes (up to 100000)')
+    parser.add_argument('--min-words', type=int, default=200)
+    parser.add_argument('--max-words', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--keyword-samples', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tracemalloc', action='store_true', help='Also trace Python allocations (slower)')
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    results = {
+        'meta': dict(environment_info(), seed=args.seed, min_words=args.min_words,
+                     max_words=args.max_words, queries=args.queries),
+        'sizes': {}
+    }
+    for size in sizes:
+        print(f"🔧 Benchmarking FileProcessor with {size} documents...")
+        results['sizes'][str(size)] = bench_size(size, args)
+
+    print_report(results)
+    if args.output:
+        write_results(results, args.output)
+
+    if args.baseline:
+        regressions = check_regressions(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
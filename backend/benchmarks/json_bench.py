@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the Flask JSON providers on Veron's payload shapes.
+
+Builds real FileProcessor output from a synthetic corpus (file details with
+the full extracted_text, the file list), Bedrock Agent trace captures and
+chat request bodies, then times response encoding (what jsonify() does)
+and request parsing (what request.get_json() does) with each provider.
+
+    python -m benchmarks.json_bench --iterations 500 --output json.json
+    python -m benchmarks.json_bench --baseline json.json
+
+Exits with status 1 when a provider regresses beyond --tolerance.
+"""
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+from flask import Flask
+
+from benchmarks.common import summarize, environment_info, write_results, load_results, compare_metric
+from benchmarks.corpus import CorpusGenerator
+from middleware.json_provider import PROVIDERS, ORJSON_AVAILABLE
+from services.file_processor import FileProcessor
+
+
+def file_payloads(generator, files, words):
+    """(details, list) response bodies from FileProcessor output"""
+    corpus_dir = tempfile.mkdtemp(prefix='veron_json_bench_')
+    try:
+        generator.min_words = generator.max_words = words
+        processor = FileProcessor(upload_dir=corpus_dir)
+        for file_path, original_filename in generator.write_corpus(corpus_dir, files):
+            processor.process_file(file_path, original_filename)
+        processed = processor.get_all_processed_files()
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    details = {'success': True, 'data': {'file': processed[0]}}
+    # Same fields as GET /api/agent/files
+    listed = [{
+        'id': f['id'],
+        'original_filename': f['original_filename'],
+        'file_size': f['file_size'],
+        'file_type': f['file_type'],
+        'processed_at': f['processed_at'],
+        'word_count': f['word_count'],
+        'text_length': f['text_length'],
+        'keywords': f['keywords'][:10],
+        'summary': f['summary'][:300]
+    } for f in processed]
+    file_list = {'success': True, 'data': {
+        'files': listed,
+        'total_files': len(listed),
+        'total_size': sum(f['file_size'] for f in listed),
+        'total_words': sum(f['word_count'] for f in listed)
+    }}
+    return details, file_list
+
+
+def trace_payload(generator, captures, events):
+    """GET /api/agent/session/<id>/traces with Bedrock Agent orchestration traces"""
+    queries = generator.queries(captures * events)
+    _, text = generator.document()
+    capture_list = []
+    for c in range(captures):
+        trace_events = []
+        for e in range(events):
+            trace_id = f'{c:04d}-{e:04d}-0000-0000-000000000000'
+            trace_events.append({'orchestrationTrace': {
+                'modelInvocationInput': {'traceId': trace_id, 'type': 'ORCHESTRATION', 'text': text[:4000]},
+                'rationale': {'traceId': trace_id, 'text': queries[c * events + e]},
+                'observation': {'traceId': trace_id, 'type': 'FINISH',
+                                'finalResponse': {'text': text[:800]}}
+            }})
+        capture_list.append({'timestamp': '2024-01-01T00:00:00', 'event_count': events, 'events': trace_events})
+    return {'success': True, 'data': {'session_id': 'bench', 'captures': capture_list}}
+
+
+def chat_request(generator, turns):
+    """POST /api/chat/message body with conversation history"""
+    queries = generator.queries(turns + 1)
+    history = []
+    for query in queries[:turns]:
+        history.append({'role': 'user', 'content': query})
+        history.append({'role': 'assistant', 'content': generator.document()[1][:1500]})
+    return {'message': queries[-1], 'conversationHistory': history, 'context': ''}
+
+
+def timed_us(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return summarize(samples)
+
+
+def bench_provider(name, payloads, iterations):
+    app = Flask(__name__)
+    provider = PROVIDERS[name](app)
+    results = {}
+    with app.app_context():
+        for payload_name, payload in payloads.items():
+            body = provider.response(payload).get_data()
+            results[payload_name] = {
+                'bytes': len(body),
+                'encode_us': timed_us(lambda: provider.response(payload).get_data(), iterations),
+                'decode_us': timed_us(lambda: provider.loads(body), iterations)
+            }
+    return results
+
+
+def check_regressions(results, baseline, tolerance):
+    regressions = []
+    for provider, payloads in results['providers'].items():
+        for payload_name, current in payloads.items():
+            previous = baseline.get('providers', {}).get(provider, {}).get(payload_name)
+            if not previous:
+                continue
+            for op in ('encode_us', 'decode_us'):
+                regression = compare_metric(f'{provider} {payload_name} {op} p50', current[op]['p50'],
+                                            previous[op]['p50'], tolerance)
+                if regression:
+                    regressions.append(regression)
+    return regressions
+
+
+def print_report(results):
+    providers = list(results['providers'])
+    print(f"\n{'payload':>12} {'KB':>8} " + ' '.join(f"{p + ' enc':>12} {p + ' dec':>12}" for p in providers))
+    first = results['providers'][providers[0]]
+    for payload_name in first:
+        row = f"{payload_name:>12} {first[payload_name]['bytes'] / 1024:>8.1f} "
+        row += ' '.join(
+            f"{results['providers'][p][payload_name]['encode_us']['p50']:>12} "
+            f"{results['providers'][p][payload_name]['decode_us']['p50']:>12}"
+            for p in providers
+        )
+        print(row)
+    print('(p50 microseconds)')
+    if 'stdlib' in results['providers'] and 'orjson' in results['providers']:
+        print()
+        for payload_name in first:
+            stdlib = results['providers']['stdlib'][payload_name]
+            fast = results['providers']['orjson'][payload_name]
+            print(f"{payload_name:>12} encode x{stdlib['encode_us']['p50'] / max(fast['encode_us']['p50'], 0.001):.1f}"
+                  f"  decode x{stdlib['decode_us']['p50'] / max(fast['decode_us']['p50'], 0.001):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON provider micro-benchmarks')
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--files', type=int, default=200, help='Files in the file list payload')
+    parser.add_argument('--words', type=int, default=20000, help='Words in the file details extracted_text')
+    parser.add_argument('--captures', type=int, default=20, help='Trace captures in the traces payload')
+    parser.add_argument('--events', type=int, default=8, help='Trace events per capture')
+    parser.add_argument('--turns', type=int, default=10, help='History turns in the chat request')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(seed=args.seed)
+    print("🔧 Building payloads...")
+    details, file_list = file_payloads(CorpusGenerator(seed=args.seed), args.files, args.words)
+    payloads = {
+        'file_details': details,
+        'file_list': file_list,
+        'traces': trace_payload(generator, args.captures, args.events),
+        'chat_request': chat_request(generator, args.turns)
+    }
+
+    providers = ['stdlib', 'orjson'] if ORJSON_AVAILABLE else ['stdlib']
+    if not ORJSON_AVAILABLE:
+        print("⚠️  orjson is not installed; only the stdlib provider is measured")
+    results = {
+        'meta': dict(environment_info(), seed=args.seed, iterations=args.iterations),
+        'providers': {}
+    }
+    for name in providers:
+        print(f"🔧 Benchmarking {name} provider...")
+        results['providers'][name] = bench_provider(name, payloads, args.iterations)
+
+    print_report(results)
+    if args.output:
+        write_results(results, args.output)
+
+    if args.baseline:
+        regressions = check_regressions(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+End-to-end load and latency benchmark for the backend API.
+
+Drives /api/chat/message, /api/agent/chat, /api/agent/upload and
+/api/voice/tts at a fixed concurrency and reports p50/p95/p99 latency,
+time-to-first-byte, requests per second and gunicorn worker RSS.
+
+With --spawn the script starts the upstream emulator and a gunicorn
+server pointed at it, so runs are reproducible and cost nothing:
+
+    python -m benchmarks.load_test --spawn --concurrency 16 --requests 400 \\
+        --save-baseline benchmarks/baselines/load.json
+
+    python -m benchmarks.load_test --spawn --baseline benchmarks/baselines/load.json
+
+Exits with status 1 when a scenario regresses beyond --tolerance.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import functools
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import (
+    summarize, read_rss_mb, child_pids, environment_info,
+    write_results, load_results, compare_metric
+)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHAT_PROMPTS = [
+    "What does IoT stand for?",
+    "How can I explain neural networks to beginner students?",
+    "Give me five vocabulary words about semiconductor fabrication with example sentences.",
+    "Create a short speaking activity about edge computing for intermediate learners.",
+]
+
+UPLOAD_TEXT = """Edge devices collect sensor data and send it to a gateway.
+The gateway filters the data before forwarding it to the cloud.
+Students should learn words like latency, bandwidth, firmware and microcontroller.
+"""
+
+
+def chat_scenario(session, base_url, state, i):
+    body = {'message': CHAT_PROMPTS[i % len(CHAT_PROMPTS)]}
+    if state.get('conversation_id'):
+        body['conversationId'] = state['conversation_id']
+    response = session.post(f'{base_url}/api/chat/message', json=body, stream=True)
+    return response, lambda data: state.update(conversation_id=(data.get('data') or {}).get('conversationId'))
+
+
+def agent_scenario(session, base_url, state, i):
+    body = {'message': CHAT_PROMPTS[i % len(CHAT_PROMPTS)]}
+    if state.get('session_id'):
+        body['session_id'] = state['session_id']
+    response = session.post(f'{base_url}/api/agent/chat', json=body, stream=True)
+    return response, lambda data: state.update(session_id=(data.get('data') or {}).get('session_id'))
+
+
+def upload_scenario(session, base_url, state, i):
+    # Unique content per request so every upload is ingested rather than deduplicated
+    content = f"Benchmark document {uuid.uuid4()}\n{UPLOAD_TEXT * (1 + i % 20)}"
+    files = {'file': (f'bench_{i}.txt', content.encode('utf-8'), 'text/plain')}
+    response = session.post(f'{base_url}/api/agent/upload', files=files, stream=True)
+    return response, None
+
+
+def tts_scenario(session, base_url, state, i):
+    body = {'text': CHAT_PROMPTS[i % len(CHAT_PROMPTS)]}
+    response = session.post(f'{base_url}/api/voice/tts', json=body, stream=True)
+    return response, None
+
+
+SCENARIOS = {
+    'chat': chat_scenario,
+    'agent': agent_scenario,
+    'upload': upload_scenario,
+    'tts': tts_scenario,
+}
+
+
+class RssSampler(threading.Thread):
+    """Samples RSS of the server's worker processes in the background"""
+
+    def __init__(self, pids_fn, interval=0.25):
+        super().__init__(daemon=True)
+        self.pids_fn = pids_fn
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def snapshot(self):
+        values = [read_rss_mb(pid) for pid in self.pids_fn()]
+        return [v for v in values if v is not None]
+
+    def run(self):
+        while not self._stop_event.is_set():
+            values = self.snapshot()
+            if values:
+                self.samples.append(sum(values))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_scenario(name, base_url, concurrency, total_requests, timeout):
+    scenario = SCENARIOS[name]
+    latencies, ttfbs, status_codes = [], [], {}
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+    counter_lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        session = requests.Session()
+        session.request = functools.partial(session.request, timeout=timeout)
+        state = {}
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            try:
+                response, on_json = scenario(session, base_url, state, i)
+                # requests returns once the headers arrive when stream=True
+                ttfb = time.perf_counter() - started
+                content = response.content
+                elapsed = time.perf_counter() - started
+                if on_json and response.ok:
+                    on_json(json.loads(content))
+                code = response.status_code
+            except (requests.RequestException, ValueError):
+                ttfb = elapsed = time.perf_counter() - started
+                code = 'exception'
+            with lock:
+                status_codes[str(code)] = status_codes.get(str(code), 0) + 1
+                if code == 'exception' or code >= 400:
+                    errors += 1
+                else:
+                    latencies.append(elapsed * 1000)
+                    ttfbs.append(ttfb * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'errors': errors,
+        'status_codes': status_codes,
+        'duration_s': round(wall, 3),
+        'rps': round((total_requests - errors) / wall, 2) if wall else 0,
+        'latency_ms': summarize(latencies),
+        'ttfb_ms': summarize(ttfbs)
+    }
+
+
+def wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def spawn_stack(args):
+    """Start the emulator and a gunicorn server pointed at it"""
+    emulator_url = f'http://127.0.0.1:{args.emulator_port}'
+    emulator_cmd = [sys.executable, '-m', 'emulator.server', '--port', str(args.emulator_port), '--seed', str(args.seed)]
+    if args.emulator_config:
+        emulator_cmd += ['--config', os.path.abspath(args.emulator_config)]
+    emulator = subprocess.Popen(emulator_cmd, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for(f'{emulator_url}/_emulator/config'):
+        emulator.terminate()
+        raise RuntimeError('Emulator did not start')
+
+    env = dict(os.environ)
+    env.update({
+        'BEDROCK_ENDPOINT_URL': emulator_url,
+        'BEDROCK_AGENT_ENDPOINT_URL': emulator_url,
+        'ELEVENLABS_API_URL': emulator_url,
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'ELEVENLABS_API_KEY': 'benchmark',
+        'BEDROCK_MODEL_ID': env.get('BEDROCK_MODEL_ID') or 'anthropic.claude-3-haiku-20240307-v1:0',
+        'BEDROCK_AGENT_ID': env.get('BEDROCK_AGENT_ID') or 'BENCHAGENT',
+        'BEDROCK_AGENT_ALIAS_ID': env.get('BEDROCK_AGENT_ALIAS_ID') or 'BENCHALIAS',
+        # The benchmark hammers a single client IP; keep the limiters out of the way
+        'RATE_LIMIT_MAX_REQUESTS': '100000000',
+        'MAX_REQUESTS_PER_IP': '100000000',
+        'NODE_ENV': 'production'
+    })
+    server = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '-k', 'gthread',
+        '--threads', str(args.threads), '-b', f'127.0.0.1:{args.port}', args.app
+    ], cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for(f'http://127.0.0.1:{args.port}/api/chat/health'):
+        server.terminate()
+        emulator.terminate()
+        raise RuntimeError('Backend did not start')
+    return emulator, server
+
+
+def check_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        checks = [
+            compare_metric(f'{name} p95 latency ms', current['latency_ms']['p95'], previous['latency_ms']['p95'], tolerance),
+            compare_metric(f'{name} p99 latency ms', current['latency_ms']['p99'], previous['latency_ms']['p99'], tolerance),
+            compare_metric(f'{name} p95 ttfb ms', current['ttfb_ms']['p95'], previous['ttfb_ms']['p95'], tolerance),
+            compare_metric(f'{name} rps', current['rps'], previous['rps'], tolerance, higher_is_better=True),
+        ]
+        regressions.extend(c for c in checks if c)
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'scenario':<8} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'ttfb95':>8} {'errors':>7}")
+    for name, r in results['scenarios'].items():
+        lat = r['latency_ms']
+        print(f"{name:<8} {r['rps']:>8} {lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8} {r['ttfb_ms']['p95']:>8} {r['errors']:>7}")
+    workers = results.get('workers') or {}
+    if workers.get('rss_mb_peak'):
+        print(f"\nWorker RSS: {workers['rss_mb_start']} MB start, {workers['rss_mb_end']} MB end, {workers['rss_mb_peak']} MB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end API load benchmark')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--scenarios', default='chat,agent,upload,tts')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--worker-pids', default='', help='Comma separated PIDs to sample RSS from (when not spawning)')
+    parser.add_argument('--spawn', action='store_true', help='Start the emulator and a gunicorn server')
+    parser.add_argument('--app', default='app:app')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--emulator-port', type=int, default=5055)
+    parser.add_argument('--emulator-config', default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='Write results JSON here')
+    parser.add_argument('--save-baseline', default=None, help='Write results JSON as the new baseline')
+    parser.add_argument('--baseline', default=None, help='Compare against this baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression')
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    processes = []
+    base_url = args.base_url
+    if args.spawn:
+        processes = list(spawn_stack(args))
+        base_url = f'http://127.0.0.1:{args.port}'
+        server_pid = processes[1].pid
+        pids_fn = lambda: child_pids(server_pid)
+    else:
+        pids = [int(p) for p in args.worker_pids.split(',') if p.strip()]
+        pids_fn = lambda: pids
+
+    try:
+        sampler = RssSampler(pids_fn)
+        rss_start = sum(sampler.snapshot())
+        sampler.start()
+
+        results = {
+            'meta': dict(environment_info(), base_url=base_url, concurrency=args.concurrency,
+                         requests=args.requests, spawned=args.spawn, seed=args.seed,
+                         workers=args.workers if args.spawn else None),
+            'scenarios': {}
+        }
+        for name in scenarios:
+            print(f"🔧 Running {name}: {args.requests} requests at concurrency {args.concurrency}")
+            if args.warmup:
+                run_scenario(name, base_url, min(args.concurrency, args.warmup), args.warmup, args.timeout)
+            results['scenarios'][name] = run_scenario(name, base_url, args.concurrency, args.requests, args.timeout)
+
+        sampler.stop()
+        results['workers'] = {
+            'rss_mb_start': round(rss_start, 2),
+            'rss_mb_end': round(sum(sampler.snapshot()), 2),
+            'rss_mb_peak': round(max(sampler.samples), 2) if sampler.samples else 0
+        }
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+
+    print_report(results)
+    if args.output:
+        write_results(results, args.output)
+    if args.save_baseline:
+        write_results(results, args.save_baseline)
+
+    if args.baseline:
+        regressions = check_regressions(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import io
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+
+CACHE_TTL_SECONDS = 300
+# Shortest prefix Bedrock will cache (Claude Sonnet); checkpoints before it are ignored
+CACHE_MIN_TOKENS = 1024
+
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token)"""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def _content_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get('text', '') for block in content if isinstance(block, dict))
+
+
+class PromptCache:
+    """Emulates Bedrock prompt caching: prefixes of at least `min_tokens` ending at a cache_control marker are cached for a TTL"""
+
+    def __init__(self, ttl_seconds: int = CACHE_TTL_SECONDS, min_tokens: int = CACHE_MIN_TOKENS):
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def account(self, body: Dict) -> Tuple[int, int, int]:
+        """Return (input_tokens, cache_creation_input_tokens, cache_read_input_tokens) for a request body"""
+        blocks = self._prompt_blocks(body)
+        total = sum(tokens for _, tokens, _ in blocks)
+
+        # Find the longest cached prefix and the longest cacheable prefix
+        digest = hashlib.sha256()
+        prefix_tokens = 0
+        cached_tokens = 0
+        cacheable = []
+        now = time.time()
+        with self._lock:
+            for text, tokens, marked in blocks:
+                digest.update(text.encode('utf-8'))
+                prefix_tokens += tokens
+                if not marked or prefix_tokens < self.min_tokens:
+                    continue
+                key = digest.hexdigest()
+                expires_at = self._entries.get(key)
+                if expires_at and expires_at > now:
+                    cached_tokens = prefix_tokens
+                    self._entries[key] = now + self.ttl_seconds
+                else:
+                    cacheable.append((key, prefix_tokens))
+
+            written_tokens = 0
+            for key, tokens in cacheable:
+                if tokens > cached_tokens:
+                    self._entries[key] = now + self.ttl_seconds
+                    written_tokens = max(written_tokens, tokens - cached_tokens)
+
+        return total - cached_tokens - written_tokens, written_tokens, cached_tokens
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _prompt_blocks(self, body: Dict) -> List[Tuple[str, int, bool]]:
+        blocks = []
+        system = body.get('system', '')
+        if isinstance(system, str):
+            blocks.append((system, count_tokens(system), False))
+        else:
+            for block in system:
+                text = block.get('text', '')
+                blocks.append((text, count_tokens(text), 'cache_control' in block))
+
+        for message in body.get('messages', []):
+            content = message.get('content', '')
+            if isinstance(content, str):
+                blocks.append((content, count_tokens(content), False))
+            else:
+                for block in content:
+                    text = block.get('text', '')
+                    blocks.append((text, count_tokens(text), 'cache_control' in block))
+        return blocks
+
+
+def build_reply_text(body: Dict) -> str:
+    """Deterministic stand-in completion for a request body"""
+    messages = body.get('messages', [])
+    last = _content_text(messages[-1].get('content', '')) if messages else ''
+    words = last.split()[:12]
+    max_words = max(1, body.get('max_tokens', 200) * 3 // 4)
+    filler = ("This is a local stand-in response from the Veron emulator. "
+              "It mirrors the shape of a Bedrock Anthropic completion so the backend "
+              "can be exercised without calling AWS.").split()
+    reply = ["Regarding"] + words + ["-"] + filler
+    return " ".join(reply[:max_words])
+
+
+def build_message_response(body: Dict, model_id: str, cache: PromptCache) -> Dict:
+    """Build an Anthropic messages response with cache-aware usage accounting"""
+    text = build_reply_text(body)
+    input_tokens, cache_write, cache_read = cache.account(body)
+    return {
+        'id': f"msg_{uuid.uuid4().hex[:24]}",
+        'type': 'message',
+        'role': 'assistant',
+        'model': model_id,
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn',
+        'stop_sequence': None,
+        'usage': {
+            'input_tokens': input_tokens,
+            'output_tokens': count_tokens(text),
+            'cache_creation_input_tokens': cache_write,
+            'cache_read_input_tokens': cache_read
+        }
+    }
+
+
+class LocalBedrockRuntimeClient:
+    """In-process stand-in for the boto3 bedrock-runtime client"""
+
+    def __init__(self, cache: PromptCache = None):
+        self.cache = cache or PromptCache()
+
+    def invoke_model(self, modelId, body, contentType='application/json', accept='application/json', **kwargs):
+        request_body = json.loads(body)
+        response_body = build_message_response(request_body, modelId, self.cache)
+        return {
+            'body': io.BytesIO(json.dumps(response_body).encode('utf-8')),
+            'contentType': 'application/json'
+        }
@@ -0,0 +1,47 @@
+import json
+import zlib
+import base64
+import struct
+
+STRING_HEADER_TYPE = 7
+
+
+def _encode_headers(headers):
+    encoded = b''
+    for name, value in headers.items():
+        name_bytes = name.encode('utf-8')
+        value_bytes = value.encode('utf-8')
+        encoded += struct.pack('!B', len(name_bytes)) + name_bytes
+        encoded += struct.pack('!BH', STRING_HEADER_TYPE, len(value_bytes)) + value_bytes
+    return encoded
+
+
+def encode_message(headers, payload: bytes) -> bytes:
+    """Encode one message in the AWS event stream binary framing"""
+    encoded_headers = _encode_headers(headers)
+    total_length = 12 + len(encoded_headers) + len(payload) + 4
+    prelude = struct.pack('!II', total_length, len(encoded_headers))
+    prelude += struct.pack('!I', zlib.crc32(prelude) & 0xffffffff)
+    message = prelude + encoded_headers + payload
+    return message + struct.pack('!I', zlib.crc32(message) & 0xffffffff)
+
+
+def encode_event(event_type: str, payload: dict) -> bytes:
+    return encode_message({
+        ':event-type': event_type,
+        ':content-type': 'application/json',
+        ':message-type': 'event'
+    }, json.dumps(payload).encode('utf-8'))
+
+
+def encode_exception(exception_type: str, message: str) -> bytes:
+    return encode_message({
+        ':exception-type': exception_type,
+        ':content-type': 'application/json',
+        ':message-type': 'exception'
+    }, json.dumps({'message': message}).encode('utf-8'))
+
+
+def encode_chunk(data: bytes) -> bytes:
+    """A `chunk` event carrying raw bytes, as used by invoke_agent and invoke_model_with_response_stream"""
+    return encode_event('chunk', {'bytes': base64.b64encode(data).decode('ascii')})
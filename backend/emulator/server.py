@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for AWS Bedrock (runtime and agent runtime) and ElevenLabs.
+
+Speaks the wire formats used by the backend so load tests can run without
+spending money:
+
+    POST /model/<modelId>/invoke
+    POST /model/<modelId>/invoke-with-response-stream   (AWS event stream)
+    POST /agents/<agentId>/agentAliases/<aliasId>/sessions/<sessionId>/text
+    POST /v1/text-to-speech/<voiceId>
+    POST /v1/speech-to-text
+    GET  /v1/voices
+    POST /v1/traces                                      (OTLP/HTTP JSON sink)
+
+Latency, token rate, throttling and error injection are configured per
+upstream and can be changed at runtime through /_emulator/config.
+
+Usage:
+    python -m emulator.server --port 5055 [--config emulator.json] [--seed 42]
+"""
+
+import os
+import json
+import math
+import time
+import uuid
+import copy
+import random
+import argparse
+import threading
+from flask import Flask, Response, jsonify, request
+
+from emulator.bedrock_runtime import PromptCache, build_message_response, build_reply_text
+from emulator.eventstream import encode_chunk, encode_event
+
+DEFAULT_CONFIG = {
+    'bedrock': {
+        'latency': {'distribution': 'lognormal', 'median_ms': 400, 'sigma': 0.5},
+        'tokens_per_second': 120,
+        'requests_per_second': 0,
+        'max_concurrency': 0,
+        'error_rate': 0.0,
+        'error_types': ['InternalServerException']
+    },
+    'agent': {
+        'latency': {'distribution': 'lognormal', 'median_ms': 1200, 'sigma': 0.5},
+        'tokens_per_second': 80,
+        'requests_per_second': 0,
+        'max_concurrency': 0,
+        'error_rate': 0.0,
+        'error_types': ['InternalServerException'],
+        'trace_events': 4
+    },
+    'elevenlabs': {
+        'latency': {'distribution': 'lognormal', 'median_ms': 300, 'sigma': 0.4},
+        'chars_per_second': 600,
+        'requests_per_second': 0,
+        'max_concurrency': 0,
+        'error_rate': 0.0
+    }
+}
+
+AWS_ERROR_STATUS = {
+    'ThrottlingException': 429,
+    'InternalServerException': 500,
+    'ServiceUnavailableException': 503,
+    'ModelTimeoutException': 408,
+    'ModelNotReadyException': 429,
+    'ValidationException': 400
+}
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz), about 26 ms of audio
+SILENT_MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+VOICES = [
+    {'voice_id': '21m00Tcm4TlvDq8ikWAM', 'name': 'Rachel', 'category': 'premade', 'labels': {'accent': 'american'}},
+    {'voice_id': 'ueSxRO0nLF1bj93J2hVt', 'name': 'Emulated Teacher', 'category': 'premade', 'labels': {'accent': 'british'}},
+]
+
+
+def deep_merge(base, overrides):
+    merged = copy.deepcopy(base)
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class UpstreamProfile:
+    """Latency, throttling and error behaviour for one emulated upstream"""
+
+    def __init__(self, name, config, rng):
+        self.name = name
+        self.config = config
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._tokens = float(config.get('requests_per_second') or 0)
+        self._refilled_at = time.monotonic()
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    def sample_latency(self):
+        """Sample a time-to-first-byte in seconds from the configured distribution"""
+        latency = self.config.get('latency', {})
+        distribution = latency.get('distribution', 'fixed')
+        if distribution == 'uniform':
+            ms = self.rng.uniform(latency.get('min_ms', 0), latency.get('max_ms', 0))
+        elif distribution == 'normal':
+            ms = self.rng.gauss(latency.get('mean_ms', 0), latency.get('stddev_ms', 0))
+        elif distribution == 'lognormal':
+            ms = self.rng.lognormvariate(math.log(max(latency.get('median_ms', 1), 1)), latency.get('sigma', 0))
+        else:
+            ms = latency.get('ms', 0)
+        return max(ms, 0) / 1000.0
+
+    def acquire(self):
+        """Admit a request, returning False if it should be throttled"""
+        with self._lock:
+            self.stats['requests'] += 1
+
+            max_concurrency = self.config.get('max_concurrency') or 0
+            if max_concurrency and self.stats['in_flight'] >= max_concurrency:
+                self.stats['throttled'] += 1
+                return False
+
+            rate = self.config.get('requests_per_second') or 0
+            if rate:
+                now = time.monotonic()
+                self._tokens = min(rate, self._tokens + (now - self._refilled_at) * rate)
+                self._refilled_at = now
+                if self._tokens < 1:
+                    self.stats['throttled'] += 1
+                    return False
+                self._tokens -= 1
+
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+            return True
+
+    def release(self):
+        with self._lock:
+            self.stats['in_flight'] -= 1
+
+    def injected_error(self):
+        """Return an error type to inject for this request, or None"""
+        if self.rng.random() >= (self.config.get('error_rate') or 0):
+            return None
+        with self._lock:
+            self.stats['errors'] += 1
+        error_types = self.config.get('error_types') or ['InternalServerException']
+        return self.rng.choice(error_types)
+
+
+def create_app(config=None, seed=None):
+    app = Flask(__name__)
+    state = {
+        'config': deep_merge(DEFAULT_CONFIG, config),
+        'cache': PromptCache(),
+        'rng': random.Random(seed),
+        'spans': []
+    }
+
+    def build_profiles():
+        state['profiles'] = {
+            name: UpstreamProfile(name, state['config'][name], state['rng'])
+            for name in ('bedrock', 'agent', 'elevenlabs')
+        }
+
+    build_profiles()
+
+    def aws_error(code, message):
+        return Response(
+            json.dumps({'message': message}),
+            status=AWS_ERROR_STATUS.get(code, 500),
+            headers={'x-amzn-ErrorType': code, 'Content-Type': 'application/json'}
+        )
+
+    def elevenlabs_error(status, code, message):
+        return jsonify({'detail': {'status': code, 'message': message}}), status
+
+    def request_body():
+        """Parsed JSON request body, or None when it is malformed"""
+        try:
+            body = json.loads(request.get_data() or b'{}')
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    def admit_aws(profile):
+        """Apply throttling and error injection, returning an error response or None"""
+        if not profile.acquire():
+            return aws_error('ThrottlingException', 'Too many requests, please wait before trying again.')
+        error = profile.injected_error()
+        if error:
+            time.sleep(profile.sample_latency())
+            profile.release()
+            return aws_error(error, f'Injected {error} from emulator')
+        return None
+
+    @app.route('/model/<path:model_id>/invoke', methods=['POST'])
+    def invoke_model(model_id):
+        profile = state['profiles']['bedrock']
+        # Validate before admission so a malformed body never holds a concurrency slot
+        body = request_body()
+        if body is None:
+            return aws_error('ValidationException', 'Malformed input request')
+        error = admit_aws(profile)
+        if error:
+            return error
+        try:
+            response_body = build_message_response(body, model_id, state['cache'])
+            output_tokens = response_body['usage']['output_tokens']
+            time.sleep(profile.sample_latency() + output_tokens / max(profile.config['tokens_per_second'], 1))
+            return Response(json.dumps(response_body), headers={
+                'Content-Type': 'application/json',
+                'x-amzn-bedrock-input-token-count': str(response_body['usage']['input_tokens']),
+                'x-amzn-bedrock-output-token-count': str(output_tokens)
+            })
+        finally:
+            profile.release()
+
+    @app.route('/model/<path:model_id>/invoke-with-response-stream', methods=['POST'])
+    def invoke_model_with_response_stream(model_id):
+        profile = state['profiles']['bedrock']
+        body = request_body()
+        if body is None:
+            return aws_error('ValidationException', 'Malformed input request')
+        error = admit_aws(profile)
+        if error:
+            return error
+        try:
+            response_body = build_message_response(body, model_id, state['cache'])
+        except Exception:
+            profile.release()
+            raise
+        usage = response_body['usage']
+        words = response_body['content'][0]['text'].split(' ')
+        first_byte = profile.sample_latency()
+        token_delay = 1.0 / max(profile.config['tokens_per_second'], 1)
+
+        def chunk(event):
+            return encode_chunk(json.dumps(event).encode('utf-8'))
+
+        def generate():
+            started = time.monotonic()
+            try:
+                time.sleep(first_byte)
+                message = dict(response_body, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))
+                yield chunk({'type': 'message_start', 'message': message})
+                yield chunk({'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}})
+                for i, word in enumerate(words):
+                    time.sleep(token_delay)
+                    text = word if i == 0 else ' ' + word
+                    yield chunk({'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': text}})
+                yield chunk({'type': 'content_block_stop', 'index': 0})
+                yield chunk({
+                    'type': 'message_delta',
+                    'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                    'usage': {'output_tokens': usage['output_tokens']}
+                })
+                yield chunk({
+                    'type': 'message_stop',
+                    'amazon-bedrock-invocationMetrics': {
+                        'inputTokenCount': usage['input_tokens'],
+                        'outputTokenCount': usage['output_tokens'],
+                        'invocationLatency': int((time.monotonic() - started) * 1000),
+                        'firstByteLatency': int(first_byte * 1000)
+                    }
+                })
+            finally:
+                profile.release()
+
+        return Response(generate(), headers={
+            'Content-Type': 'application/vnd.amazon.eventstream',
+            'x-amzn-bedrock-content-type': 'application/json'
+        })
+
+    @app.route('/agents/<agent_id>/agentAliases/<alias_id>/sessions/<session_id>/text', methods=['POST'])
+    def invoke_agent(agent_id, alias_id, session_id):
+        profile = state['profiles']['agent']
+        body = request_body()
+        if body is None:
+            return aws_error('ValidationException', 'Malformed input request')
+        error = admit_aws(profile)
+        if error:
+            return error
+        input_text = body.get('inputText', '')
+        text = build_reply_text({'messages': [{'content': input_text}], 'max_tokens': 300})
+        words = text.split(' ')
+        first_byte = profile.sample_latency()
+        token_delay = 1.0 / max(profile.config['tokens_per_second'], 1)
+        trace_events = profile.config.get('trace_events', 0) if body.get('enableTrace') else 0
+        trace_base = {
+            'agentId': agent_id,
+            'agentAliasId': alias_id,
+            'sessionId': session_id,
+            'agentVersion': '1'
+        }
+
+        def generate():
+            try:
+                time.sleep(first_byte)
+                for i in range(trace_events):
+                    yield encode_event('trace', dict(trace_base, trace={
+                        'orchestrationTrace': {
+                            'rationale': {
+                                'traceId': f'{uuid.uuid4()}-{i}',
+                                'text': f'Emulated reasoning step {i + 1} for: {input_text[:200]}'
+                            }
+                        }
+                    }))
+                # Agents return the completion in a few large chunks
+                for start in range(0, len(words), 20):
+                    time.sleep(token_delay * len(words[start:start + 20]))
+                    part = ' '.join(words[start:start + 20]) + (' ' if start + 20 < len(words) else '')
+                    yield encode_chunk(part.encode('utf-8'))
+            finally:
+                profile.release()
+
+        return Response(generate(), headers={
+            'Content-Type': 'application/vnd.amazon.eventstream',
+            'x-amzn-bedrock-agent-content-type': 'application/json',
+            'x-amz-bedrock-agent-session-id': session_id
+        })
+
+    def admit_elevenlabs(profile):
+        if not profile.acquire():
+            return elevenlabs_error(429, 'too_many_concurrent_requests', 'Too many concurrent requests')
+        if profile.injected_error():
+            time.sleep(profile.sample_latency())
+            profile.release()
+            return elevenlabs_error(500, 'internal_error', 'Injected error from emulator')
+        return None
+
+    @app.route('/v1/text-to-speech/<voice_id>', methods=['POST'])
+    @app.route('/v1/text-to-speech/<voice_id>/stream', methods=['POST'])
+    def text_to_speech(voice_id):
+        profile = state['profiles']['elevenlabs']
+        error = admit_elevenlabs(profile)
+        if error:
+            return error
+        try:
+            text = (request.get_json(silent=True) or {}).get('text', '')
+            time.sleep(profile.sample_latency() + len(text) / max(profile.config['chars_per_second'], 1))
+            # Roughly 15 spoken characters per second of audio
+            frames = max(1, int(len(text) / 15 / 0.026))
+            return Response(SILENT_MP3_FRAME * frames, headers={'Content-Type': 'audio/mpeg'})
+        finally:
+            profile.release()
+
+    @app.route('/v1/speech-to-text', methods=['POST'])
+    def speech_to_text():
+        profile = state['profiles']['elevenlabs']
+        error = admit_elevenlabs(profile)
+        if error:
+            return error
+        try:
+            audio = request.files.get('audio') or request.files.get('file')
+            size = len(audio.read()) if audio else 0
+            time.sleep(profile.sample_latency())
+            return jsonify({
+                'language_code': request.form.get('language', 'en'),
+                'language_probability': 0.98,
+                'text': f'Emulated transcription of {size} bytes of audio.',
+                'words': []
+            })
+        finally:
+            profile.release()
+
+    @app.route('/v1/voices', methods=['GET'])
+    def voices():
+        profile = state['profiles']['elevenlabs']
+        error = admit_elevenlabs(profile)
+        if error:
+            return error
+        try:
+            time.sleep(profile.sample_latency())
+            return jsonify({'voices': VOICES})
+        finally:
+            profile.release()
+
+    @app.route('/v1/traces', methods=['POST'])
+    def otlp_traces():
+        payload = request.get_json(silent=True) or {}
+        for resource_spans in payload.get('resourceSpans', []):
+            for scope_spans in resource_spans.get('scopeSpans', []):
+                state['spans'].extend(scope_spans.get('spans', []))
+        del state['spans'][:-10000]
+        return jsonify({})
+
+    @app.route('/_emulator/traces', methods=['GET'])
+    def get_traces():
+        trace_id = request.args.get('trace_id')
+        return jsonify([s for s in state['spans'] if not trace_id or s.get('traceId') == trace_id])
+
+    @app.route('/_emulator/config', methods=['GET'])
+    def get_config():
+        return jsonify(state['config'])
+
+    @app.route('/_emulator/config', methods=['PUT'])
+    def update_config():
+        state['config'] = deep_merge(state['config'], request.get_json(silent=True) or {})
+        build_profiles()
+        return jsonify(state['config'])
+
+    @app.route('/_emulator/stats', methods=['GET'])
+    def get_stats():
+        return jsonify({name: dict(profile.stats) for name, profile in state['profiles'].items()})
+
+    @app.route('/_emulator/reset', methods=['POST'])
+    def reset():
+        state['cache'].clear()
+        state['spans'].clear()
+        build_profiles()
+        return jsonify({'success': True})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Bedrock/ElevenLabs emulator for load testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.getenv('EMULATOR_PORT', 5055)))
+    parser.add_argument('--config', default=os.getenv('EMULATOR_CONFIG'), help='JSON file with per-upstream overrides')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible latency/error sampling')
+    args = parser.parse_args()
+
+    config = None
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+
+    app = create_app(config, seed=args.seed)
+    print(f"🧪 Upstream emulator listening on http://{args.host}:{args.port}")
+    print(f"   BEDROCK_ENDPOINT_URL=http://{args.host}:{args.port}")
+    print(f"   BEDROCK_AGENT_ENDPOINT_URL=http://{args.host}:{args.port}")
+    print(f"   ELEVENLABS_API_URL=http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import os
+import math
+import time
+import threading
+from functools import partial
+from flask import g, request
+from middleware.deadline import deadline
+from middleware.error_handler import handle_upstream_unavailable
+from middleware.metrics import metrics
+from services.resilience import UpstreamOverloaded
+
+LLM = 'llm'
+VOICE = 'voice'
+UPLOAD = 'upload'
+API = 'api'
+HEALTH = 'health'
+STATIC = 'static'
+
+LLM_PATHS = ('/api/chat/message', '/api/chat/lesson-plan', '/api/chat/batch', '/api/agent/chat')
+UPLOAD_PATHS = ('/api/agent/upload', '/api/knowledge/upload')
+
+# Per-worker budgets: max_in_flight, max_queue, queue_timeout (s), max_backlog_ms (0 = unlimited)
+DEFAULT_BUDGETS = {
+    LLM: (4, 2, 2.0, 10000),
+    VOICE: (2, 1, 2.0, 20000),
+    UPLOAD: (1, 1, 5.0, 10000),
+    API: (4, 2, 1.0, 5000),
+}
+
+
+class RouteClass:
+    """Admission budget and live counts for one class of routes"""
+
+    def __init__(self, name, max_in_flight=0, max_queue=0, queue_timeout=0.0, max_backlog_ms=0):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_backlog_ms = max_backlog_ms
+        self.in_flight = 0
+        self.queued = 0
+        self.service_ewma = None
+        self.stats = {'admitted': 0, 'rejected': 0}
+
+    @classmethod
+    def from_env(cls, name):
+        max_in_flight, max_queue, queue_timeout, max_backlog_ms = DEFAULT_BUDGETS[name]
+        prefix = f'ADMISSION_{name.upper()}'
+        return cls(
+            name,
+            max_in_flight=int(os.getenv(f'{prefix}_MAX_IN_FLIGHT', max_in_flight)),
+            max_queue=int(os.getenv(f'{prefix}_MAX_QUEUE', max_queue)),
+            queue_timeout=float(os.getenv(f'{prefix}_QUEUE_TIMEOUT', queue_timeout)),
+            max_backlog_ms=float(os.getenv(f'{prefix}_MAX_BACKLOG_MS', max_backlog_ms))
+        )
+
+    def retry_after(self):
+        """About one typical request of this class, which is when a slot should free up"""
+        if self.service_ewma is None:
+            return 1
+        return min(30, max(1, math.ceil(self.service_ewma)))
+
+    def snapshot(self):
+        return dict(
+            self.stats,
+            max_in_flight=self.max_in_flight,
+            max_queue=self.max_queue,
+            in_flight=self.in_flight,
+            queued=self.queued,
+            service_ewma=self.service_ewma
+        )
+
+
+class AdmissionController:
+    """Sheds load per route class before it reaches a busy worker.
+
+    Requests are classified by path (LLM, voice, upload, other API; health
+    checks, /metrics and static files are never limited). Each class has a
+    per-worker in-flight budget and a short wait queue; a request that finds
+    both full, or waits longer than the class's queue timeout, gets an
+    immediate 503 with Retry-After instead of holding a thread until nginx
+    gives up. `max_in_flight` caps the classes together so some threads are
+    always left for health checks.
+
+    nginx stamps X-Request-Start when it forwards a request; a request that
+    already sat in the socket backlog longer than the class's
+    `max_backlog_ms` is shed too, since its client has mostly given up.
+    """
+
+    HEADER = 'X-Request-Start'
+
+    def __init__(self, classes, max_in_flight=0, enabled=True):
+        self.classes = {route_class.name: route_class for route_class in classes}
+        self.max_in_flight = max_in_flight
+        self.enabled = enabled
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._exempt_paths = {os.getenv('METRICS_PATH', '/metrics')}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            [RouteClass.from_env(name) for name in DEFAULT_BUDGETS],
+            max_in_flight=int(os.getenv('ADMISSION_MAX_IN_FLIGHT', 6)),
+            enabled=os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+        )
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        app.before_request(self._admit)
+        app.after_request(self._hand_off)
+        app.teardown_request(self._teardown)
+
+    def classify(self, path):
+        if path.endswith('/health') or path in self._exempt_paths:
+            return HEALTH
+        if not path.startswith('/api/'):
+            return STATIC
+        if path.startswith(LLM_PATHS):
+            return LLM
+        if path.startswith(UPLOAD_PATHS):
+            return UPLOAD
+        if path.startswith('/api/voice/'):
+            return VOICE
+        return API
+
+    def _admit(self):
+        route_class = self.classes.get(self.classify(request.path))
+        if route_class is None or request.method == 'OPTIONS':
+            return None
+
+        backlog = self._backlog_seconds()
+        if backlog is not None:
+            metrics.observe_admission_backlog(route_class.name, backlog)
+            if route_class.max_backlog_ms and backlog * 1000 > route_class.max_backlog_ms:
+                return self._reject(route_class, 'backlog')
+
+        reason = self._acquire(route_class)
+        if reason:
+            return self._reject(route_class, reason)
+        g._admission = (route_class, time.monotonic())
+        return None
+
+    def _backlog_seconds(self):
+        """Seconds since nginx received the request ("t=<epoch seconds>"), or None without the header"""
+        header = request.headers.get(self.HEADER)
+        if not header:
+            return None
+        try:
+            started = float(header[2:] if header.startswith('t=') else header)
+        except ValueError:
+            return None
+        # Also accept epoch milliseconds or microseconds
+        while started > 1e11:
+            started /= 1000
+        return max(0.0, time.time() - started)
+
+    def _has_slot(self, route_class):
+        return ((not route_class.max_in_flight or route_class.in_flight < route_class.max_in_flight)
+                and (not self.max_in_flight or self.in_flight < self.max_in_flight))
+
+    def _acquire(self, route_class):
+        """Take a slot, waiting in the class queue if there is room; returns the rejection reason or None"""
+        with self._cond:
+            if not self._has_slot(route_class):
+                if route_class.queued >= route_class.max_queue:
+                    return 'queue_full'
+                timeout = route_class.queue_timeout
+                remaining = deadline.remaining()
+                if remaining is not None:
+                    timeout = min(timeout, remaining)
+                ends_at = time.monotonic() + timeout
+                route_class.queued += 1
+                self._publish(route_class)
+                try:
+                    while not self._has_slot(route_class):
+                        left = ends_at - time.monotonic()
+                        if left <= 0:
+                            return 'queue_timeout'
+                        self._cond.wait(left)
+                finally:
+                    route_class.queued -= 1
+            route_class.in_flight += 1
+            self.in_flight += 1
+            route_class.stats['admitted'] += 1
+            self._publish(route_class)
+        return None
+
+    def _release(self, route_class, started):
+        elapsed = time.monotonic() - started
+        with self._cond:
+            route_class.in_flight -= 1
+            self.in_flight -= 1
+            route_class.service_ewma = elapsed if route_class.service_ewma is None else \
+                0.8 * route_class.service_ewma + 0.2 * elapsed
+            self._publish(route_class)
+            self._cond.notify_all()
+
+    def _reject(self, route_class, reason):
+        with self._cond:
+            route_class.stats['rejected'] += 1
+            self._publish(route_class)
+        metrics.record_admission_rejected(route_class.name, reason)
+        return handle_upstream_unavailable(UpstreamOverloaded(route_class.name, route_class.retry_after(), reason))
+
+    def _publish(self, route_class):
+        metrics.set_admission_state(route_class.name, route_class.in_flight, route_class.queued)
+
+    def _hand_off(self, response):
+        # A streamed body is still being produced after the request context
+        # is torn down; keep the slot until the server closes the response
+        if response.is_streamed:
+            ticket = g.pop('_admission', None)
+            if ticket is not None:
+                response.call_on_close(partial(self._release, *ticket))
+        return response
+
+    def _teardown(self, exc=None):
+        ticket = g.pop('_admission', None)
+        if ticket is not None:
+            self._release(*ticket)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'classes': {name: route_class.snapshot() for name, route_class in self.classes.items()}
+            }
+
+
+admission = AdmissionController.from_env()
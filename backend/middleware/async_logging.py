@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields passed with `extra=` are included as-is"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that can write a batch of records with a single flush"""
+
+    def emit_batch(self, records):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        data = ''.join(lines)
+        self.acquire()
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self.stream.tell() + len(data) >= self.maxBytes and self.stream.tell() > 0:
+                self.doRollover()
+            self.stream.write(data)
+            self.stream.flush()
+        finally:
+            self.release()
+
+
+class _WriterQueueHandler(QueueHandler):
+    """Enqueues records for one target handler without ever blocking the caller"""
+
+    def __init__(self, writer, target):
+        super().__init__(writer.queue)
+        self.writer = writer
+        self.target = target
+        self.setLevel(target.level)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait((self.target, record))
+        except queue.Full:
+            self.writer.record_drop(self.target)
+
+
+class AsyncLogWriter:
+    """Moves log I/O off request threads.
+
+    Handlers returned by attach() only put records on a bounded queue; a
+    single writer thread drains it in batches and writes each target with
+    one flush per batch. When the queue is full records are dropped and
+    counted instead of blocking the request.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=500, flush_interval=0.5):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self.dropped = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def attach(self, target):
+        """Wrap a handler (ideally with emit_batch) so emitting to it is non-blocking"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+        self.dropped.setdefault(self._target_name(target), 0)
+        return _WriterQueueHandler(self, target)
+
+    def record_drop(self, target):
+        name = self._target_name(target)
+        with self._lock:
+            self.dropped[name] = self.dropped.get(name, 0) + 1
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'capacity': self.queue.maxsize,
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': dict(self.dropped)
+        }
+
+    def stop(self, timeout=5):
+        """Flush what is queued and stop the writer thread"""
+        if self._thread is None or self._stopped.is_set():
+            return
+        self._stopped.set()
+        try:
+            self.queue.put((None, None), timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _target_name(self, target):
+        return getattr(target, 'baseFilename', None) or type(target).__name__
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            by_target = {}
+            stop = False
+            for target, record in batch:
+                if target is None:
+                    stop = True
+                    continue
+                by_target.setdefault(target, []).append(record)
+            for target, records in by_target.items():
+                self._write(target, records)
+            self.batches += 1
+            if stop:
+                # Drain anything enqueued before the stop marker was taken
+                self._drain()
+                return
+
+    def _drain(self):
+        by_target = {}
+        while True:
+            try:
+                target, record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if target is not None:
+                by_target.setdefault(target, []).append(record)
+        for target, records in by_target.items():
+            self._write(target, records)
+
+    def _write(self, target, records):
+        try:
+            if hasattr(target, 'emit_batch'):
+                target.emit_batch(records)
+            else:
+                for record in records:
+                    target.handle(record)
+            self.written += len(records)
+        except Exception as e:
+            print(f"Log writer error: {e}")
+
+
+def json_file_handler(path, level=logging.INFO):
+    """Rotating JSON-lines file handler sized from LOG_MAX_BYTES / LOG_BACKUP_COUNT"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = BatchingRotatingFileHandler(
+        path,
+        maxBytes=int(os.getenv('LOG_MAX_BYTES', 10240000)),
+        backupCount=int(os.getenv('LOG_BACKUP_COUNT', 10))
+    )
+    handler.setFormatter(JsonFormatter())
+    handler.setLevel(level)
+    return handler
+
+
+def attach_security_events_log(path='logs/security_events.json'):
+    """Route the veron.security_events logger to a JSON-lines file through log_writer (once per process)"""
+    events_logger = logging.getLogger('veron.security_events')
+    if not events_logger.handlers:
+        events_logger.addHandler(log_writer.attach(json_file_handler(path)))
+        events_logger.setLevel(logging.INFO)
+        events_logger.propagate = False
+    return events_logger
+
+
+# Global instance
+log_writer = AsyncLogWriter(
+    max_queue=int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('LOG_BATCH_SIZE', 500)),
+    flush_interval=float(os.getenv('LOG_FLUSH_INTERVAL', 0.5))
+)
@@ -0,0 +1,82 @@
+import os
+import gzip
+from flask import request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'text/css', 'application/javascript')
+
+
+class ResponseCompression:
+    """gzip/brotli for buffered responses above `min_bytes`, negotiated from Accept-Encoding.
+
+    Streamed and already-encoded responses are left alone. A strong ETag
+    gets the coding appended ("<tag>-gzip") so each encoding has its own
+    tag; middleware.conditional strips it again when comparing.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+        self.min_bytes = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+        self.gzip_level = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+        self.brotli_quality = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+    def init_app(self, app):
+        """Register the hook; call before server_timing.init_app so the final body is compressed (after_request hooks run in reverse)"""
+        if not self.enabled:
+            return
+        app.after_request(self._compress)
+
+    def negotiate(self, accept_encoding):
+        """Preferred coding ('br' or 'gzip') acceptable to the client, or None"""
+        accepted = {}
+        for item in (accept_encoding or '').split(','):
+            coding, _, params = item.strip().partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[coding.strip().lower()] = quality
+        candidates = ['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip']
+        wildcard = accepted.get('*', 0.0)
+        scored = [(accepted.get(coding, wildcard), coding) for coding in candidates]
+        quality, coding = max(scored, key=lambda s: s[0])
+        return coding if quality > 0 else None
+
+    def compress(self, data, coding):
+        if coding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level)
+
+    def _compress(self, response):
+        if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough
+                or response.is_streamed or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.status_code < 200 or response.status_code >= 300 or request.method == 'HEAD':
+            return response
+        if response.content_length is not None and response.content_length < self.min_bytes:
+            return response
+        coding = self.negotiate(request.headers.get('Accept-Encoding'))
+        if coding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_bytes:
+            return response
+        response.set_data(self.compress(data, coding))
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{coding}')
+        return response
+
+
+compression = ResponseCompression()
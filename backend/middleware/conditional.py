@@ -0,0 +1,56 @@
+import hashlib
+from flask import make_response, request
+
+# Content-codings that ResponseCompression appends to a strong ETag ("<tag>-gzip")
+ENCODING_SUFFIXES = ('-br', '-gzip')
+
+
+def resource_etag(*parts):
+    """Strong ETag for a resource version; the query string is included so each view of it gets its own tag"""
+    key = '|'.join(str(part) for part in parts) + '?' + request.query_string.decode('latin-1')
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:32]
+
+
+def _base_tag(tag):
+    tag = tag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def matching_etag(etag):
+    """The If-None-Match entry matching `etag` (weak comparison, ignoring the content-coding suffix), or None"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return None
+    if header.strip() == '*':
+        return f'"{etag}"'
+    for tag in header.split(','):
+        if _base_tag(tag) == etag:
+            return tag.strip()
+    return None
+
+
+def conditional_response(etag, build):
+    """304 when the client already has `etag`, otherwise build() with the ETag set.
+
+    `build` is only called on a miss, so an unchanged resource is never
+    serialized. A 304 repeats the tag the client sent, which carries the
+    coding suffix of the copy it holds. Responses are marked no-cache: the
+    browser keeps its copy but revalidates on every poll.
+    """
+    matched = matching_etag(etag)
+    if matched:
+        response = make_response('', 304)
+        response.headers['ETag'] = matched
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
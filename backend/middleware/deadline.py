@@ -0,0 +1,57 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from flask import request
+
+_deadline = contextvars.ContextVar('veron_request_deadline', default=None)
+
+
+class RequestDeadline:
+    """Per-request time budget for upstream calls.
+
+    The budget comes from the X-Request-Timeout-Ms header (nginx sets it just
+    under its proxy_read_timeout) and/or REQUEST_DEADLINE_SECONDS, whichever
+    is shorter, minus a small margin for writing the response. Upstream
+    helpers read remaining() so a slow call gives up before the proxy does.
+    """
+
+    HEADER = 'X-Request-Timeout-Ms'
+
+    def __init__(self):
+        self.default = float(os.getenv('REQUEST_DEADLINE_SECONDS', 0))
+        self.margin = float(os.getenv('REQUEST_DEADLINE_MARGIN_MS', 500)) / 1000
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.teardown_request(self._clear)
+
+    def _start(self):
+        budgets = [self.default] if self.default > 0 else []
+        header = request.headers.get(self.HEADER)
+        if header:
+            try:
+                budgets.append(float(header) / 1000)
+            except ValueError:
+                pass
+        _deadline.set(time.monotonic() + min(budgets) - self.margin if budgets else None)
+
+    def _clear(self, exc=None):
+        _deadline.set(None)
+
+    @contextmanager
+    def bind(self, seconds):
+        """Run a block under its own budget of `seconds` (None for no deadline)"""
+        token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+
+    def remaining(self):
+        """Seconds left for the current request, or None when it has no deadline"""
+        deadline = _deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
+
+
+deadline = RequestDeadline()
@@ -1,5 +1,5 @@
 import os
-from flask import jsonify
+from flask import jsonify, g
 
 def handle_error(error, status_code=500):
     is_development = os.getenv('NODE_ENV', 'development') == 'development'
@@ -14,6 +14,22 @@ def handle_error(error, status_code=500):
     
     return jsonify(error_response), status_code
 
+UPSTREAM_MESSAGES = {
+    503: 'Veron is handling a lot of requests right now. Please try again shortly.',
+    504: 'Veron took too long to respond. Please try again.'
+}
+
+def handle_upstream_unavailable(error):
+    """503/504 with Retry-After for an upstream that is throttling, failing or out of time"""
+    response = jsonify({
+        'success': False,
+        'error': UPSTREAM_MESSAGES[error.status_code],
+        'retryAfter': error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    g._upstream_retry_after = error.retry_after
+    return response, error.status_code
+
 def handle_validation_error(errors):
     return jsonify({
         'success': False,
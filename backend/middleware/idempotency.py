@@ -0,0 +1,206 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, jsonify, make_response, request
+from middleware.deadline import deadline
+from middleware.metrics import metrics
+
+HEADER = 'Idempotency-Key'
+# Headers worth replaying; everything else is regenerated per response
+REPLAYED_HEADERS = ('Content-Type',)
+
+
+class _Entry:
+    __slots__ = ('fingerprint', 'done', 'result', 'expires_at', 'remote')
+
+    def __init__(self, fingerprint, remote=False):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result = None
+        self.expires_at = 0.0
+        self.remote = remote
+
+
+class IdempotencyStore:
+    """Results of requests sent with an Idempotency-Key.
+
+    An in-process LRU holds completed results for `ttl` seconds and the
+    in-flight entry of requests still running, so a retry either replays the
+    stored response or waits for the original call instead of paying for a
+    second generation. With a shared `backend` (a ResponseStore) the claim
+    and the result are also visible to other workers; a retry that lands on
+    a different worker polls the backend until the original finishes.
+    Retries wait at most `wait_seconds`; a claim left by a crashed worker
+    expires after twice that.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600.0, wait_seconds=30.0, backend=None, poll_interval=0.1):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_seconds = wait_seconds
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        backend = None
+        path = os.getenv('IDEMPOTENCY_STORE_PATH')
+        if path:
+            from services.response_store import ResponseStore
+            backend = ResponseStore(path)
+        return cls(
+            max_entries=int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 1000)),
+            ttl=float(os.getenv('IDEMPOTENCY_TTL_SECONDS', 3600)),
+            wait_seconds=float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 30)),
+            backend=backend
+        )
+
+    def begin(self, key, fingerprint):
+        """Return (entry, owner); the owner runs the request and must complete() or abandon() it"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not entry.done.is_set() or entry.expires_at > now):
+                self._entries.move_to_end(key)
+                return entry, False
+
+            claim = {'fingerprint': fingerprint}
+            if self.backend is not None and not self.backend.add(key, claim, ttl=self.wait_seconds * 2):
+                remote = self.backend.get(key) or {}
+                entry = _Entry(remote.get('fingerprint', fingerprint), remote=True)
+                if 'result' in remote:
+                    self._finish(entry, remote['result'], now)
+                    self._store(key, entry)
+                return entry, False
+
+            entry = _Entry(fingerprint)
+            self._store(key, entry)
+            return entry, True
+
+    def wait(self, key, entry, timeout):
+        """Wait for another request's result; False if it did not finish in time or was abandoned"""
+        if not entry.remote or entry.done.is_set():
+            return entry.done.wait(timeout) and entry.result is not None
+        ends_at = time.monotonic() + timeout
+        while time.monotonic() < ends_at:
+            remote = self.backend.get(key)
+            if remote is None:
+                return False
+            if 'result' in remote:
+                with self._lock:
+                    self._finish(entry, remote['result'], time.monotonic())
+                    self._store(key, entry)
+                return True
+            time.sleep(self.poll_interval)
+        return False
+
+    def complete(self, key, entry, result):
+        with self._lock:
+            self._finish(entry, result, time.monotonic())
+        if self.backend is not None:
+            self.backend.put(key, {'fingerprint': entry.fingerprint, 'result': result}, ttl=self.ttl)
+
+    def abandon(self, key, entry):
+        """Forget a failed attempt so waiters and later retries run it again"""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        if self.backend is not None:
+            self.backend.delete(key)
+        entry.done.set()
+
+    def _finish(self, entry, result, now):
+        entry.result = result
+        entry.expires_at = now + self.ttl
+        entry.done.set()
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        # Evict the oldest completed results; in-flight entries are never dropped
+        excess = len(self._entries) - self.max_entries
+        for old_key in list(self._entries):
+            if excess <= 0:
+                break
+            if self._entries[old_key].done.is_set():
+                del self._entries[old_key]
+                excess -= 1
+
+
+idempotency_store = IdempotencyStore.from_env()
+
+
+def _replay(result):
+    response = Response(result['body'], status=result['status'])
+    for name, value in result['headers']:
+        response.headers[name] = value
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(f):
+    """Honour an Idempotency-Key header on a POST view.
+
+    A repeat of a completed request gets the stored response (marked with
+    Idempotent-Replayed: true); a repeat of one still running waits for it.
+    Responses with 5xx or 429 are not stored, so the client can retry them.
+    Reusing a key with a different body is a 422.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'success': False, 'error': f'{HEADER} must be at most 255 characters'}), 400
+
+        scoped_key = hashlib.sha256(f'{request.path}|{request.remote_addr}|{key}'.encode('utf-8')).hexdigest()
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        remaining = deadline.remaining()
+        wait_seconds = idempotency_store.wait_seconds
+        if remaining is not None:
+            wait_seconds = max(0.0, min(wait_seconds, remaining))
+        ends_at = time.monotonic() + wait_seconds
+
+        while True:
+            entry, owner = idempotency_store.begin(scoped_key, fingerprint)
+            if owner:
+                break
+            if entry.fingerprint != fingerprint:
+                return jsonify({
+                    'success': False,
+                    'error': f'{HEADER} was already used for a different request'
+                }), 422
+            if idempotency_store.wait(scoped_key, entry, max(0.0, ends_at - time.monotonic())):
+                metrics.record_cache('idempotency', True)
+                return _replay(entry.result)
+            if time.monotonic() >= ends_at:
+                response = jsonify({
+                    'success': False,
+                    'error': 'A request with this Idempotency-Key is still in progress'
+                })
+                response.headers['Retry-After'] = '1'
+                return response, 409
+            # The original attempt failed; take over as the owner
+
+        metrics.record_cache('idempotency', False)
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency_store.abandon(scoped_key, entry)
+            raise
+        if response.status_code >= 500 or response.status_code == 429 or response.is_streamed:
+            idempotency_store.abandon(scoped_key, entry)
+            return response
+        idempotency_store.complete(scoped_key, entry, {
+            'status': response.status_code,
+            'headers': [(name, response.headers[name]) for name in REPLAYED_HEADERS if name in response.headers],
+            'body': response.get_data(as_text=True)
+        })
+        return response
+    return decorated_function
@@ -0,0 +1,81 @@
+import os
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify() and request.get_json().
+
+    Output matches the stdlib provider except that non-ASCII text is written
+    as UTF-8 rather than \\u escapes: keys are still sorted, and dates,
+    decimals and dataclasses go through Flask's default conversion. Calls
+    with encoder options orjson does not have (custom separators or cls,
+    indent other than 2) and values it rejects, such as integers above
+    64 bits, fall back to the stdlib.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def _dumps_bytes(self, obj, sort_keys=None, indent=None):
+        option = self._option
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        sort_keys = kwargs.pop('sort_keys', None)
+        indent = kwargs.pop('indent', None)
+        if not kwargs and indent in (None, 0, 2):
+            try:
+                return self._dumps_bytes(obj, sort_keys, indent).decode('utf-8')
+            except TypeError:
+                pass
+        if sort_keys is not None:
+            kwargs['sort_keys'] = sort_keys
+        if indent is not None:
+            kwargs['indent'] = indent
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Pretty-print like the stdlib provider does in debug mode
+        indent = 2 if self.compact is None and self._app.debug or self.compact is False else None
+        try:
+            body = self._dumps_bytes(obj, indent=indent)
+        except TypeError:
+            dump_args = {'indent': indent} if indent else {'separators': (',', ':')}
+            body = super().dumps(obj, **dump_args).encode('utf-8')
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    'stdlib': DefaultJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+
+def json_provider_class(name=None):
+    """Provider class for JSON_PROVIDER (auto, orjson or stdlib); auto picks orjson when it is installed"""
+    name = (name or os.getenv('JSON_PROVIDER', 'auto')).lower()
+    if name == 'auto':
+        name = 'orjson' if ORJSON_AVAILABLE else 'stdlib'
+    if name == 'orjson' and not ORJSON_AVAILABLE:
+        print("⚠️  JSON_PROVIDER=orjson but orjson is not installed; using the stdlib encoder")
+        name = 'stdlib'
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER '{name}' (expected one of: auto, {', '.join(PROVIDERS)})")
+    return PROVIDERS[name]
@@ -0,0 +1,201 @@
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+    from prometheus_flask_exporter import PrometheusMetrics
+    from prometheus_flask_exporter.multiprocess import GunicornInternalPrometheusMetrics
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+BACKLOG_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30)
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Usage block keys -> token type label
+TOKEN_TYPES = {
+    'input_tokens': 'input',
+    'output_tokens': 'output',
+    'cache_read_input_tokens': 'cache_read',
+    'cache_creation_input_tokens': 'cache_write'
+}
+
+
+class Metrics:
+    """Prometheus metrics for routes, upstream calls and file processing.
+
+    All helpers are no-ops when prometheus-flask-exporter is not installed
+    or METRICS_ENABLED=false. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR
+    so every worker's samples are aggregated on /metrics.
+    """
+
+    def __init__(self):
+        self.enabled = PROMETHEUS_AVAILABLE and os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+        self.multiprocess = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+        self.exporter = None
+        if not self.enabled:
+            return
+
+        self.upstream_latency = Histogram(
+            'veron_upstream_request_seconds', 'Latency of calls to Bedrock, Bedrock Agents and ElevenLabs',
+            ['upstream', 'operation', 'outcome'], buckets=UPSTREAM_BUCKETS
+        )
+        self.upstream_in_flight = Gauge(
+            'veron_upstream_in_flight', 'Upstream calls currently in flight',
+            ['upstream'], multiprocess_mode='livesum'
+        )
+        self.tokens = Counter(
+            'veron_llm_tokens_total', 'LLM tokens reported in Bedrock usage blocks',
+            ['operation', 'type']
+        )
+        self.file_stage_latency = Histogram(
+            'veron_file_processing_seconds', 'Latency of FileProcessor ingestion stages',
+            ['stage'], buckets=STAGE_BUCKETS
+        )
+        self.upstream_limit = Gauge(
+            'veron_upstream_concurrency_limit', 'Adaptive concurrency limit per upstream',
+            ['upstream'], multiprocess_mode='livesum'
+        )
+        self.upstream_shed = Counter(
+            'veron_upstream_shed_total', 'Upstream calls refused locally or throttled upstream',
+            ['upstream', 'reason']
+        )
+        self.circuit_state = Gauge(
+            'veron_upstream_circuit_state', 'Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)',
+            ['upstream'], multiprocess_mode='max'
+        )
+        self.hedges = Counter(
+            'veron_upstream_hedges_total', 'Hedged upstream requests fired and won',
+            ['upstream', 'result']
+        )
+        self.endpoint_calls = Histogram(
+            'veron_bedrock_endpoint_seconds', 'Latency of Bedrock calls per pool endpoint',
+            ['endpoint', 'outcome'], buckets=UPSTREAM_BUCKETS
+        )
+        self.endpoint_outstanding = Gauge(
+            'veron_bedrock_endpoint_outstanding', 'Bedrock calls in flight per pool endpoint',
+            ['endpoint'], multiprocess_mode='livesum'
+        )
+        self.endpoint_health = Gauge(
+            'veron_bedrock_endpoint_health', 'Health score (EWMA of successes) per pool endpoint',
+            ['endpoint'], multiprocess_mode='min'
+        )
+        self.cache_events = Counter(
+            'veron_cache_events_total', 'Cache lookups by cache and result',
+            ['cache', 'result']
+        )
+        self.admission_in_flight = Gauge(
+            'veron_admission_in_flight', 'Admitted requests in flight per route class',
+            ['route_class'], multiprocess_mode='livesum'
+        )
+        self.admission_queued = Gauge(
+            'veron_admission_queued', 'Requests waiting for an admission slot per route class',
+            ['route_class'], multiprocess_mode='livesum'
+        )
+        self.admission_rejected = Counter(
+            'veron_admission_rejected_total', 'Requests shed by admission control',
+            ['route_class', 'reason']
+        )
+        self.admission_backlog = Histogram(
+            'veron_admission_backlog_seconds', 'Time from nginx receiving a request to a worker picking it up',
+            ['route_class'], buckets=BACKLOG_BUCKETS
+        )
+
+    def init_app(self, app):
+        """Register request histograms and the /metrics endpoint"""
+        if not self.enabled:
+            return
+        exporter_class = GunicornInternalPrometheusMetrics if self.multiprocess else PrometheusMetrics
+        self.exporter = exporter_class(
+            app,
+            path=os.getenv('METRICS_PATH', '/metrics'),
+            group_by='endpoint',
+            excluded_paths=['^/static', '^/favicon']
+        )
+
+    @contextmanager
+    def track_upstream(self, upstream, operation):
+        """Time an upstream call; callers may set result['outcome'] for non-exception failures"""
+        result = {'outcome': 'ok'}
+        if not self.enabled:
+            yield result
+            return
+
+        self.upstream_in_flight.labels(upstream).inc()
+        started = time.perf_counter()
+        try:
+            yield result
+        except Exception as e:
+            # Imported here: services.resilience imports this module
+            from services.resilience import is_throttle
+            result['outcome'] = 'throttled' if is_throttle(e) else 'error'
+            raise
+        finally:
+            self.upstream_in_flight.labels(upstream).dec()
+            self.upstream_latency.labels(upstream, operation, result['outcome']).observe(time.perf_counter() - started)
+
+    @contextmanager
+    def time_stage(self, stage):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.file_stage_latency.labels(stage).observe(time.perf_counter() - started)
+
+    def observe_usage(self, operation, usage):
+        if not self.enabled or not usage:
+            return
+        for key, token_type in TOKEN_TYPES.items():
+            value = usage.get(key) or 0
+            if value:
+                self.tokens.labels(operation, token_type).inc(value)
+
+    def set_concurrency_limit(self, upstream, limit):
+        if self.enabled:
+            self.upstream_limit.labels(upstream).set(limit)
+
+    def record_shed(self, upstream, reason):
+        if self.enabled:
+            self.upstream_shed.labels(upstream, reason).inc()
+
+    def set_circuit_state(self, upstream, state):
+        if self.enabled:
+            self.circuit_state.labels(upstream).set(state)
+
+    def record_hedge(self, upstream, result):
+        if self.enabled:
+            self.hedges.labels(upstream, result).inc()
+
+    def set_endpoint_state(self, endpoint, outstanding, health):
+        if self.enabled:
+            self.endpoint_outstanding.labels(endpoint).set(outstanding)
+            self.endpoint_health.labels(endpoint).set(health)
+
+    def record_endpoint_call(self, endpoint, outcome, seconds):
+        if self.enabled:
+            self.endpoint_calls.labels(endpoint, outcome).observe(seconds)
+
+    def record_cache(self, cache, hit):
+        if self.enabled:
+            self.cache_events.labels(cache, 'hit' if hit else 'miss').inc()
+
+    def set_admission_state(self, route_class, in_flight, queued):
+        if self.enabled:
+            self.admission_in_flight.labels(route_class).set(in_flight)
+            self.admission_queued.labels(route_class).set(queued)
+
+    def record_admission_rejected(self, route_class, reason):
+        if self.enabled:
+            self.admission_rejected.labels(route_class, reason).inc()
+
+    def observe_admission_backlog(self, route_class, seconds):
+        if self.enabled:
+            self.admission_backlog.labels(route_class).observe(seconds)
+
+
+metrics = Metrics()
@@ -0,0 +1,171 @@
+import os
+import sys
+import time
+import uuid
+import itertools
+import threading
+from collections import Counter
+from flask import g, request
+
+
+def _frame_label(code):
+    path = code.co_filename.replace('\\', '/').split('/')
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame):
+    """Render a frame and its callers as a root-first `a;b;c` collapsed stack"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Samples the stacks of registered threads from a background thread.
+
+    The sampler only wakes up while at least one thread is registered, so
+    there is no cost when nothing is being profiled.
+    """
+
+    def __init__(self, interval_ms=5):
+        self.interval = interval_ms / 1000.0
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                targets = dict(self._targets)
+                if not targets:
+                    self._wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            for thread_id, counter in targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    counter[collapse_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfilingMiddleware:
+    """Profiles 1 in N requests, or requests carrying an authorized X-Profile header.
+
+    Each profile is written as flamegraph-compatible collapsed stacks to
+    PROFILING_DIR, keeping at most PROFILING_MAX_FILES files.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+        self.sample_every = int(os.getenv('PROFILING_SAMPLE_EVERY', 0))
+        self.directory = os.getenv('PROFILING_DIR', 'logs/profiles')
+        self.max_files = int(os.getenv('PROFILING_MAX_FILES', 200))
+        self.profiler = SamplingProfiler(float(os.getenv('PROFILING_INTERVAL_MS', 5)))
+        self._counter = itertools.count(1)
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self.before_request)
+        app.teardown_request(self.teardown_request)
+
+    def should_profile(self):
+        header = request.headers.get('X-Profile')
+        if header:
+            # Header-triggered profiles require the admin API key to be configured and match
+            api_key = os.getenv('API_KEY')
+            return bool(api_key) and header == api_key
+        return self.sample_every > 0 and next(self._counter) % self.sample_every == 0
+
+    def before_request(self):
+        if not self.should_profile():
+            return
+        g._profile = {
+            'id': uuid.uuid4().hex[:12],
+            'thread_id': threading.get_ident(),
+            'started': time.perf_counter()
+        }
+        self.profiler.start(g._profile['thread_id'])
+
+    def teardown_request(self, exc=None):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        stacks = self.profiler.stop(profile['thread_id'])
+        duration_ms = (time.perf_counter() - profile['started']) * 1000
+        if stacks:
+            try:
+                self._write(profile['id'], request.endpoint or 'unknown', duration_ms, stacks)
+            except OSError as e:
+                print(f"Error writing profile {profile['id']}: {e}")
+
+    def _write(self, profile_id, endpoint, duration_ms, stacks):
+        filename = f"{int(time.time() * 1000)}_{os.getpid()}_{endpoint}_{int(duration_ms)}ms_{profile_id}.collapsed"
+        with open(os.path.join(self.directory, filename), 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self._rotate()
+
+    def _rotate(self):
+        files = sorted(f for f in os.listdir(self.directory) if f.endswith('.collapsed'))
+        for old in files[:-self.max_files] if len(files) > self.max_files else []:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+
+    def list_profiles(self):
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for filename in sorted(os.listdir(self.directory), reverse=True):
+            if not filename.endswith('.collapsed'):
+                continue
+            parts = filename[:-len('.collapsed')].split('_')
+            if len(parts) < 5:
+                continue
+            profiles.append({
+                'id': parts[-1],
+                'file': filename,
+                'timestamp': int(parts[0]),
+                'pid': int(parts[1]),
+                'endpoint': '_'.join(parts[2:-2]),
+                'duration_ms': int(parts[-2].rstrip('ms'))
+            })
+        return profiles
+
+    def aggregate(self, endpoint=None, limit=None):
+        """Merge collapsed stacks from stored profiles, optionally for one endpoint"""
+        totals = Counter()
+        profiles = [p for p in self.list_profiles() if not endpoint or p['endpoint'] == endpoint]
+        for profile in profiles[:limit] if limit else profiles:
+            try:
+                with open(os.path.join(self.directory, profile['file'])) as f:
+                    for line in f:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        if stack and count.isdigit():
+                            totals[stack] += int(count)
+            except OSError:
+                continue
+        return totals
+
+
+profiling = ProfilingMiddleware()
@@ -0,0 +1,157 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from limits.storage import MovingWindowSupport, Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS window_entries (key TEXT NOT NULL, ts REAL NOT NULL, expires_at REAL NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS window_entries_key_ts ON window_entries (key, ts);
+"""
+
+# Databases created before window entries carried their own expiry
+MIGRATIONS = {
+    ('window_entries', 'expires_at'): 'ALTER TABLE window_entries ADD COLUMN expires_at REAL NOT NULL DEFAULT 0',
+}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS window_entries_expires_at ON window_entries (expires_at);
+"""
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """Rate limit storage shared by every process on the host, with no external service.
+
+    Registered with `limits` as the `sqlite://` scheme, e.g.
+    `sqlite:////dev/shm/veron-ratelimit.db` (SQLAlchemy-style: three slashes
+    for a relative path, four for an absolute one). Each check runs in a
+    `BEGIN IMMEDIATE` transaction so increments and moving-window entries are
+    atomic across gunicorn workers; WAL mode with synchronous=NORMAL keeps
+    that to a few tens of microseconds on local disk or tmpfs. Window
+    entries store their own expiry, so the periodic purge is correct for
+    every limit whichever worker runs it.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len('sqlite:///'):] if uri and uri.startswith('sqlite:///') else 'ratelimit.db'
+        self.timeout = float(options.get('timeout', 5))
+        self.purge_every = int(options.get('purge_every', 1000))
+        self._local = threading.local()
+        self._operations = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = self._connection()
+        db.executescript(SCHEMA)
+        for (table, column), statement in MIGRATIONS.items():
+            if column not in {row[1] for row in db.execute(f'PRAGMA table_info({table})')}:
+                db.execute(statement)
+        db.executescript(INDEXES)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork (gunicorn preload)
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _maybe_purge(self, db, now):
+        self._operations += 1
+        if self._operations % self.purge_every == 0:
+            db.execute('DELETE FROM counters WHERE expires_at <= ?', (now,))
+            db.execute('DELETE FROM window_entries WHERE expires_at <= ?', (now,))
+
+    # Fixed window
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute('SELECT value, expires_at FROM counters WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] <= now:
+                value, expires_at = amount, now + expiry
+            else:
+                value, expires_at = row[0] + amount, now + expiry if elastic_expiry else row[1]
+            db.execute('INSERT OR REPLACE INTO counters (key, value, expires_at) VALUES (?, ?, ?)',
+                       (key, value, expires_at))
+            self._maybe_purge(db, now)
+        return value
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM counters WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connection().execute(
+            'SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    # Moving window
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._transaction() as db:
+            db.execute('DELETE FROM window_entries WHERE key = ? AND ts <= ?', (key, now - expiry))
+            count = db.execute('SELECT COUNT(*) FROM window_entries WHERE key = ?', (key,)).fetchone()[0]
+            if count + amount > limit:
+                return False
+            db.executemany('INSERT INTO window_entries (key, ts, expires_at) VALUES (?, ?, ?)',
+                           [(key, now, now + expiry)] * amount)
+            self._maybe_purge(db, now)
+        return True
+
+    def get_moving_window(self, key, limit, expiry):
+        now = time.time()
+        oldest, count = self._connection().execute(
+            'SELECT MIN(ts), COUNT(*) FROM window_entries WHERE key = ? AND ts > ?', (key, now - expiry)
+        ).fetchone()
+        return (oldest if count else now), count
+
+    # Maintenance
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._transaction() as db:
+            removed = db.execute('DELETE FROM counters').rowcount
+            removed += db.execute('DELETE FROM window_entries').rowcount
+        return removed
+
+    def clear(self, key):
+        with self._transaction() as db:
+            db.execute('DELETE FROM counters WHERE key = ?', (key,))
+            db.execute('DELETE FROM window_entries WHERE key = ?', (key,))
@@ -1,12 +1,42 @@
 import os
+import tempfile
+from flask import g
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+# Registers the sqlite:// storage scheme with `limits`
+import middleware.rate_limit_storage  # noqa: F401
 
 window_ms = int(os.getenv('RATE_LIMIT_WINDOW_MS', 900000))
 max_requests = int(os.getenv('RATE_LIMIT_MAX_REQUESTS', 100))
 
-limiter = Limiter(
+# Shared by all gunicorn workers on the host by default, so limits are not multiplied
+# per worker. Use memory:// for a single process or redis://host:6379 across hosts.
+storage_uri = os.getenv(
+    'RATE_LIMIT_STORAGE_URI',
+    'sqlite:///' + os.path.join(tempfile.gettempdir(), 'veron-ratelimit.db')
+)
+
+
+class VeronLimiter(Limiter):
+    def init_app(self, app):
+        # Registered before flask-limiter's own hook so it runs after it: the limiter
+        # overwrites Retry-After on every response with its window reset time
+        app.after_request(restore_retry_after)
+        super().init_app(app)
+
+
+def restore_retry_after(response):
+    """Keep the Retry-After chosen by handle_upstream_unavailable() for upstream 503s and 504s"""
+    retry_after = g.pop('_upstream_retry_after', None)
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+limiter = VeronLimiter(
     get_remote_address,
     default_limits=[f"{max_requests} per {window_ms // 60000} minutes"],
     headers_enabled=True,
-) 
\ No newline at end of file
+    storage_uri=storage_uri,
+    strategy=os.getenv('RATE_LIMIT_STRATEGY', 'moving-window'),
+)
@@ -29,6 +29,9 @@ class SecurityMiddleware:
             r'exec\(',
             r'system\(',
         ]
+        # One pass over the text instead of one search per pattern; DOTALL so a
+        # pattern can span fields and lines like it did over str(data)
+        self.suspicious_regex = re.compile('|'.join(self.suspicious_patterns), re.IGNORECASE | re.DOTALL)
         self.max_requests_per_ip = int(os.getenv('MAX_REQUESTS_PER_IP', '100'))
         self.time_window = int(os.getenv('TIME_WINDOW_SECONDS', '3600'))
         
@@ -36,12 +39,23 @@ class SecurityMiddleware:
         """Check if request contains suspicious patterns"""
         if not data:
             return False
-            
-        data_str = str(data).lower()
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, data_str, re.IGNORECASE):
-                return True
-        return False
+        return self.suspicious_regex.search('\n'.join(self._strings(data))) is not None
+
+    def _strings(self, data):
+        """Keys and values of parsed JSON, without building its repr"""
+        if isinstance(data, str):
+            yield data
+        elif isinstance(data, bytes):
+            yield data.decode('latin-1')
+        elif isinstance(data, dict):
+            for key, value in data.items():
+                yield from self._strings(key)
+                yield from self._strings(value)
+        elif isinstance(data, (list, tuple)):
+            for value in data:
+                yield from self._strings(value)
+        elif data is not None:
+            yield str(data)
     
     def track_ip_requests(self, ip):
         """Track requests per IP and detect abuse"""
@@ -0,0 +1,84 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from flask import current_app, g, has_request_context
+
+_NOOP = nullcontext()
+
+
+class ServerTiming:
+    """Per-request phase timing emitted as a Server-Timing response header.
+
+    Stages register named spans with `server_timing.span('name')`. Spans with
+    the same name are summed. When SERVER_TIMING_ENABLED is false, span()
+    returns a shared no-op context manager and no hooks are registered.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+        # Also add the breakdown to JSON bodies as `debug.timing`
+        self.debug_json = os.getenv('SERVER_TIMING_DEBUG', 'false').lower() == 'true'
+
+    def init_app(self, app):
+        """Register hooks; call before other before_request handlers so they are included in `total`"""
+        if not self.enabled:
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def span(self, name):
+        if not self.enabled or not has_request_context():
+            return _NOOP
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def timed(self, name):
+        """Decorator form of span(), e.g. for before_request handlers"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                with self.span(name):
+                    return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    def record(self, name, duration_ms):
+        spans = g.get('_server_timing_spans')
+        if spans is not None:
+            spans[name] = spans.get(name, 0.0) + duration_ms
+
+    def _start(self):
+        g._server_timing_started = time.perf_counter()
+        g._server_timing_spans = {}
+
+    def _finish(self, response):
+        spans = g.get('_server_timing_spans')
+        if spans is None:
+            return response
+        spans['total'] = (time.perf_counter() - g._server_timing_started) * 1000
+
+        response.headers['Server-Timing'] = ', '.join(
+            f'{name};dur={duration:.1f}' for name, duration in spans.items()
+        )
+
+        if self.debug_json and response.is_json and not response.direct_passthrough:
+            body = response.get_json(silent=True)
+            if isinstance(body, dict):
+                body.setdefault('debug', {})['timing'] = {name: round(d, 2) for name, d in spans.items()}
+                response.set_data(current_app.json.dumps(body))
+                # Same resource, different bytes: a strong ETag no longer holds
+                etag, weak = response.get_etag()
+                if etag and not weak:
+                    response.set_etag(etag, weak=True)
+        return response
+
+
+server_timing = ServerTiming()
@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import queue
+import random
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import unquote
+
+import requests
+from flask import g, request
+
+SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar('veron_current_span', default=None)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Span:
+    """A single timed operation, shaped after OpenTelemetry spans"""
+
+    def __init__(self, name, trace_id, span_id, parent_id=None, kind='internal', sampled=True, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = None
+        self.status_message = ''
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key, value):
+        if self.sampled and value is not None:
+            self.attributes[key] = value
+
+    def add_event(self, name, attributes=None):
+        if self.sampled:
+            self.events.append({'name': name, 'time_ns': time.time_ns(), 'attributes': attributes or {}})
+
+    def record_exception(self, error):
+        self.status = STATUS_ERROR
+        self.status_message = str(error)[:500]
+        self.add_event('exception', {'exception.type': type(error).__name__, 'exception.message': str(error)[:500]})
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            'attributes': self.attributes,
+            'events': self.events,
+            'status': 'error' if self.status == STATUS_ERROR else 'ok'
+        }
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KINDS.get(self.kind, 1),
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or self.start_ns),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in self.attributes.items()],
+            'events': [{
+                'name': e['name'],
+                'timeUnixNano': str(e['time_ns']),
+                'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in e['attributes'].items()]
+            } for e in self.events],
+            'status': {'code': self.status or STATUS_OK, 'message': self.status_message}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def otlp_payload(spans, service_name):
+    """Wrap spans in an OTLP/JSON ExportTraceServiceRequest"""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'veron.tracing'}, 'spans': [s.to_otlp() for s in spans]}]
+        }]
+    }
+
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans for inspection through /api/tracing"""
+
+    def __init__(self, max_spans=5000):
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self.spans.extend(spans)
+
+    def get_trace(self, trace_id):
+        with self._lock:
+            return [s.to_dict() for s in self.spans if s.trace_id == trace_id]
+
+    def recent_traces(self, limit=50):
+        """Root spans of the most recent traces, newest first"""
+        with self._lock:
+            roots = [s for s in self.spans if s.parent_id is None or s.kind == 'server']
+        return [s.to_dict() for s in reversed(roots)][:limit]
+
+
+class FileExporter:
+    """Appends OTLP/JSON batches, one per line, to a local file"""
+
+    def __init__(self, path, service_name):
+        self.path = path
+        self.service_name = service_name
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(otlp_payload(spans, self.service_name)) + '\n')
+
+
+class OTLPHttpExporter:
+    """Posts OTLP/JSON batches to an OTLP/HTTP collector (or the emulator's stand-in)"""
+
+    def __init__(self, endpoint, service_name, timeout=5):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def export(self, spans):
+        self.session.post(self.endpoint, json=otlp_payload(spans, self.service_name), timeout=self.timeout)
+
+
+class BatchSpanProcessor:
+    """Hands finished spans to slow exporters from a background thread"""
+
+    def __init__(self, exporter, max_queue=4096, batch_size=256, interval=1.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._thread.start()
+
+    def on_end(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                print(f"Span export error: {e}")
+
+
+class Tracer:
+    """Minimal OpenTelemetry-style tracer.
+
+    Spans propagate through a contextvar, incoming W3C `traceparent` headers
+    are honoured, and new traces are sampled with TRACING_SAMPLE_RATIO.
+    Exporters are chosen with TRACING_EXPORTERS (memory, file, otlp).
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+        self.sample_ratio = float(os.getenv('TRACING_SAMPLE_RATIO', 1.0))
+        self.service_name = os.getenv('TRACING_SERVICE_NAME', 'veron-backend')
+        self.memory_exporter = None
+        self.processors = []
+        if not self.enabled:
+            return
+
+        exporters = [e.strip() for e in os.getenv('TRACING_EXPORTERS', 'memory').split(',') if e.strip()]
+        if 'memory' in exporters:
+            self.memory_exporter = InMemoryExporter(int(os.getenv('TRACING_MEMORY_SPANS', 5000)))
+        if 'file' in exporters:
+            self.processors.append(BatchSpanProcessor(
+                FileExporter(os.getenv('TRACING_FILE', 'logs/traces.jsonl'), self.service_name)
+            ))
+        if 'otlp' in exporters:
+            self.processors.append(BatchSpanProcessor(
+                OTLPHttpExporter(os.getenv('OTLP_ENDPOINT', 'http://localhost:4318/v1/traces'), self.service_name)
+            ))
+
+    def current_span(self):
+        return _current_span.get()
+
+    def start_span(self, name, kind='internal', attributes=None, parent=None):
+        """Start a span as a child of `parent` (or the current span); call end_span() when done"""
+        parent = parent or _current_span.get()
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = random.random() < self.sample_ratio
+        return Span(name, trace_id, os.urandom(8).hex(), parent_id, kind, sampled, attributes)
+
+    def end_span(self, span):
+        span.end_ns = time.time_ns()
+        if not span.sampled:
+            return
+        if self.memory_exporter is not None:
+            self.memory_exporter.export([span])
+        for processor in self.processors:
+            processor.on_end(span)
+
+    @contextmanager
+    def span(self, name, kind='internal', attributes=None):
+        """Context manager that makes the new span current for nested spans"""
+        if not self.enabled:
+            yield None
+            return
+        span = self.start_span(name, kind, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def traced(self, name):
+        """Decorator form of span(), e.g. for before_request handlers"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                with self.span(name):
+                    return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    def run_in_context(self, fn):
+        """Wrap `fn` so it runs with the caller's current span (for thread pools)"""
+        ctx = contextvars.copy_context()
+        return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+    def parse_traceparent(self, header):
+        """Parse a W3C traceparent header into a remote parent span, or None"""
+        parts = (header or '').strip().split('-')
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            int(parts[1], 16)
+            int(parts[2], 16)
+            flags = int(parts[3], 16)
+        except ValueError:
+            return None
+        if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+            return None
+        return Span('remote', parts[1], parts[2], sampled=bool(flags & 1))
+
+    # Flask integration
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        parent = self.parse_traceparent(request.headers.get('traceparent'))
+        span = self.start_span(
+            f"{request.method} {request.url_rule.rule if request.url_rule else request.path}",
+            kind='server',
+            parent=parent,
+            attributes={
+                'http.method': request.method,
+                'http.target': request.path,
+                'http.route': request.url_rule.rule if request.url_rule else '',
+                'http.user_agent': request.headers.get('User-Agent', '')
+            }
+        )
+        g._trace_span = span
+        g._trace_token = _current_span.set(span)
+
+    def _after_request(self, response):
+        span = g.get('_trace_span')
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                span.status = STATUS_ERROR
+            response.headers['traceparent'] = span.traceparent
+        return response
+
+    def _teardown_request(self, exc=None):
+        span = g.pop('_trace_span', None)
+        if span is None:
+            return
+        if exc is not None:
+            span.record_exception(exc)
+        token = g.pop('_trace_token', None)
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                _current_span.set(None)
+        self.end_span(span)
+
+    # boto3 integration
+
+    def instrument_boto3_client(self, client):
+        """Emit a client span for every API call made through a boto3 client"""
+        if not self.enabled:
+            return client
+        service = client.meta.service_model.service_id.hyphenize()
+        region = client.meta.region_name
+
+        def before_call(model, params, context, **kwargs):
+            context['_veron_span'] = self.start_span(f"{service}.{model.name}", kind='client', attributes={
+                'rpc.system': 'aws-api',
+                'rpc.service': service,
+                'rpc.method': model.name,
+                'aws.region': region,
+                'aws.model_id': unquote(params.get('url_path', '').split('/')[2]) if model.name.startswith('InvokeModel') else None
+            })
+
+        def after_call(http_response, parsed, model, context, **kwargs):
+            span = context.pop('_veron_span', None)
+            if span is None:
+                return
+            span.set_attribute('http.status_code', http_response.status_code)
+            span.set_attribute('aws.request_id', parsed.get('ResponseMetadata', {}).get('RequestId'))
+            if http_response.status_code >= 300:
+                span.status = STATUS_ERROR
+                span.status_message = parsed.get('Error', {}).get('Code', '')
+            self.end_span(span)
+
+        def after_call_error(exception, context, **kwargs):
+            span = context.pop('_veron_span', None)
+            if span is not None:
+                span.record_exception(exception)
+                self.end_span(span)
+
+        client.meta.events.register(f'before-call.{service}', before_call)
+        client.meta.events.register(f'after-call.{service}', after_call)
+        client.meta.events.register(f'after-call-error.{service}', after_call_error)
+        return client
+
+
+tracer = Tracer()
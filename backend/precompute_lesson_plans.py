@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Precompute lesson plans into the lesson-plan store so the first request for
+each plan is served from cache.
+
+Generates every topic x level x duration combination in parallel, spaced to
+at most --rate requests per second. Plans already in the store are skipped,
+so an interrupted run picks up where it left off (use --force to regenerate).
+Precomputed plans never expire unless --ttl is given. Store keys include
+BEDROCK_MODEL_ID, so run this with the same model id as the servers.
+
+    python precompute_lesson_plans.py --topics-file topics.txt
+    python precompute_lesson_plans.py --topics "IoT sensors,Edge AI" --durations 45,90 --rate 2
+
+Exits with status 1 when any plan could not be generated.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+LEVELS = ['beginner', 'intermediate', 'advanced']
+DURATIONS = [30, 45, 60, 90]
+
+
+class RateLimiter:
+    """Spaces calls evenly at `rate` per second across threads (0 = unlimited)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self.next_at)
+            self.next_at = start_at + self.interval
+        time.sleep(start_at - now)
+
+
+def read_topics(args):
+    topics = [t.strip() for t in (args.topics or '').split(',') if t.strip()]
+    if args.topics_file:
+        with open(args.topics_file, encoding='utf-8') as f:
+            topics += [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    # Keep the first spelling of topics that share a store key
+    seen = set()
+    unique = []
+    for topic in topics:
+        normalized = ' '.join(topic.lower().split())
+        if normalized not in seen:
+            seen.add(normalized)
+            unique.append(topic)
+    return unique
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute lesson plans into the lesson-plan store')
+    parser.add_argument('--topics', default='', help='Comma separated topics')
+    parser.add_argument('--topics-file', default=None, help='File with one topic per line (# comments allowed)')
+    parser.add_argument('--levels', default=','.join(LEVELS))
+    parser.add_argument('--durations', default=','.join(str(d) for d in DURATIONS), help='Minutes, comma separated')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=1.0, help='Max Bedrock requests per second (0 = unlimited)')
+    parser.add_argument('--retries', type=int, default=3, help='Retries per plan when Bedrock is busy')
+    parser.add_argument('--force', action='store_true', help='Regenerate plans that are already stored')
+    parser.add_argument('--ttl', type=int, default=0,
+                        help='Seconds until precomputed plans expire (0 = never, unlike LESSON_PLAN_STORE_TTL)')
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would be generated')
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Imported after .env is loaded: the services configure themselves from the environment
+    from services.bedrock_service import bedrock_service
+    from services.concurrency_limiter import BACKGROUND
+    from services.resilience import UpstreamUnavailable
+    from services.response_store import lesson_plan_store, lesson_plan_key
+
+    topics = read_topics(args)
+    levels = [l.strip() for l in args.levels.split(',') if l.strip()]
+    durations = [int(d) for d in args.durations.split(',') if d.strip()]
+    if not topics:
+        parser.error('No topics given (use --topics or --topics-file)')
+    unknown = [l for l in levels if l not in LEVELS]
+    if unknown:
+        parser.error(f"Unknown levels: {', '.join(unknown)}")
+    if any(not 15 <= d <= 180 for d in durations):
+        parser.error('Durations must be between 15 and 180 minutes')
+    if args.ttl < 0:
+        parser.error('--ttl must be 0 or more seconds')
+
+    matrix = [(t, l, d) for t in topics for l in levels for d in durations]
+    pending = [combo for combo in matrix if args.force or not lesson_plan_store.contains(lesson_plan_key(*combo))]
+    print(f"🔧 Model {os.getenv('BEDROCK_MODEL_ID')}: {len(matrix)} lesson plans, {len(matrix) - len(pending)} already stored, {len(pending)} to generate")
+    if args.dry_run or not pending:
+        return
+
+    limiter = RateLimiter(args.rate)
+
+    def generate(topic, level, duration):
+        for attempt in range(args.retries + 1):
+            limiter.wait()
+            try:
+                plan = bedrock_service.generate_lesson_plan(topic, level, duration, priority=BACKGROUND)
+            except UpstreamUnavailable as e:
+                if attempt == args.retries:
+                    raise
+                time.sleep(e.retry_after)
+                continue
+            lesson_plan_store.put(lesson_plan_key(topic, level, duration), plan, ttl=args.ttl)
+            return
+
+    started = time.monotonic()
+    failed = 0
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+    try:
+        futures = {executor.submit(generate, *combo): combo for combo in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            topic, level, duration = futures[future]
+            try:
+                future.result()
+                status = '✅'
+            except Exception as e:
+                failed += 1
+                status = f'❌ {e}'
+            print(f"[{done}/{len(pending)}] {topic} / {level} / {duration} min {status}")
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted; finished plans are stored, rerun to resume")
+        executor.shutdown(wait=False, cancel_futures=True)
+        sys.exit(130)
+    executor.shutdown()
+
+    elapsed = time.monotonic() - started
+    print(f"\nGenerated {len(pending) - failed} plans in {elapsed:.1f}s ({failed} failed)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,19 @@
 import os
+import json
+import base64
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from flask import Blueprint, request, jsonify
 from marshmallow import Schema, fields, ValidationError
 from services.bedrock_agent_service import get_bedrock_agent_service
-from services.file_processor import file_processor
-from middleware.error_handler import handle_error, handle_validation_error
+from services.file_processor import file_processor, file_version, SORT_KEYS
+from services.agent_trace_store import agent_trace_store
+from services.resilience import UpstreamUnavailable
+from middleware.idempotency import idempotent
+from middleware.conditional import conditional_response, resource_etag
+from middleware.error_handler import handle_error, handle_validation_error, handle_upstream_unavailable
+from middleware.server_timing import server_timing
+from middleware.security_middleware import validate_api_key
 
 agent_bp = Blueprint('agent', __name__)
 
@@ -16,17 +24,70 @@ class AgentMessageSchema(Schema):
 class SessionSchema(Schema):
     session_id = fields.Str(required=True)
 
+FILES_PAGE_SIZE = int(os.getenv('FILES_PAGE_SIZE', 50))
+FILES_MAX_PAGE_SIZE = int(os.getenv('FILES_MAX_PAGE_SIZE', 500))
+
+# Fields of each entry in GET /files (fields= picks a subset)
+LIST_FIELDS = ('id', 'original_filename', 'file_size', 'file_type', 'processed_at',
+               'word_count', 'text_length', 'keywords', 'summary')
+
+def field_list(value):
+    return [f.strip() for f in value.split(',') if f.strip()]
+
+class FileListSchema(Schema):
+    limit = fields.Int(missing=FILES_PAGE_SIZE, validate=lambda x: 1 <= x <= FILES_MAX_PAGE_SIZE)
+    cursor = fields.Str(missing=None)
+    sort = fields.Str(missing='processed_at', validate=lambda x: x in SORT_KEYS)
+    order = fields.Str(missing='desc', validate=lambda x: x in ['asc', 'desc'])
+    projection = fields.Str(data_key='fields', missing=None, validate=lambda x: all(f in LIST_FIELDS for f in field_list(x)))
+
+class FileDetailSchema(Schema):
+    projection = fields.Str(data_key='fields', missing=None)
+    text_offset = fields.Int(missing=0, validate=lambda x: x >= 0)
+    text_limit = fields.Int(missing=None, validate=lambda x: x >= 0)
+
+def encode_cursor(sort, order, after):
+    payload = json.dumps([sort, order, after], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort, order):
+    """Keyset of a cursor from a previous page; it must come from the same sort and order"""
+    try:
+        cursor_sort, cursor_order, after = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValidationError({'cursor': ['Invalid cursor.']})
+    if (cursor_sort, cursor_order) != (sort, order) or not isinstance(after, list) or len(after) != 2:
+        raise ValidationError({'cursor': ['Cursor does not match this sort and order.']})
+    return after
+
+def list_entry(file_data):
+    summary = file_data['summary']
+    return {
+        'id': file_data['id'],
+        'original_filename': file_data['original_filename'],
+        'file_size': file_data['file_size'],
+        'file_type': file_data['file_type'],
+        'processed_at': file_data['processed_at'],
+        'word_count': file_data['word_count'],
+        'text_length': file_data['text_length'],
+        'keywords': file_data['keywords'][:10],  # First 10 keywords
+        'summary': summary[:300] + "..." if len(summary) > 300 else summary
+    }
+
 @agent_bp.route('/chat', methods=['POST'])
+@idempotent
 def agent_chat():
     try:
-        schema = AgentMessageSchema()
-        data = schema.load(request.json)
+        with server_timing.span('validate'):
+            schema = AgentMessageSchema()
+            data = schema.load(request.json)
         
         message = data['message']
         session_id = data.get('session_id')
 
         # Get relevant context from uploaded files
-        file_context = file_processor.get_context_for_agent(message)
+        with server_timing.span('retrieval'):
+            file_context = file_processor.get_context_for_agent(message)
         
         # Enhance the message with file context if available
         enhanced_message = message
@@ -38,22 +99,26 @@ User Question: {message}
 
 Please answer the user's question using the context from the uploaded files when relevant."""
 
-        response = get_bedrock_agent_service().invoke_agent(enhanced_message, session_id)
+        with server_timing.span('bedrock'):
+            response = get_bedrock_agent_service().invoke_agent(enhanced_message, session_id)
 
-        return jsonify({
-            'success': True,
-            'data': {
-                'message': response['response'],
-                'session_id': response['session_id'],
-                'timestamp': response['timestamp'],
-                'trace_info': response.get('trace_info', []),
-                'used_file_context': bool(file_context),
-                'context_files_count': len(file_processor.get_all_processed_files())
-            }
-        })
+        with server_timing.span('serialize'):
+            return jsonify({
+                'success': True,
+                'data': {
+                    'message': response['response'],
+                    'session_id': response['session_id'],
+                    'timestamp': response['timestamp'],
+                    'trace_captured': response.get('trace_captured', False),
+                    'used_file_context': bool(file_context),
+                    'context_files_count': len(file_processor.get_all_processed_files())
+                }
+            })
 
     except ValidationError as e:
         return handle_validation_error(e.messages)
+    except UpstreamUnavailable as e:
+        return handle_upstream_unavailable(e)
     except Exception as e:
         print(f"Agent chat error: {e}")
         return handle_error('Failed to get response from agent. Please try again.', 500)
@@ -103,6 +168,43 @@ def get_session_info(session_id):
         print(f"Session info error: {e}")
         return handle_error('Failed to get session information. Please try again.', 500)
 
+@agent_bp.route('/session/<session_id>/traces', methods=['GET'])
+@validate_api_key
+def get_session_traces(session_id):
+    """Agent traces captured for a session (sampled or explicitly enabled)"""
+    traces = agent_trace_store.get(session_id)
+    if traces is None:
+        return jsonify({
+            'success': False,
+            'error': 'No traces captured for this session'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'session_id': session_id,
+            'capture_enabled': agent_trace_store.is_session_enabled(session_id),
+            'traces': traces
+        }
+    })
+
+@agent_bp.route('/session/<session_id>/traces', methods=['PUT', 'DELETE'])
+@validate_api_key
+def set_session_trace_capture(session_id):
+    """Turn trace capture on (PUT) or off and discard captured traces (DELETE)"""
+    if request.method == 'PUT':
+        agent_trace_store.enable_session(session_id)
+    else:
+        agent_trace_store.clear(session_id)
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'session_id': session_id,
+            'capture_enabled': request.method == 'PUT'
+        }
+    })
+
 @agent_bp.route('/sessions', methods=['GET'])
 def list_active_sessions():
     try:
@@ -241,7 +343,8 @@ def upload_file():
         file.save(filepath)
         
         # Process the file to extract text and create index
-        processed_file = file_processor.process_file(unique_filename, filename)
+        with server_timing.span('ingest'):
+            processed_file = file_processor.process_file(unique_filename, filename)
         
         response_data = {
             'filename': filename,
@@ -275,35 +378,34 @@ def upload_file():
 @agent_bp.route('/files', methods=['GET'])
 def list_files():
     try:
-        files = file_processor.get_all_processed_files()
-        
-        # Clean up file data for response (remove full text)
-        cleaned_files = []
-        for file_data in files:
-            if 'error' not in file_data:
-                cleaned_file = {
-                    'id': file_data['id'],
-                    'original_filename': file_data['original_filename'],
-                    'file_size': file_data['file_size'],
-                    'file_type': file_data['file_type'],
-                    'processed_at': file_data['processed_at'],
-                    'word_count': file_data['word_count'],
-                    'text_length': file_data['text_length'],
-                    'keywords': file_data['keywords'][:10],  # First 10 keywords
-                    'summary': file_data['summary'][:300] + "..." if len(file_data['summary']) > 300 else file_data['summary']
-                }
-                cleaned_files.append(cleaned_file)
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'files': cleaned_files,
-                'total_files': len(cleaned_files),
-                'total_size': sum(f['file_size'] for f in cleaned_files),
-                'total_words': sum(f['word_count'] for f in cleaned_files)
-            }
-        })
+        params = FileListSchema().load(request.args)
+        after = decode_cursor(params['cursor'], params['sort'], params['order']) if params['cursor'] else None
+        try:
+            version, files, next_after, totals = file_processor.list_files(
+                params['sort'], params['order'] == 'desc', after, params['limit']
+            )
+        except ValueError as e:
+            raise ValidationError({'cursor': [str(e)]})
+        selected = field_list(params['projection']) if params['projection'] else None
+
+        def build():
+            entries = [list_entry(file_data) for file_data in files]
+            if selected:
+                entries = [{name: entry[name] for name in selected} for entry in entries]
+            return jsonify({
+                'success': True,
+                'data': dict(
+                    totals,
+                    files=entries,
+                    next_cursor=encode_cursor(params['sort'], params['order'], next_after) if next_after else None
+                )
+            })
+
+        # Unchanged index: 304 without building the page (the query string is part of the tag)
+        return conditional_response(resource_etag('files', version), build)
         
+    except ValidationError as e:
+        return handle_validation_error(e.messages)
     except Exception as e:
         print(f"List files error: {e}")
         return handle_error('Failed to list files. Please try again.', 500)
@@ -311,6 +413,7 @@ def list_files():
 @agent_bp.route('/files/<file_id>', methods=['GET'])
 def get_file_details(file_id):
     try:
+        params = FileDetailSchema().load(request.args)
         file_data = file_processor.get_file_by_id(file_id)
         
         if not file_data:
@@ -324,15 +427,32 @@ def get_file_details(file_id):
                 'success': False,
                 'error': f"File processing error: {file_data['error']}"
             }), 400
+
+        selected = field_list(params['projection']) if params['projection'] else list(file_data)
+        unknown = [name for name in selected if name not in file_data]
+        if unknown:
+            raise ValidationError({'fields': [f"Unknown fields: {', '.join(unknown)}"]})
+
+        def build():
+            file = {name: file_data[name] for name in selected}
+            # Ranged extracted_text: only the characters the client renders
+            if 'extracted_text' in file and (params['text_offset'] or params['text_limit'] is not None):
+                start = min(params['text_offset'], file_data['text_length'])
+                end = file_data['text_length'] if params['text_limit'] is None else \
+                    min(start + params['text_limit'], file_data['text_length'])
+                file['extracted_text'] = file_data['extracted_text'][start:end]
+                file['extracted_text_range'] = {'start': start, 'end': end, 'total': file_data['text_length']}
+            return jsonify({
+                'success': True,
+                'data': {
+                    'file': file
+                }
+            })
         
-        # Return full file data including extracted text
-        return jsonify({
-            'success': True,
-            'data': {
-                'file': file_data
-            }
-        })
+        return conditional_response(resource_etag('file', file_version(file_data)), build)
         
+    except ValidationError as e:
+        return handle_validation_error(e.messages)
     except Exception as e:
         print(f"Get file details error: {e}")
         return handle_error('Failed to get file details. Please try again.', 500)
@@ -409,23 +529,15 @@ def search_files():
 @agent_bp.route('/files/stats', methods=['GET'])
 def get_file_stats():
     try:
-        files = file_processor.get_all_processed_files()
-        
-        # Calculate statistics
-        total_files = len(files)
-        successful_files = len([f for f in files if 'error' not in f])
-        failed_files = total_files - successful_files
+        # Aggregates are maintained on ingest/delete; this is O(1) in corpus size
+        stats = file_processor.get_stats()
         
-        file_types = {}
-        total_size = 0
-        total_words = 0
-        
-        for file_data in files:
-            if 'error' not in file_data:
-                file_type = file_data['file_type']
-                file_types[file_type] = file_types.get(file_type, 0) + 1
-                total_size += file_data['file_size']
-                total_words += file_data['word_count']
+        # Failed ingestions never enter the index, so they come from the ingestion counters
+        successful_files = stats['total_files']
+        failed_files = stats['ingested']['failed']
+        total_files = successful_files + failed_files
+        total_size = stats['total_size']
+        total_words = stats['total_words']
         
         return jsonify({
             'success': True,
@@ -433,12 +545,14 @@ def get_file_stats():
                 'total_files': total_files,
                 'successful_files': successful_files,
                 'failed_files': failed_files,
-                'file_types': file_types,
+                'file_types': stats['file_types'],
                 'total_size_bytes': total_size,
                 'total_size_mb': round(total_size / (1024 * 1024), 2),
                 'total_words': total_words,
                 'average_words_per_file': round(total_words / successful_files, 2) if successful_files > 0 else 0,
-                'processing_success_rate': round((successful_files / total_files) * 100, 2) if total_files > 0 else 0
+                'processing_success_rate': round((successful_files / total_files) * 100, 2) if total_files > 0 else 0,
+                'index_version': stats['index_version'],
+                'ingestion': stats['ingestion']
             }
         })
         
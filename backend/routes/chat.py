@@ -1,14 +1,29 @@
 import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from marshmallow import Schema, fields, ValidationError
 from services.bedrock_service import bedrock_service
-from middleware.error_handler import handle_error, handle_validation_error
+from services.concurrency_limiter import NORMAL
+from services.conversation_store import conversation_store
+from middleware.deadline import deadline
+from middleware.metrics import metrics
+from middleware.rate_limiter import limiter, max_requests, window_ms
+from middleware.server_timing import server_timing
+from middleware.tracing import tracer
+from services.resilience import UpstreamUnavailable
+from services.response_store import lesson_plan_store, lesson_plan_key
+from middleware.idempotency import idempotent
+from middleware.error_handler import handle_error, handle_validation_error, handle_upstream_unavailable, UPSTREAM_MESSAGES
 
 chat_bp = Blueprint('chat', __name__)
 
 class ChatMessageSchema(Schema):
     message = fields.Str(required=True, validate=lambda x: 1 <= len(x) <= 5000)
+    conversationId = fields.Str(missing=None)
+    # Deprecated: only used to seed a new server-side conversation
     conversationHistory = fields.List(fields.Dict(), missing=[])
     context = fields.Str(missing='')
 
@@ -17,68 +32,248 @@ class LessonPlanSchema(Schema):
     level = fields.Str(required=True, validate=lambda x: x in ['beginner', 'intermediate', 'advanced'])
     duration = fields.Int(required=True, validate=lambda x: 15 <= x <= 180)
 
+BATCH_MAX_ITEMS = int(os.getenv('CHAT_BATCH_MAX_ITEMS', 50))
+BATCH_MAX_CONCURRENCY = int(os.getenv('CHAT_BATCH_MAX_CONCURRENCY', 4))
+# Counted per item, so a batch uses the same budget as sending its items one by one
+BATCH_RATE_LIMIT = os.getenv('CHAT_BATCH_RATE_LIMIT', f"{max_requests} per {window_ms // 60000} minutes")
+
+class BatchSchema(Schema):
+    items = fields.List(fields.Dict(), required=True, validate=lambda x: 1 <= len(x) <= BATCH_MAX_ITEMS)
+    concurrency = fields.Int(missing=BATCH_MAX_CONCURRENCY, validate=lambda x: 1 <= x <= BATCH_MAX_CONCURRENCY)
+
+class BatchMessageSchema(Schema):
+    id = fields.Str(missing=None)
+    type = fields.Str(missing='message')
+    message = fields.Str(required=True, validate=lambda x: 1 <= len(x) <= 5000)
+    context = fields.Str(missing='')
+
+class BatchLessonPlanSchema(LessonPlanSchema):
+    id = fields.Str(missing=None)
+    type = fields.Str(required=True)
+
+BATCH_ITEM_SCHEMAS = {'message': BatchMessageSchema(), 'lesson-plan': BatchLessonPlanSchema()}
+
 @chat_bp.route('/message', methods=['POST'])
+@idempotent
 def send_message():
     try:
-        schema = ChatMessageSchema()
-        data = schema.load(request.json)
+        with server_timing.span('validate'):
+            schema = ChatMessageSchema()
+            data = schema.load(request.json)
         
         message = data['message']
-        conversation_history = data['conversationHistory']
         context = data['context']
 
-        response = bedrock_service.generate_response(
-            message, context, conversation_history
-        )
+        with server_timing.span('memory'):
+            conversation_id, _ = conversation_store.get_or_create(
+                data['conversationId'], data['conversationHistory']
+            )
+            if data['conversationId']:
+                metrics.record_cache('conversation', conversation_id is not None)
+            if conversation_id is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Conversation not found'
+                }), 404
+            conversation_summary, conversation_history = conversation_store.get_history(conversation_id)
 
-        return jsonify({
-            'success': True,
-            'data': {
-                'message': response['text'],
-                'timestamp': datetime.now().isoformat() + 'Z',
-                'usage': response['usage']
-            }
-        })
+        with server_timing.span('bedrock'):
+            response = bedrock_service.generate_response(
+                message, context, conversation_history, conversation_summary
+            )
+
+        conversation_store.add_exchange(conversation_id, message, response['text'])
+
+        with server_timing.span('serialize'):
+            return jsonify({
+                'success': True,
+                'data': {
+                    'message': response['text'],
+                    'conversationId': conversation_id,
+                    'timestamp': datetime.now().isoformat() + 'Z',
+                    'usage': response['usage']
+                }
+            })
 
     except ValidationError as e:
         return handle_validation_error(e.messages)
+    except UpstreamUnavailable as e:
+        return handle_upstream_unavailable(e)
     except Exception as e:
         print(f"Chat message error: {e}")
         return handle_error('Failed to generate response. Please try again.', 500)
 
 @chat_bp.route('/lesson-plan', methods=['POST'])
+@idempotent
 def generate_lesson_plan():
     try:
-        schema = LessonPlanSchema()
-        data = schema.load(request.json)
+        with server_timing.span('validate'):
+            schema = LessonPlanSchema()
+            data = schema.load(request.json)
         
         topic = data['topic']
         level = data['level']
         duration = data['duration']
 
-        lesson_plan = bedrock_service.generate_lesson_plan(topic, level, duration)
+        with server_timing.span('bedrock'):
+            lesson_plan, cached = bedrock_service.lesson_plan(topic, level, duration)
 
-        return jsonify({
-            'success': True,
-            'data': {
-                'lessonPlan': lesson_plan,
-                'topic': topic,
-                'level': level,
-                'duration': duration,
-                'timestamp': datetime.now().isoformat() + 'Z'
-            }
-        })
+        with server_timing.span('serialize'):
+            return jsonify({
+                'success': True,
+                'data': {
+                    'lessonPlan': lesson_plan,
+                    'topic': topic,
+                    'level': level,
+                    'duration': duration,
+                    'cached': cached,
+                    'timestamp': datetime.now().isoformat() + 'Z'
+                }
+            })
 
     except ValidationError as e:
         return handle_validation_error(e.messages)
+    except UpstreamUnavailable as e:
+        return handle_upstream_unavailable(e)
     except Exception as e:
         print(f"Lesson plan generation error: {e}")
         return handle_error('Failed to generate lesson plan. Please try again.', 500)
 
+def run_batch_item(item, budget):
+    """Generate one batch item; each gets the request's full time budget from when it starts"""
+    with deadline.bind(budget):
+        if item['type'] == 'lesson-plan':
+            lesson_plan, cached = bedrock_service.lesson_plan(
+                item['topic'], item['level'], item['duration'], priority=NORMAL
+            )
+            return {
+                'lessonPlan': lesson_plan,
+                'topic': item['topic'],
+                'level': item['level'],
+                'duration': item['duration'],
+                'cached': cached
+            }
+        # Batch prompts are independent and stateless, and queue behind interactive chat
+        response = bedrock_service.generate_response(item['message'], item['context'], priority=NORMAL)
+        return {'message': response['text'], 'usage': response['usage']}
+
+def batch_result(index, item_id, future):
+    try:
+        return {'index': index, 'id': item_id, 'success': True, 'data': future.result()}
+    except UpstreamUnavailable as e:
+        return {'index': index, 'id': item_id, 'success': False, 'error': UPSTREAM_MESSAGES[e.status_code],
+                'status': e.status_code, 'retryAfter': e.retry_after}
+    except Exception as e:
+        print(f"Batch item error: {e}")
+        return {'index': index, 'id': item_id, 'success': False, 'error': 'Failed to generate response.', 'status': 500}
+
+def batch_cost():
+    """Rate limit hits for a batch request: one per item, checked before any work is submitted"""
+    body = request.get_json(silent=True)
+    items = body.get('items') if isinstance(body, dict) else None
+    return min(max(len(items), 1), BATCH_MAX_ITEMS) if isinstance(items, list) else 1
+
+@chat_bp.route('/batch', methods=['POST'])
+@limiter.limit(BATCH_RATE_LIMIT, cost=batch_cost)
+def batch():
+    """Run many prompts or lesson plans concurrently, streaming one NDJSON line per item as it completes.
+
+    Items are {"type": "message", "message", "context"} or {"type": "lesson-plan",
+    "topic", "level", "duration"}, each with an optional "id" echoed back. Invalid
+    items and failures are reported on their own line; identical items are only
+    generated once. The last line is {"done": true, "summary": {...}}.
+    """
+    try:
+        data = BatchSchema().load(request.json)
+    except ValidationError as e:
+        return handle_validation_error(e.messages)
+
+    budget = deadline.remaining()
+    executor = ThreadPoolExecutor(max_workers=data['concurrency'], thread_name_prefix='chat-batch')
+    invalid = []
+    futures = {}
+    shared = {}
+    for index, raw in enumerate(data['items']):
+        schema = BATCH_ITEM_SCHEMAS.get(raw.get('type', 'message'))
+        try:
+            if schema is None:
+                raise ValidationError({'type': [f"Must be one of {sorted(BATCH_ITEM_SCHEMAS)}"]})
+            item = schema.load(raw)
+        except ValidationError as e:
+            invalid.append({'index': index, 'id': raw.get('id'), 'success': False,
+                            'error': 'Validation failed', 'details': e.messages, 'status': 400})
+            continue
+        if item['type'] == 'lesson-plan':
+            key = lesson_plan_key(item['topic'], item['level'], item['duration'])
+        else:
+            key = json.dumps({k: v for k, v in item.items() if k != 'id'}, sort_keys=True)
+        if key not in shared:
+            shared[key] = executor.submit(tracer.run_in_context(run_batch_item), item, budget)
+        futures.setdefault(shared[key], []).append((index, item['id']))
+
+    def generate():
+        started = time.monotonic()
+        summary = {'total': len(data['items']), 'succeeded': 0, 'failed': len(invalid), 'unique': len(futures)}
+        try:
+            for line in invalid:
+                yield current_app.json.dumps(line) + '\n'
+            for future in as_completed(futures):
+                for index, item_id in futures[future]:
+                    line = batch_result(index, item_id, future)
+                    summary['succeeded' if line['success'] else 'failed'] += 1
+                    yield current_app.json.dumps(line) + '\n'
+            summary['elapsedMs'] = round((time.monotonic() - started) * 1000)
+            yield current_app.json.dumps({'done': True, 'summary': summary}) + '\n'
+        finally:
+            # Client gone or batch finished: drop anything still queued
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@chat_bp.route('/conversation/<conversation_id>', methods=['GET'])
+def get_conversation(conversation_id):
+    if conversation_store.get_conversation(conversation_id) is None:
+        return jsonify({
+            'success': False,
+            'error': 'Conversation not found'
+        }), 404
+
+    summary, turns = conversation_store.get_history(conversation_id)
+    return jsonify({
+        'success': True,
+        'data': {
+            'conversationId': conversation_id,
+            'summary': summary,
+            'messages': turns
+        }
+    })
+
+@chat_bp.route('/conversation/<conversation_id>', methods=['DELETE'])
+def delete_conversation(conversation_id):
+    if not conversation_store.delete_conversation(conversation_id):
+        return jsonify({
+            'success': False,
+            'error': 'Conversation not found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'message': 'Conversation deleted successfully'
+    })
+
 @chat_bp.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'success': True,
         'message': 'Chat service is healthy',
+        'usage': bedrock_service.get_usage_stats(),
+        'concurrency': bedrock_service.limiter.snapshot(),
+        'resilience': bedrock_service.guard.snapshot(),
+        'endpoints': bedrock_service.pool.snapshot(),
+        'router': bedrock_service.router.name,
+        'lessonPlans': lesson_plan_store.stats(),
         'timestamp': datetime.now().isoformat() + 'Z'
     }) 
\ No newline at end of file
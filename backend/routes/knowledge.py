@@ -7,6 +7,7 @@ from marshmallow import Schema, fields, ValidationError
 import PyPDF2
 from docx import Document
 from services.bedrock_service import bedrock_service
+from services.resilience import UpstreamUnavailable
 from middleware.error_handler import handle_error, handle_validation_error
 
 knowledge_bp = Blueprint('knowledge', __name__)
@@ -94,7 +95,11 @@ def upload_files():
 
                     analysis = ''
                     if extracted_text.strip():
-                        analysis = bedrock_service.analyze_document(extracted_text, filename)
+                        try:
+                            analysis = bedrock_service.analyze_document(extracted_text, filename)
+                        except UpstreamUnavailable as e:
+                            # Analysis is background work: keep the upload and skip it under load
+                            print(f"Skipping analysis of {filename}: {e}")
 
                     file_record = {
                         'id': str(uuid.uuid4()),
@@ -0,0 +1,49 @@
+import os
+from flask import Blueprint, request, jsonify, Response
+from middleware.profiler import profiling
+from middleware.security_middleware import validate_api_key
+
+profiling_bp = Blueprint('profiling', __name__)
+
+@profiling_bp.route('/profiles', methods=['GET'])
+@validate_api_key
+def list_profiles():
+    """List stored request profiles (newest first)"""
+    endpoint = request.args.get('endpoint')
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    profiles = [p for p in profiling.list_profiles() if not endpoint or p['endpoint'] == endpoint]
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'enabled': profiling.enabled,
+            'sample_every': profiling.sample_every,
+            'profiles': profiles[:limit],
+            'total': len(profiles)
+        }
+    })
+
+@profiling_bp.route('/profiles/<profile_id>', methods=['GET'])
+@validate_api_key
+def get_profile(profile_id):
+    """Collapsed stacks for a single profile"""
+    for profile in profiling.list_profiles():
+        if profile['id'] == profile_id:
+            with open(os.path.join(profiling.directory, profile['file'])) as f:
+                return Response(f.read(), mimetype='text/plain')
+
+    return jsonify({
+        'success': False,
+        'error': 'Profile not found'
+    }), 404
+
+@profiling_bp.route('/aggregate', methods=['GET'])
+@validate_api_key
+def aggregate_profiles():
+    """Merged collapsed stacks, ready for flamegraph.pl or speedscope"""
+    endpoint = request.args.get('endpoint')
+    limit = request.args.get('limit', type=int)
+    totals = profiling.aggregate(endpoint, limit)
+
+    body = ''.join(f"{stack} {count}\n" for stack, count in totals.most_common())
+    return Response(body, mimetype='text/plain')
@@ -1,12 +1,18 @@
 from flask import Blueprint, request, jsonify, current_app
 from middleware.rate_limiter import limiter
 from middleware.security_middleware import require_https, validate_api_key
+from middleware.async_logging import log_writer
+from services.audit_log_reader import audit_log_reader, parse_timestamp
 import os
 import json
+import logging
 from datetime import datetime, timedelta
 
 security_bp = Blueprint('security', __name__)
 
+# Handler attached by attach_security_events_log() in app_secure.py
+security_events_logger = logging.getLogger('veron.security_events')
+
 @security_bp.route('/csp-report', methods=['POST'])
 @limiter.limit("10 per minute")
 def csp_report():
@@ -47,30 +53,21 @@ def csp_report():
 def get_audit_log():
     """Get security audit log (requires API key)"""
     try:
-        limit = min(int(request.args.get('limit', 100)), 1000)
-        offset = int(request.args.get('offset', 0))
-        
-        # Read security log file
-        log_file = 'logs/security.log'
-        if not os.path.exists(log_file):
-            return jsonify({'events': [], 'total': 0})
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        levels = {l.strip().upper() for l in request.args.get('level', '').split(',') if l.strip()}
+        since = parse_timestamp(request.args.get('since'))
+        until = parse_timestamp(request.args.get('until'))
+        if (request.args.get('since') and since is None) or (request.args.get('until') and until is None):
+            return jsonify({'error': 'since/until must be ISO-8601 timestamps'}), 400
         
-        with open(log_file, 'r') as f:
-            lines = f.readlines()
-        
-        # Parse and filter log entries
-        events = []
-        for line in reversed(lines[offset:offset + limit]):
-            if line.strip():
-                events.append({
-                    'timestamp': line.split()[0] + ' ' + line.split()[1],
-                    'level': line.split()[2].rstrip(':'),
-                    'message': ' '.join(line.split()[3:]).strip()
-                })
+        # Newest first, across logs/security.log and its rotations
+        result = audit_log_reader.page(offset, limit, levels, since, until)
         
         return jsonify({
-            'events': events,
-            'total': len(lines),
+            'events': result['events'],
+            'total': result['total'],
+            'has_more': result['has_more'],
             'limit': limit,
             'offset': offset
         })
@@ -127,6 +124,7 @@ def security_health():
             'csp_enabled': os.getenv('CSP_ENABLED', 'true').lower() == 'true',
             'security_logging': os.getenv('SECURITY_LOGGING', 'false').lower() == 'true',
         },
+        'logging': log_writer.stats(),
         'timestamp': datetime.utcnow().isoformat()
     }
     
@@ -182,21 +180,8 @@ def basic_vulnerability_scan():
         return jsonify({'error': 'Vulnerability scan failed'}), 500
 
 def log_security_event(event_type, event_data):
-    """Log security events to file"""
-    try:
-        if not os.path.exists('logs'):
-            os.makedirs('logs')
-        
-        with open('logs/security_events.json', 'a') as f:
-            event = {
-                'event_type': event_type,
-                'timestamp': datetime.utcnow().isoformat(),
-                'data': event_data
-            }
-            f.write(json.dumps(event) + '\n')
-            
-    except Exception as e:
-        current_app.logger.error(f"Error logging security event: {str(e)}")
+    """Queue a security event for the background log writer (logs/security_events.json)"""
+    security_events_logger.info(event_type, extra={'event_type': event_type, 'data': event_data})
 
 def get_security_recommendations(headers_status):
     """Get security recommendations based on current configuration"""
@@ -0,0 +1,41 @@
+from flask import Blueprint, request, jsonify
+from middleware.tracing import tracer
+from middleware.security_middleware import validate_api_key
+
+tracing_bp = Blueprint('tracing', __name__)
+
+@tracing_bp.route('/traces', methods=['GET'])
+@validate_api_key
+def list_traces():
+    """Root spans of recently finished traces (newest first)"""
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    traces = tracer.memory_exporter.recent_traces(limit) if tracer.memory_exporter else []
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'enabled': tracer.enabled,
+            'sample_ratio': tracer.sample_ratio,
+            'traces': traces,
+            'dropped_spans': sum(p.dropped for p in tracer.processors)
+        }
+    })
+
+@tracing_bp.route('/traces/<trace_id>', methods=['GET'])
+@validate_api_key
+def get_trace(trace_id):
+    """All retained spans of one trace, ordered by start time"""
+    spans = tracer.memory_exporter.get_trace(trace_id) if tracer.memory_exporter else []
+    if not spans:
+        return jsonify({
+            'success': False,
+            'error': 'Trace not found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'trace_id': trace_id,
+            'spans': sorted(spans, key=lambda s: s['start_ns'])
+        }
+    })
@@ -2,10 +2,16 @@ import os
 import requests
 import tempfile
 import base64
+import hashlib
 from datetime import datetime
 from flask import Blueprint, request, jsonify, send_file, Response
 from marshmallow import Schema, fields, ValidationError
-from middleware.error_handler import handle_error, handle_validation_error
+from middleware.conditional import conditional_response, resource_etag
+from middleware.error_handler import handle_error, handle_validation_error, handle_upstream_unavailable
+from middleware.metrics import metrics
+from middleware.server_timing import server_timing
+from middleware.tracing import tracer
+from services.resilience import UpstreamGuard, UpstreamUnavailable
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +20,32 @@ voice_bp = Blueprint('voice', __name__)
 
 ELEVEN_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVEN_VOICE_ID = os.getenv("ELEVEN_VOICE_ID", "ueSxRO0nLF1bj93J2hVt")
+ELEVEN_API_URL = os.getenv("ELEVENLABS_API_URL", "https://api.elevenlabs.io").rstrip('/')
+ELEVEN_TIMEOUT = float(os.getenv("ELEVENLABS_TIMEOUT", 60))
+
+# TTS, STT and the voice list are all safe to repeat, so they may be hedged when ELEVENLABS_HEDGE=true
+elevenlabs_guard = UpstreamGuard.from_env('elevenlabs', 'ELEVENLABS')
+
+def upstream_outcome(status_code):
+    if status_code == 429:
+        return 'throttled'
+    return 'ok' if status_code < 400 else 'error'
+
+def call_elevenlabs(operation, method, url, **kwargs):
+    """Call ElevenLabs with a client span, Server-Timing entry, upstream metrics and the request deadline"""
+    with tracer.span(f'elevenlabs.{operation}', kind='client', attributes={'http.method': method, 'http.url': url}) as span, \
+            server_timing.span('elevenlabs'), metrics.track_upstream('elevenlabs', operation) as result:
+        if span is not None:
+            kwargs['headers'] = {**kwargs.get('headers', {}), 'traceparent': span.traceparent}
+        kwargs.setdefault('timeout', ELEVEN_TIMEOUT)
+        response = elevenlabs_guard.call(
+            operation, lambda: requests.request(method, url, **kwargs),
+            idempotent=True, is_failure=lambda r: r.status_code >= 500
+        )
+        result['outcome'] = upstream_outcome(response.status_code)
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+    return response
 
 class TTSSchema(Schema):
     text = fields.Str(required=True, validate=lambda x: 1 <= len(x) <= 5000)
@@ -32,7 +64,7 @@ def text_to_speech():
         if not ELEVEN_API_KEY:
             return handle_error('ElevenLabs API key not configured', 500)
         
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{ELEVEN_VOICE_ID}"
+        url = f"{ELEVEN_API_URL}/v1/text-to-speech/{ELEVEN_VOICE_ID}"
         headers = {
             "Content-Type": "application/json",
             "xi-api-key": ELEVEN_API_KEY
@@ -46,7 +78,7 @@ def text_to_speech():
             }
         }
         
-        response = requests.post(url, headers=headers, json=body)
+        response = call_elevenlabs('tts', 'POST', url, headers=headers, json=body)
         
         if response.status_code == 200:
             audio_bytes = response.content
@@ -61,6 +93,8 @@ def text_to_speech():
             
     except ValidationError as e:
         return handle_validation_error(e.messages)
+    except UpstreamUnavailable as e:
+        return handle_upstream_unavailable(e)
     except Exception as e:
         print(f"TTS error: {e}")
         return handle_error('Failed to generate speech. Please try again.', 500)
@@ -77,7 +111,7 @@ def speech_to_text():
         if not ELEVEN_API_KEY:
             return handle_error('ElevenLabs API key not configured', 500)
         
-        url = "https://api.elevenlabs.io/v1/speech-to-text"
+        url = f"{ELEVEN_API_URL}/v1/speech-to-text"
         headers = {
             "xi-api-key": ELEVEN_API_KEY
         }
@@ -91,7 +125,7 @@ def speech_to_text():
         if language and language != 'auto':
             data['language'] = language
         
-        response = requests.post(url, headers=headers, files=files, data=data)
+        response = call_elevenlabs('stt', 'POST', url, headers=headers, files=files, data=data)
         
         if response.status_code == 200:
             result = response.json()
@@ -106,6 +140,8 @@ def speech_to_text():
         else:
             return handle_error(f'ElevenLabs STT API error: {response.status_code}', 500)
             
+    except UpstreamUnavailable as e:
+        return handle_upstream_unavailable(e)
     except Exception as e:
         print(f"STT error: {e}")
         return handle_error('Failed to transcribe speech. Please try again.', 500)
@@ -116,25 +152,28 @@ def get_available_voices():
         if not ELEVEN_API_KEY:
             return handle_error('ElevenLabs API key not configured', 500)
         
-        url = "https://api.elevenlabs.io/v1/voices"
+        url = f"{ELEVEN_API_URL}/v1/voices"
         headers = {
             "xi-api-key": ELEVEN_API_KEY
         }
         
-        response = requests.get(url, headers=headers)
+        response = call_elevenlabs('voices', 'GET', url, headers=headers)
         
         if response.status_code == 200:
-            voices = response.json()
-            return jsonify({
+            # Tagged by ElevenLabs' bytes so an unchanged list is a 304 without parsing it
+            upstream_version = hashlib.sha1(response.content).hexdigest()
+            return conditional_response(resource_etag('voices', upstream_version), lambda: jsonify({
                 'success': True,
                 'data': {
-                    'voices': voices.get('voices', []),
+                    'voices': response.json().get('voices', []),
                     'timestamp': datetime.now().isoformat() + 'Z'
                 }
-            })
+            }))
         else:
             return handle_error(f'ElevenLabs API error: {response.status_code}', 500)
             
+    except UpstreamUnavailable as e:
+        return handle_upstream_unavailable(e)
     except Exception as e:
         print(f"Get voices error: {e}")
         return handle_error('Failed to fetch available voices.', 500)
@@ -144,5 +183,6 @@ def health_check():
     return jsonify({
         'success': True,
         'message': 'Voice service is healthy',
+        'resilience': elevenlabs_guard.snapshot(),
         'timestamp': datetime.now().isoformat() + 'Z'
     }) 
\ No newline at end of file
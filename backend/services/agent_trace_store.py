@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trace_sessions (
+    session_id TEXT PRIMARY KEY,
+    enabled INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trace_sessions_last_used ON trace_sessions (last_used);
+CREATE TABLE IF NOT EXISTS trace_captures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    capture TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trace_captures_session ON trace_captures (session_id, id);
+"""
+
+
+class AgentTraceStore:
+    """Bounded store of Bedrock Agent traces, keyed by session.
+
+    Trace capture is decided per call: sessions that opted in are always
+    captured, everything else is sampled at `sample_rate`. Calls that are not
+    captured invoke the agent with enableTrace=False, so no trace events are
+    streamed, stored or logged. Both the captures and the opted-in sessions
+    are kept for at most `max_sessions` sessions, least recently used first
+    out. Stored in SQLite (WAL, one connection per thread, reopened after a
+    fork) so opting in on one gunicorn worker applies on all of them.
+    """
+
+    def __init__(self, path, sample_rate: float = 0.0, max_sessions: int = 200,
+                 max_captures_per_session: int = 20, timeout: float = 5.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_sessions = max_sessions
+        self.max_captures_per_session = max_captures_per_session
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def should_capture(self, session_id: str) -> bool:
+        if self.is_session_enabled(session_id):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def enable_session(self, session_id: str):
+        with self._transaction() as db:
+            db.execute('INSERT OR REPLACE INTO trace_sessions (session_id, enabled, last_used) VALUES (?, 1, ?)',
+                       (session_id, time.time()))
+            self._evict(db)
+
+    def disable_session(self, session_id: str):
+        self._connection().execute('UPDATE trace_sessions SET enabled = 0 WHERE session_id = ?', (session_id,))
+
+    def is_session_enabled(self, session_id: str) -> bool:
+        return self._connection().execute(
+            'SELECT 1 FROM trace_sessions WHERE session_id = ? AND enabled = 1', (session_id,)
+        ).fetchone() is not None
+
+    def add(self, session_id: str, events: List[Dict]):
+        """Store the trace events of one agent call"""
+        capture = json.dumps({
+            'timestamp': datetime.now().isoformat(),
+            'event_count': len(events),
+            'events': events
+        })
+
+        with self._transaction() as db:
+            db.execute(
+                'INSERT INTO trace_sessions (session_id, enabled, last_used) VALUES (?, 0, ?) '
+                'ON CONFLICT (session_id) DO UPDATE SET last_used = excluded.last_used',
+                (session_id, time.time())
+            )
+            db.execute('INSERT INTO trace_captures (session_id, capture) VALUES (?, ?)', (session_id, capture))
+            db.execute(
+                'DELETE FROM trace_captures WHERE session_id = ? AND id NOT IN '
+                '(SELECT id FROM trace_captures WHERE session_id = ? ORDER BY id DESC LIMIT ?)',
+                (session_id, session_id, self.max_captures_per_session)
+            )
+            self._evict(db)
+
+    def get(self, session_id: str) -> Optional[List[Dict]]:
+        """Captured traces for a session (oldest first), or None if there are none"""
+        rows = self._connection().execute(
+            'SELECT capture FROM trace_captures WHERE session_id = ? ORDER BY id', (session_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows] if rows else None
+
+    def clear(self, session_id: str):
+        with self._transaction() as db:
+            db.execute('DELETE FROM trace_captures WHERE session_id = ?', (session_id,))
+            db.execute('DELETE FROM trace_sessions WHERE session_id = ?', (session_id,))
+
+    def _evict(self, db):
+        """Drop the least recently used sessions beyond max_sessions, with their captures"""
+        evicted = [row[0] for row in db.execute(
+            'SELECT session_id FROM trace_sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?',
+            (self.max_sessions,)
+        )]
+        for session_id in evicted:
+            db.execute('DELETE FROM trace_captures WHERE session_id = ?', (session_id,))
+            db.execute('DELETE FROM trace_sessions WHERE session_id = ?', (session_id,))
+
+
+# Global instance
+agent_trace_store = AgentTraceStore(
+    os.getenv('AGENT_TRACE_STORE_PATH', 'data/agent_traces.db'),
+    sample_rate=float(os.getenv('AGENT_TRACE_SAMPLE_RATE', 0.0)),
+    max_sessions=int(os.getenv('AGENT_TRACE_MAX_SESSIONS', 200)),
+    max_captures_per_session=int(os.getenv('AGENT_TRACE_MAX_PER_SESSION', 20))
+)
@@ -0,0 +1,230 @@
+import os
+import re
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+
+def parse_log_line(line: str) -> Dict:
+    """Parse a JSON log record, falling back to the older plain-text format"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        record = None
+    if isinstance(record, dict):
+        return {
+            'timestamp': record.get('timestamp'),
+            'level': record.get('level'),
+            'message': record.get('message')
+        }
+    parts = line.split()
+    return {
+        'timestamp': ' '.join(parts[:2]),
+        'level': parts[2].rstrip(':') if len(parts) > 2 else '',
+        'message': ' '.join(parts[3:]).strip()
+    }
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse ISO-8601 (or logging's `YYYY-MM-DD HH:MM:SS,mmm`) into an aware UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace(',', '.').replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class AuditLogReader:
+    """Pages through a rotating log newest-first without loading it into memory.
+
+    For every file (the live log and its `.1`..`.N` rotations) a sparse index
+    records the byte offset of every `index_stride`-th line. Indexes are keyed
+    by inode, so they survive the rename on rotation and only the newly
+    appended tail of the live file is scanned on each call. Unfiltered pages
+    seek straight to the nearest checkpoint; filtered pages read backwards in
+    fixed-size blocks and stop as soon as the time range is exhausted.
+    """
+
+    def __init__(self, path: str, block_size: int = 65536, index_stride: int = 1000):
+        self.path = path
+        self.block_size = block_size
+        self.index_stride = index_stride
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def files(self) -> List[str]:
+        """Existing log files, newest first"""
+        directory = os.path.dirname(self.path) or '.'
+        base = os.path.basename(self.path)
+        if not os.path.isdir(directory):
+            return []
+        pattern = re.compile(re.escape(base) + r'\.(\d+)$')
+        rotated = sorted(
+            (int(m.group(1)), name) for name in os.listdir(directory)
+            for m in [pattern.match(name)] if m
+        )
+        files = [self.path] if os.path.exists(self.path) else []
+        return files + [os.path.join(directory, name) for _, name in rotated]
+
+    def page(self, offset: int = 0, limit: int = 100, levels: Optional[Set[str]] = None,
+             since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict:
+        """Return up to `limit` records after skipping `offset`, newest first"""
+        with self._lock:
+            entries = []
+            for path in self.files():
+                try:
+                    entries.append((path, self._update_index(path)))
+                except OSError:
+                    continue
+            live = {entry['inode'] for _, entry in entries}
+            for inode in list(self._index):
+                if inode not in live:
+                    del self._index[inode]
+
+        total = sum(entry['lines'] for _, entry in entries)
+        if levels or since or until:
+            events, has_more = self._filtered_page(entries, offset, limit, levels, since, until)
+        else:
+            events = self._unfiltered_page(entries, offset, limit)
+            has_more = offset + len(events) < total
+        return {'events': events, 'total': total, 'has_more': has_more}
+
+    def _update_index(self, path: str) -> Dict:
+        stat = os.stat(path)
+        entry = self._index.get(stat.st_ino)
+        if entry is None or entry['end'] > stat.st_size:
+            entry = self._index[stat.st_ino] = {'inode': stat.st_ino, 'offsets': [0], 'lines': 0, 'end': 0}
+        if stat.st_size == entry['end']:
+            return entry
+
+        stride = self.index_stride
+        with open(path, 'rb') as f:
+            f.seek(entry['end'])
+            position = entry['end']
+            while True:
+                block = f.read(self.block_size)
+                if not block:
+                    break
+                start = 0
+                while True:
+                    newline = block.find(b'\n', start)
+                    if newline < 0:
+                        break
+                    entry['lines'] += 1
+                    entry['end'] = position + newline + 1
+                    if entry['lines'] % stride == 0:
+                        entry['offsets'].append(entry['end'])
+                    start = newline + 1
+                position += len(block)
+        return entry
+
+    def _unfiltered_page(self, entries, offset, limit):
+        events = []
+        skip = offset
+        for path, entry in entries:
+            if len(events) >= limit:
+                break
+            if skip >= entry['lines']:
+                skip -= entry['lines']
+                continue
+            newest = entry['lines'] - 1 - skip
+            oldest = max(0, newest - (limit - len(events)) + 1)
+            lines = self._read_lines(path, entry, oldest, newest - oldest + 1)
+            events.extend(parse_log_line(line) for line in reversed(lines))
+            skip = 0
+        return events
+
+    def _read_lines(self, path, entry, first, count):
+        """Read `count` lines starting at line number `first`, seeking via the nearest checkpoint"""
+        checkpoint = first // self.index_stride
+        lines = []
+        with open(path, 'rb') as f:
+            f.seek(entry['offsets'][checkpoint])
+            for _ in range(first - checkpoint * self.index_stride):
+                f.readline()
+            for _ in range(count):
+                lines.append(f.readline().decode('utf-8', errors='replace').rstrip('\n'))
+        return lines
+
+    def _filtered_page(self, entries, offset, limit, levels, since, until):
+        events = []
+        matched = 0
+        for path, entry in entries:
+            end = self._end_before(path, entry, until) if until else entry['end']
+            for line in self._reverse_lines(path, end):
+                if not line.strip():
+                    continue
+                event = parse_log_line(line)
+                timestamp = parse_timestamp(event['timestamp'])
+                if since and timestamp and timestamp < since:
+                    # Older files only hold older records
+                    return events, False
+                if until and timestamp and timestamp > until:
+                    continue
+                if levels and (event['level'] or '').upper() not in levels:
+                    continue
+                matched += 1
+                if matched <= offset:
+                    continue
+                if len(events) == limit:
+                    return events, True
+                events.append(event)
+        return events, False
+
+    def _end_before(self, path, entry, until):
+        """Byte offset just past the last line stamped at or before `until`"""
+        checkpoints = entry['offsets'][:(entry['lines'] - 1) // self.index_stride + 1] if entry['lines'] else []
+        with open(path, 'rb') as f:
+            def stamp_at(position):
+                f.seek(position)
+                return parse_timestamp(parse_log_line(f.readline().decode('utf-8', errors='replace'))['timestamp'])
+
+            # Binary search for the last checkpoint line that is not newer than `until`
+            low, high, start = 0, len(checkpoints) - 1, None
+            while low <= high:
+                middle = (low + high) // 2
+                stamp = stamp_at(checkpoints[middle])
+                if stamp is None or stamp <= until:
+                    start = checkpoints[middle]
+                    low = middle + 1
+                else:
+                    high = middle - 1
+            if start is None:
+                return 0
+
+            f.seek(start)
+            position = start
+            while position < entry['end']:
+                line = f.readline()
+                stamp = parse_timestamp(parse_log_line(line.decode('utf-8', errors='replace'))['timestamp'])
+                if stamp is not None and stamp > until:
+                    break
+                position += len(line)
+            return position
+
+    def _reverse_lines(self, path, end):
+        """Yield lines before byte offset `end`, newest first, reading fixed-size blocks backwards"""
+        with open(path, 'rb') as f:
+            position = end
+            remainder = b''
+            while position > 0:
+                size = min(self.block_size, position)
+                position -= size
+                f.seek(position)
+                block = f.read(size) + remainder
+                lines = block.split(b'\n')
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line:
+                        yield line.decode('utf-8', errors='replace')
+            if remainder:
+                yield remainder.decode('utf-8', errors='replace')
+
+
+# Global instance
+audit_log_reader = AuditLogReader('logs/security.log')
@@ -4,18 +4,24 @@ import uuid
 from datetime import datetime
 from botocore.exceptions import ClientError
 import os
+from middleware.metrics import metrics
+from middleware.tracing import tracer
+from services.agent_trace_store import agent_trace_store
+from services.concurrency_limiter import AdaptiveConcurrencyLimiter, INTERACTIVE
+from services.resilience import UpstreamGuard, UpstreamUnavailable
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class BedrockAgentService:
     def __init__(self):
-        self.client = boto3.client(
+        self.client = tracer.instrument_boto3_client(boto3.client(
             service_name="bedrock-agent-runtime",
             region_name=os.getenv('AWS_REGION', 'us-west-2'),
+            endpoint_url=os.getenv('BEDROCK_AGENT_ENDPOINT_URL') or None,
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
             aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
+        ))
         
         # Get agent IDs from environment - required
         self.agent_id = os.getenv('BEDROCK_AGENT_ID')
@@ -25,6 +31,9 @@ class BedrockAgentService:
             raise ValueError("BEDROCK_AGENT_ID and BEDROCK_AGENT_ALIAS_ID must be set in environment variables")
         
         self.sessions = {}
+        self.limiter = AdaptiveConcurrencyLimiter.from_env('bedrock_agent', 'BEDROCK_AGENT')
+        # Agent turns update session state, so they get the breaker and deadline but are never hedged
+        self.guard = UpstreamGuard.from_env('bedrock_agent', 'BEDROCK_AGENT')
         self.system_prompt = self._get_default_system_prompt()
         
         logger.info(f"Initialized Bedrock Agent Service with Agent ID: {self.agent_id}, Alias ID: {self.alias_id}")
@@ -57,28 +66,41 @@ Always be encouraging, professional, and educational in your responses. Focus on
         try:
             logger.info(f"Invoking agent {self.agent_id} with session {session_id}")
             
-            response = self.client.invoke_agent(
-                agentId=self.agent_id,
-                agentAliasId=self.alias_id,
-                enableTrace=True,
-                sessionId=session_id,
-                inputText=prompt
-            )
-            
-            completion = ""
-            trace_info = []
-            
-            for event in response.get("completion"):
-                if 'chunk' in event:
-                    chunk = event["chunk"]
-                    completion += chunk["bytes"].decode()
+            capture_trace = agent_trace_store.should_capture(session_id)
+
+            def converse():
+                completion = ""
+                trace_events = []
+                response = self.client.invoke_agent(
+                    agentId=self.agent_id,
+                    agentAliasId=self.alias_id,
+                    enableTrace=capture_trace,
+                    sessionId=session_id,
+                    inputText=prompt
+                )
                 
-                if 'trace' in event:
-                    trace_event = event.get("trace")
-                    trace = trace_event['trace']
-                    trace_info.append(trace)
-                    for key, value in trace.items():
-                        logger.info("%s: %s", key, value)
+                for event in response.get("completion"):
+                    if 'chunk' in event:
+                        chunk = event["chunk"]
+                        completion += chunk["bytes"].decode()
+                    
+                    if capture_trace and 'trace' in event:
+                        trace_events.append(event['trace']['trace'])
+                return completion, trace_events
+
+            # The completion is streamed, so time the call until the stream is drained
+            with self.limiter.slot(INTERACTIVE) as lease, \
+                    tracer.span('bedrock_agent.invoke_agent', attributes={'session.id': session_id}) as span, \
+                    metrics.track_upstream('bedrock_agent', 'invoke_agent'):
+                completion, trace_events = self.guard.call('invoke_agent', converse, lease=lease)
+
+                if span is not None:
+                    span.set_attribute('completion.length', len(completion))
+                    span.set_attribute('agent.trace_captured', capture_trace)
+
+            if capture_trace:
+                agent_trace_store.add(session_id, trace_events)
+                logger.debug("Captured %d trace events for session %s", len(trace_events), session_id)
             
             self.sessions[session_id] = {
                 'last_used': datetime.now(),
@@ -90,10 +112,12 @@ Always be encouraging, professional, and educational in your responses. Focus on
             return {
                 'response': completion,
                 'session_id': session_id,
-                'trace_info': trace_info,
+                'trace_captured': capture_trace,
                 'timestamp': datetime.now().isoformat()
             }
             
+        except UpstreamUnavailable:
+            raise
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', 'Unknown')
             error_message = e.response.get('Error', {}).get('Message', str(e))
@@ -1,24 +1,18 @@
 import os
 import json
-import boto3
+import time
+import threading
 from botocore.exceptions import ClientError
+from middleware.metrics import metrics
+from services.concurrency_limiter import AdaptiveConcurrencyLimiter, INTERACTIVE, NORMAL, BACKGROUND
+from services.endpoint_pool import EndpointPool
+from services.model_router import FAST, extract_features, log_decision, router_from_env
+from services.resilience import UpstreamGuard, UpstreamUnavailable
+from services.response_store import lesson_plan_store, lesson_plan_key
 
-class BedrockService:
-    def __init__(self):
-        self.client = boto3.client(
-            'bedrock-runtime',
-            region_name=os.getenv('AWS_REGION', 'us-west-2'),
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
-        self.model_id = os.getenv('BEDROCK_MODEL_ID')
-    
-    def generate_response(self, message, context='', conversation_history=None):
-        if conversation_history is None:
-            conversation_history = []
-            
-        try:
-            system_prompt = """You are Veron, an expert English AI teaching assistant specializing in technical English for AI, IoT, and chip technology education. Your role is to:
+# Fixed part of the chat system prompt. It comes first so that it forms a
+# stable prefix that Bedrock prompt caching can reuse across requests.
+VERON_SYSTEM_PROMPT = """You are Veron, an expert English AI teaching assistant specializing in technical English for AI, IoT, and chip technology education. Your role is to:
 
 1. Help teachers explain complex technical concepts in simple English
 2. Provide vocabulary, grammar, and pronunciation guidance
@@ -26,9 +20,106 @@ class BedrockService:
 4. Suggest effective teaching methods for technical subjects
 5. Adapt explanations to different English proficiency levels
 
-Context from knowledge base: {context}
+Always be encouraging, professional, and educational in your responses. Focus on practical teaching applications."""
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token)"""
+    return len(text) // 4
+
+USAGE_KEYS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
 
-Always be encouraging, professional, and educational in your responses. Focus on practical teaching applications.""".format(context=context)
+# Queue priority per operation: chat is interactive, document analysis can wait
+OPERATION_PRIORITY = {
+    'generate_response': INTERACTIVE,
+    'generate_lesson_plan': NORMAL,
+    'analyze_document': BACKGROUND
+}
+
+class BedrockService:
+    def __init__(self, client=None, router=None):
+        self.pool = EndpointPool.from_env(client)
+        self.router = router or router_from_env(fast_available=self.pool.has_tier(FAST))
+        self.prompt_caching = os.getenv('BEDROCK_PROMPT_CACHING', 'false').lower() == 'true'
+        # Bedrock ignores cache checkpoints on shorter prefixes (1024 tokens for Claude Sonnet, 2048 for Haiku)
+        self.cache_min_tokens = int(os.getenv('BEDROCK_CACHE_MIN_TOKENS', 1024))
+        self.usage_totals = {key: 0 for key in USAGE_KEYS}
+        self._usage_lock = threading.Lock()
+        self.limiter = AdaptiveConcurrencyLimiter.from_env('bedrock', 'BEDROCK')
+        self.guard = UpstreamGuard.from_env('bedrock', 'BEDROCK')
+
+    def _build_system_prompt(self, context='', conversation_summary=''):
+        """Build the chat system prompt, marking stable blocks as cacheable when enabled.
+
+        A block gets a cache checkpoint only if the prefix up to and including
+        it reaches `cache_min_tokens`; the fixed prompt alone is too short, so
+        it is cached together with the knowledge base context that follows.
+        """
+        blocks = [(VERON_SYSTEM_PROMPT, True)]
+        if context:
+            blocks.append((f"Context from knowledge base: {context}", True))
+        if conversation_summary:
+            blocks.append((f"Summary of earlier conversation:\n{conversation_summary}", False))
+
+        if not self.prompt_caching:
+            return "\n\n".join(text for text, _ in blocks)
+
+        system = []
+        prefix_tokens = 0
+        for text, cacheable in blocks:
+            prefix_tokens += estimate_tokens(text)
+            block = {'type': 'text', 'text': text}
+            if cacheable and prefix_tokens >= self.cache_min_tokens:
+                block['cache_control'] = {'type': 'ephemeral'}
+            system.append(block)
+        return system
+
+    def _record_usage(self, usage):
+        """Normalize a Bedrock usage block and add it to the running totals"""
+        usage = usage or {}
+        normalized = {key: int(usage.get(key) or 0) for key in USAGE_KEYS}
+        with self._usage_lock:
+            for key, value in normalized.items():
+                self.usage_totals[key] += value
+        return normalized
+
+    def _invoke_model(self, operation, request_body, decision, priority=None):
+        """Call invoke_model on the decided tier and return the parsed body with normalized usage"""
+        if priority is None:
+            priority = OPERATION_PRIORITY.get(operation, NORMAL)
+        body = json.dumps(request_body)
+
+        started = time.monotonic()
+        try:
+            # Every operation here is a pure generation, so it is safe to hedge. Latency
+            # (and so the hedge delay) is tracked per tier since fast models answer sooner
+            with self.limiter.slot(priority) as lease, \
+                    metrics.track_upstream('bedrock', operation):
+                response_body, endpoint = self.guard.call(
+                    f'{operation}.{decision.tier}', lambda: self.pool.invoke(body, decision.tier),
+                    idempotent=True, lease=lease
+                )
+        except Exception as e:
+            log_decision(decision, self.router, None, type(e).__name__, (time.monotonic() - started) * 1000)
+            raise
+        log_decision(decision, self.router, endpoint, 'ok', (time.monotonic() - started) * 1000, response_body)
+
+        response_body['usage'] = self._record_usage(response_body.get('usage'))
+        metrics.observe_usage(operation, response_body['usage'])
+        return response_body
+
+    def get_usage_stats(self):
+        with self._usage_lock:
+            totals = dict(self.usage_totals)
+        prompt_tokens = totals['input_tokens'] + totals['cache_creation_input_tokens'] + totals['cache_read_input_tokens']
+        totals['cache_hit_ratio'] = round(totals['cache_read_input_tokens'] / prompt_tokens, 4) if prompt_tokens else 0
+        return totals
+    
+    def generate_response(self, message, context='', conversation_history=None, conversation_summary='', priority=None):
+        if conversation_history is None:
+            conversation_history = []
+            
+        try:
+            system_prompt = self._build_system_prompt(context, conversation_summary)
 
             messages = []
             for msg in conversation_history[-10:]:
@@ -43,29 +134,27 @@ Always be encouraging, professional, and educational in your responses. Focus on
                 'content': message
             })
 
+            decision = self.router.route(extract_features(
+                'generate_response', message, conversation_history, context, conversation_summary
+            ))
             request_body = {
                 'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 2000,
+                'max_tokens': decision.max_tokens,
                 'system': system_prompt,
                 'messages': messages,
                 'temperature': 0.7,
                 'top_p': 0.9
             }
 
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                contentType='application/json',
-                accept='application/json',
-                body=json.dumps(request_body)
-            )
-
-            response_body = json.loads(response['body'].read())
+            response_body = self._invoke_model('generate_response', request_body, decision, priority)
             
             return {
                 'text': response_body['content'][0]['text'],
-                'usage': response_body.get('usage', {})
+                'usage': response_body['usage']
             }
 
+        except UpstreamUnavailable:
+            raise
         except ClientError as e:
             print(f"Bedrock API Error: {e}")
             raise Exception(f"Failed to generate response: {str(e)}")
@@ -73,15 +162,27 @@ Always be encouraging, professional, and educational in your responses. Focus on
             print(f"Unexpected error: {e}")
             raise Exception(f"Failed to generate response: {str(e)}")
 
-    def generate_lesson_plan(self, topic, level, duration):
+    def lesson_plan(self, topic, level, duration, priority=None):
+        """Lesson plan from the response store, generated and stored on a miss; returns (text, cached)"""
+        key = lesson_plan_key(topic, level, duration)
+        lesson_plan = lesson_plan_store.get(key)
+        metrics.record_cache('lesson_plan', lesson_plan is not None)
+        if lesson_plan is not None:
+            return lesson_plan, True
+        lesson_plan = self.generate_lesson_plan(topic, level, duration, priority)
+        lesson_plan_store.put(key, lesson_plan)
+        return lesson_plan, False
+
+    def generate_lesson_plan(self, topic, level, duration, priority=None):
         try:
             system_prompt = "You are Veron, an expert English teaching assistant. Create a detailed lesson plan for teaching technical English. Format the response as a structured lesson plan with clear sections."
 
             message = f"Create a {duration}-minute lesson plan for teaching \"{topic}\" to {level} level English students. Include objectives, vocabulary, activities, and assessment methods."
 
+            decision = self.router.route(extract_features('generate_lesson_plan', message, duration=duration))
             request_body = {
                 'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 3000,
+                'max_tokens': decision.max_tokens,
                 'system': system_prompt,
                 'messages': [{
                     'role': 'user',
@@ -91,14 +192,7 @@ Always be encouraging, professional, and educational in your responses. Focus on
                 'top_p': 0.8
             }
 
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                contentType='application/json',
-                accept='application/json',
-                body=json.dumps(request_body)
-            )
-
-            response_body = json.loads(response['body'].read())
+            response_body = self._invoke_model('generate_lesson_plan', request_body, decision, priority)
             return response_body['content'][0]['text']
 
         except ClientError as e:
@@ -117,9 +211,10 @@ Always be encouraging, professional, and educational in your responses. Focus on
 
 Document content: {text[:4000]}"""
 
+            decision = self.router.route(extract_features('analyze_document', text[:4000]))
             request_body = {
                 'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 2000,
+                'max_tokens': decision.max_tokens,
                 'system': system_prompt,
                 'messages': [{
                     'role': 'user',
@@ -129,14 +224,7 @@ Document content: {text[:4000]}"""
                 'top_p': 0.7
             }
 
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                contentType='application/json',
-                accept='application/json',
-                body=json.dumps(request_body)
-            )
-
-            response_body = json.loads(response['body'].read())
+            response_body = self._invoke_model('analyze_document', request_body, decision)
             return response_body['content'][0]['text']
 
         except ClientError as e:
@@ -0,0 +1,201 @@
+import os
+import math
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from middleware.deadline import deadline
+from middleware.metrics import metrics
+from services.resilience import UpstreamOverloaded, is_throttle
+
+# Lower values are served first
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+
+class _Waiter:
+    __slots__ = ('event', 'granted', 'evicted')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.evicted = False
+
+
+class _Lease:
+    """One held slot; `hold(future)` keeps it taken until an abandoned upstream attempt returns"""
+
+    __slots__ = ('_pending', '_release', '_lock')
+
+    def __init__(self):
+        self._pending = 0
+        self._release = None
+        self._lock = threading.Lock()
+
+    def hold(self, future):
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(self._settled)
+
+    def close(self, release):
+        """Run release() now, or once the last held attempt returns"""
+        with self._lock:
+            if self._pending:
+                self._release = release
+                return
+        release()
+
+    def _settled(self, _future):
+        with self._lock:
+            self._pending -= 1
+            release = self._release if not self._pending else None
+            if release is not None:
+                self._release = None
+        if release is not None:
+            release()
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit with a priority wait queue in front of an upstream.
+
+    The limit grows by one per window of successful calls while the limiter is
+    busy, and is cut by `backoff` when the upstream throttles (at most once
+    per observed latency, so one burst of throttles counts once) or when a
+    call exceeds `latency_threshold` seconds. Calls over the limit wait in a
+    bounded queue ordered by priority; interactive callers can evict queued
+    background work. A full queue or an expired wait raises UpstreamOverloaded
+    straight away rather than piling more load on the upstream.
+    """
+
+    def __init__(self, name, initial_limit=8, min_limit=1, max_limit=64, max_queue=32,
+                 queue_timeout=10.0, backoff=0.5, latency_threshold=0.0):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+        self.in_flight = 0
+        self.latency_ewma = None
+        self.stats = {'admitted': 0, 'queued': 0, 'rejected': 0, 'timeouts': 0, 'evicted': 0, 'throttled': 0}
+        self._waiters = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name, prefix):
+        return cls(
+            name,
+            initial_limit=int(os.getenv(f'{prefix}_CONCURRENCY_INITIAL', 8)),
+            min_limit=int(os.getenv(f'{prefix}_CONCURRENCY_MIN', 1)),
+            max_limit=int(os.getenv(f'{prefix}_CONCURRENCY_MAX', 64)),
+            max_queue=int(os.getenv(f'{prefix}_QUEUE_SIZE', 32)),
+            queue_timeout=float(os.getenv(f'{prefix}_QUEUE_TIMEOUT', 10)),
+            latency_threshold=float(os.getenv(f'{prefix}_LATENCY_THRESHOLD', 0))
+        )
+
+    @contextmanager
+    def slot(self, priority=NORMAL):
+        """Hold one unit of upstream concurrency for the duration of the block (and any attempts the lease holds)"""
+        self._acquire(priority)
+        started = time.monotonic()
+        outcome = 'ok'
+        lease = _Lease()
+        try:
+            yield lease
+        except Exception as e:
+            outcome = 'throttled' if is_throttle(e) else 'error'
+            if outcome == 'throttled':
+                metrics.record_shed(self.name, 'throttling')
+                raise UpstreamOverloaded(self.name, self.retry_after(), 'throttling') from e
+            raise
+        finally:
+            latency = time.monotonic() - started
+            lease.close(lambda: self._release(latency, outcome))
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, limit=round(self.limit, 2), in_flight=self.in_flight,
+                        waiting=len(self._waiters), latency_ewma=self.latency_ewma)
+
+    def retry_after(self):
+        """Seconds until a slot is likely to be free, from queue depth and typical latency"""
+        capacity = max(self.min_limit, int(self.limit))
+        estimate = (len(self._waiters) + 1) * (self.latency_ewma or 1.0) / capacity
+        return max(1, min(60, math.ceil(estimate)))
+
+    def _acquire(self, priority):
+        with self._lock:
+            if not self._waiters and self.in_flight < max(self.min_limit, int(self.limit)):
+                self.in_flight += 1
+                self.stats['admitted'] += 1
+                return
+            if len(self._waiters) >= self.max_queue and not self._evict_worse(priority):
+                self.stats['rejected'] += 1
+                metrics.record_shed(self.name, 'queue_full')
+                raise UpstreamOverloaded(self.name, self.retry_after(), 'overloaded')
+            waiter = _Waiter()
+            entry = (priority, next(self._seq), waiter)
+            heapq.heappush(self._waiters, entry)
+            self.stats['queued'] += 1
+
+        # Never queue past the request's own deadline
+        remaining = deadline.remaining()
+        waiter.event.wait(self.queue_timeout if remaining is None else max(0, min(self.queue_timeout, remaining)))
+        with self._lock:
+            if waiter.granted:
+                self.stats['admitted'] += 1
+                return
+            if not waiter.evicted:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self.stats['timeouts'] += 1
+            metrics.record_shed(self.name, 'evicted' if waiter.evicted else 'queue_timeout')
+            raise UpstreamOverloaded(self.name, self.retry_after(), 'overloaded')
+
+    def _evict_worse(self, priority):
+        """Make room for `priority` by dropping the newest lowest-priority waiter, if it is worse"""
+        worst = max(self._waiters, key=lambda entry: (entry[0], entry[1]))
+        if worst[0] <= priority:
+            return False
+        self._waiters.remove(worst)
+        heapq.heapify(self._waiters)
+        worst[2].evicted = True
+        worst[2].event.set()
+        self.stats['evicted'] += 1
+        return True
+
+    def _release(self, latency, outcome):
+        now = time.monotonic()
+        with self._lock:
+            busy = self.in_flight >= max(self.min_limit, int(self.limit)) / 2
+            self.in_flight -= 1
+            if outcome == 'throttled':
+                self.stats['throttled'] += 1
+                self._decrease(now, self.backoff)
+            elif outcome == 'ok':
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+                if self.latency_threshold and latency > self.latency_threshold:
+                    self._decrease(now, 0.9)
+                elif busy:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._grant_waiters()
+        metrics.set_concurrency_limit(self.name, self.limit)
+
+    def _decrease(self, now, factor):
+        if now - self._last_decrease < (self.latency_ewma or 1.0):
+            return
+        self.limit = max(self.min_limit, self.limit * factor)
+        self._last_decrease = now
+
+    def _grant_waiters(self):
+        while self._waiters and self.in_flight < max(self.min_limit, int(self.limit)):
+            _, _, waiter = heapq.heappop(self._waiters)
+            waiter.granted = True
+            self.in_flight += 1
+            waiter.event.set()
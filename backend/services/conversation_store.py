@@ -0,0 +1,216 @@
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    turns TEXT NOT NULL,
+    turn_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversations_last_used ON conversations (last_used);
+"""
+
+
+class ConversationStore:
+    """Bounded, TTL-expiring server-side store for chat conversations.
+
+    Each conversation keeps the most recent turns verbatim. Older turns are
+    folded into a rolling plain-text summary so neither the request payload
+    nor the prompt grows without limit over a lesson. Stored in SQLite (WAL,
+    one connection per thread, reopened after a fork) so a conversation
+    started on one gunicorn worker continues on any other.
+    """
+
+    def __init__(self, path, max_conversations: int = 1000, ttl_seconds: int = 3600,
+                 max_turns: int = 10, summary_max_chars: int = 2000, timeout: float = 5.0):
+        self.path = path
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.summary_max_chars = summary_max_chars
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def create_conversation(self, history: Optional[List[Dict]] = None) -> str:
+        """Create a conversation, optionally seeded with client-side history"""
+        conversation_id = str(uuid.uuid4())
+        now = time.time()
+        conversation = {
+            'summary': '',
+            'turns': [],
+            'created_at': now,
+            'last_used': now,
+            'turn_count': 0
+        }
+        for msg in history or []:
+            self._append(conversation, msg.get('sender', 'user'), msg.get('text', ''))
+
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            self._write(db, conversation_id, conversation)
+            self._evict(db)
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return conversation_id
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        """Get a live conversation, or None if it is unknown or expired"""
+        return self._read(self._connection(), conversation_id)
+
+    def get_or_create(self, conversation_id: Optional[str],
+                      history: Optional[List[Dict]] = None) -> Tuple[Optional[str], Optional[Dict]]:
+        """Resolve a client conversation id; (None, None) if it is unknown or expired, a new one if not given"""
+        if conversation_id:
+            conversation = self.get_conversation(conversation_id)
+            if conversation is None:
+                return None, None
+            return conversation_id, conversation
+
+        conversation_id = self.create_conversation(history)
+        return conversation_id, self.get_conversation(conversation_id)
+
+    def get_history(self, conversation_id: str) -> Tuple[str, List[Dict]]:
+        """Return the rolling summary and recent turns for prompting"""
+        conversation = self.get_conversation(conversation_id)
+        if conversation is None:
+            return '', []
+        return conversation['summary'], conversation['turns']
+
+    def add_exchange(self, conversation_id: str, user_text: str, assistant_text: str) -> bool:
+        """Record a completed user/assistant exchange"""
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            conversation = self._read(db, conversation_id)
+            if conversation is not None:
+                self._append(conversation, 'user', user_text)
+                self._append(conversation, 'assistant', assistant_text)
+                conversation['last_used'] = time.time()
+                self._write(db, conversation_id, conversation)
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return conversation is not None
+
+    def delete_conversation(self, conversation_id: str) -> bool:
+        return self._connection().execute(
+            'DELETE FROM conversations WHERE id = ? AND last_used >= ?',
+            (conversation_id, time.time() - self.ttl_seconds)
+        ).rowcount > 0
+
+    def cleanup_expired(self) -> int:
+        """Drop expired conversations and return how many were removed"""
+        return self._connection().execute(
+            'DELETE FROM conversations WHERE last_used < ?', (time.time() - self.ttl_seconds,)
+        ).rowcount
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM conversations WHERE last_used >= ?', (time.time() - self.ttl_seconds,)
+        ).fetchone()[0]
+
+    def _read(self, db, conversation_id: str) -> Optional[Dict]:
+        row = db.execute(
+            'SELECT summary, turns, turn_count, created_at, last_used FROM conversations '
+            'WHERE id = ? AND last_used >= ?', (conversation_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'summary': row[0],
+            'turns': json.loads(row[1]),
+            'turn_count': row[2],
+            'created_at': row[3],
+            'last_used': row[4]
+        }
+
+    def _write(self, db, conversation_id: str, conversation: Dict):
+        db.execute(
+            'INSERT OR REPLACE INTO conversations (id, summary, turns, turn_count, created_at, last_used) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (conversation_id, conversation['summary'], json.dumps(conversation['turns']),
+             conversation['turn_count'], conversation['created_at'], conversation['last_used'])
+        )
+
+    def _append(self, conversation: Dict, sender: str, text: str):
+        conversation['turns'].append({
+            'sender': 'user' if sender == 'user' else 'assistant',
+            'text': text
+        })
+        conversation['turn_count'] += 1
+
+        overflow = len(conversation['turns']) - self.max_turns
+        if overflow > 0:
+            compacted = conversation['turns'][:overflow]
+            del conversation['turns'][:overflow]
+            conversation['summary'] = self._compact(conversation['summary'], compacted)
+
+    def _compact(self, summary: str, turns: List[Dict]) -> str:
+        """Fold old turns into the summary, keeping the first sentence of each"""
+        lines = [summary] if summary else []
+        for turn in turns:
+            speaker = 'Teacher' if turn['sender'] == 'user' else 'Veron'
+            lines.append(f"- {speaker}: {self._first_sentence(turn['text'])}")
+        summary = "\n".join(lines)
+
+        # Keep the newest part of the summary when it grows past the budget
+        if len(summary) > self.summary_max_chars:
+            summary = summary[-self.summary_max_chars:]
+            newline = summary.find("\n")
+            if newline != -1:
+                summary = summary[newline + 1:]
+        return summary
+
+    def _first_sentence(self, text: str, max_length: int = 200) -> str:
+        text = ' '.join(text.split())
+        match = re.search(r'[.!?](\s|$)', text)
+        sentence = text[:match.end()].strip() if match else text
+        if len(sentence) > max_length:
+            sentence = sentence[:max_length].rstrip() + "..."
+        return sentence
+
+    def _evict(self, db):
+        """Drop expired conversations and the least recently used beyond max_conversations"""
+        db.execute('DELETE FROM conversations WHERE last_used < ?', (time.time() - self.ttl_seconds,))
+        db.execute(
+            'DELETE FROM conversations WHERE id IN '
+            '(SELECT id FROM conversations ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+            (self.max_conversations,)
+        )
+
+
+# Global instance
+conversation_store = ConversationStore(
+    os.getenv('CONVERSATION_STORE_PATH', 'data/conversations.db'),
+    max_conversations=int(os.getenv('CONVERSATION_MAX_ENTRIES', 1000)),
+    ttl_seconds=int(os.getenv('CONVERSATION_TTL_SECONDS', 3600)),
+    max_turns=int(os.getenv('CONVERSATION_MAX_TURNS', 10)),
+    summary_max_chars=int(os.getenv('CONVERSATION_SUMMARY_MAX_CHARS', 2000))
+)
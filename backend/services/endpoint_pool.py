@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import random
+import threading
+import boto3
+from middleware.metrics import metrics
+from middleware.tracing import tracer
+from services.model_router import FAST, STANDARD
+from services.resilience import UpstreamOverloaded, is_throttle, is_upstream_fault
+
+
+class BedrockEndpoint:
+    """One region/model pairing in the pool, with its own client, load and health"""
+
+    def __init__(self, client, model_id, region, weight=1.0, name=None, tier=STANDARD):
+        self.client = client
+        self.model_id = model_id
+        self.region = region
+        self.weight = weight
+        self.tier = tier
+        self.name = name or f'{region}/{model_id}'
+        self.outstanding = 0
+        self.health = 1.0
+        self.latency_ewma = None
+        self.cooldown_until = 0.0
+        self.consecutive_throttles = 0
+        self.stats = {'requests': 0, 'ok': 0, 'throttled': 0, 'errors': 0}
+
+    def snapshot(self, now):
+        return dict(
+            self.stats,
+            name=self.name,
+            region=self.region,
+            model_id=self.model_id,
+            tier=self.tier,
+            weight=self.weight,
+            outstanding=self.outstanding,
+            health=round(self.health, 3),
+            latency_ewma=self.latency_ewma,
+            cooling_for=round(max(0.0, self.cooldown_until - now), 3)
+        )
+
+
+class EndpointPool:
+    """Spreads Bedrock calls across region/model endpoints.
+
+    Each call goes to the endpoint with the fewest outstanding requests
+    relative to weight x health, where health is an EWMA of recent outcomes.
+    A throttled endpoint cools down (doubling per consecutive throttle, up to
+    `max_cooldown`) and the call moves on to the next best endpoint, so one
+    region's quota spills over instead of failing the request. Server errors
+    also move on but only lower the endpoint's health. When every endpoint
+    is cooling down the call is shed with UpstreamOverloaded.
+
+    Endpoints belong to a model tier ("standard" or "fast"). A call for a
+    tier with no available endpoint falls back to the standard tier.
+
+    Configured with BEDROCK_ENDPOINTS, a JSON list of
+    {"region", "model_id", "tier", "weight", "endpoint_url", "name"}; without
+    it the pool is the AWS_REGION / BEDROCK_MODEL_ID endpoint, plus a fast
+    tier endpoint when BEDROCK_FAST_MODEL_ID is set.
+    """
+
+    def __init__(self, endpoints, cooldown=1.0, max_cooldown=30.0, health_decay=0.2, min_health=0.05):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.health_decay = health_decay
+        self.min_health = min_health
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, client=None):
+        region = os.getenv('AWS_REGION', 'us-west-2')
+        model_id = os.getenv('BEDROCK_MODEL_ID')
+        raw = os.getenv('BEDROCK_ENDPOINTS')
+        if raw:
+            specs = json.loads(raw)
+        else:
+            specs = [{'endpoint_url': os.getenv('BEDROCK_ENDPOINT_URL') or None}]
+            if os.getenv('BEDROCK_FAST_MODEL_ID'):
+                specs.append(dict(specs[0], model_id=os.getenv('BEDROCK_FAST_MODEL_ID'), tier=FAST))
+
+        clients = {}
+        endpoints = []
+        for spec in specs:
+            endpoint_region = spec.get('region', region)
+            key = (endpoint_region, spec.get('endpoint_url'))
+            if client is None and key not in clients:
+                clients[key] = tracer.instrument_boto3_client(boto3.client(
+                    'bedrock-runtime',
+                    region_name=endpoint_region,
+                    endpoint_url=spec.get('endpoint_url'),
+                    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+                ))
+            endpoints.append(BedrockEndpoint(
+                client or clients[key],
+                spec.get('model_id', model_id),
+                endpoint_region,
+                weight=float(spec.get('weight', 1)),
+                name=spec.get('name'),
+                tier=spec.get('tier', STANDARD)
+            ))
+        return cls(
+            endpoints,
+            cooldown=float(os.getenv('BEDROCK_ENDPOINT_COOLDOWN', 1)),
+            max_cooldown=float(os.getenv('BEDROCK_ENDPOINT_MAX_COOLDOWN', 30))
+        )
+
+    def invoke(self, body, tier=STANDARD):
+        """invoke_model on the best available endpoint of `tier`; returns (parsed body, endpoint name)"""
+        tried = set()
+        last_error = None
+        while True:
+            endpoint = self._acquire(tried, tier)
+            if endpoint is None:
+                break
+            tried.add(endpoint)
+            started = time.monotonic()
+            try:
+                response = endpoint.client.invoke_model(
+                    modelId=endpoint.model_id,
+                    contentType='application/json',
+                    accept='application/json',
+                    body=body
+                )
+                result = json.loads(response['body'].read())
+            except Exception as e:
+                if is_throttle(e):
+                    self._release(endpoint, 'throttled', time.monotonic() - started)
+                elif is_upstream_fault(e):
+                    self._release(endpoint, 'error', time.monotonic() - started)
+                else:
+                    # Our request was rejected; the endpoint itself is fine
+                    self._release(endpoint, 'rejected', time.monotonic() - started)
+                    raise
+                last_error = e
+                continue
+            self._release(endpoint, 'ok', time.monotonic() - started)
+            return result, endpoint.name
+
+        if last_error is not None:
+            raise last_error
+        raise UpstreamOverloaded('bedrock', self.retry_after(), 'throttling')
+
+    def has_tier(self, tier):
+        return any(endpoint.tier == tier for endpoint in self.endpoints)
+
+    def retry_after(self):
+        """Seconds until the first cooling endpoint is available again"""
+        now = time.monotonic()
+        return max(1, round(min(endpoint.cooldown_until for endpoint in self.endpoints) - now))
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return [endpoint.snapshot(now) for endpoint in self.endpoints]
+
+    def _acquire(self, tried, tier):
+        now = time.monotonic()
+        with self._lock:
+            available = [e for e in self.endpoints if e not in tried and e.cooldown_until <= now]
+            candidates = [e for e in available if e.tier == tier]
+            if not candidates and tier != STANDARD:
+                candidates = [e for e in available if e.tier == STANDARD]
+            if not candidates:
+                return None
+            # Weighted least-outstanding-requests; jitter breaks ties between idle endpoints
+            endpoint = min(candidates, key=lambda e: (
+                (e.outstanding + 1) / (e.weight * max(e.health, self.min_health)) + random.random() * 1e-6
+            ))
+            endpoint.outstanding += 1
+            endpoint.stats['requests'] += 1
+        metrics.set_endpoint_state(endpoint.name, endpoint.outstanding, endpoint.health)
+        return endpoint
+
+    def _release(self, endpoint, outcome, latency):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if outcome == 'ok':
+                endpoint.stats['ok'] += 1
+                endpoint.consecutive_throttles = 0
+                endpoint.latency_ewma = latency if endpoint.latency_ewma is None else 0.8 * endpoint.latency_ewma + 0.2 * latency
+            elif outcome == 'throttled':
+                endpoint.stats['throttled'] += 1
+                endpoint.consecutive_throttles += 1
+                backoff = self.cooldown * 2 ** (endpoint.consecutive_throttles - 1)
+                endpoint.cooldown_until = time.monotonic() + min(self.max_cooldown, backoff)
+            elif outcome == 'error':
+                endpoint.stats['errors'] += 1
+            if outcome != 'rejected':
+                score = 1.0 if outcome == 'ok' else 0.0
+                endpoint.health += self.health_decay * (score - endpoint.health)
+        metrics.set_endpoint_state(endpoint.name, endpoint.outstanding, endpoint.health)
+        metrics.record_endpoint_call(endpoint.name, outcome, latency)
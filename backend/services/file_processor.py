@@ -1,17 +1,53 @@
 import os
 import json
+import threading
 import PyPDF2
 import docx
 from datetime import datetime
 from typing import Dict, List, Optional
+import time
 import hashlib
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from middleware.metrics import metrics
+from middleware.tracing import tracer
+from services.ingestion_stats import IngestionStats
+
+# Sort keys for list_files(); ties are broken by file id
+SORT_KEYS = {
+    'processed_at': lambda f: f['processed_at'],
+    'original_filename': lambda f: f['original_filename'].lower(),
+    'file_size': lambda f: f['file_size'],
+    'word_count': lambda f: f['word_count'],
+}
+
+def file_version(file_data: Dict) -> int:
+    """64-bit version of one processed file; changes when it is reprocessed"""
+    digest = hashlib.sha1(f"{file_data['id']}|{file_data['processed_at']}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
 
 class FileProcessor:
     def __init__(self, upload_dir: str = "../uploads"):
         self.upload_dir = upload_dir
         self.processed_files = {}
         self.file_index = {}
+        # XOR of file_version() over the index: equal file sets give equal
+        # versions in every worker, and add/delete update it in O(1)
+        self._index_digest = 0
+        # sort key -> (index digest, sorted [(value, id)]); rebuilt when the index changes
+        self._sorted = {}
+        # Corpus aggregates, kept current by _index_add/_index_remove
+        self._totals = {'files': 0, 'size': 0, 'words': 0}
+        self._file_types = {}
+        self.ingestion = IngestionStats.from_env()
+        self._lock = threading.Lock()
         
+    @contextmanager
+    def _stage(self, stage: str):
+        """Time an ingestion/retrieval stage for metrics and tracing"""
+        with tracer.span(f'file_processor.{stage}'), metrics.time_stage(stage):
+            yield
+
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text content from PDF files"""
         try:
@@ -60,16 +96,25 @@ class FileProcessor:
             
             # Extract text based on file type
             extracted_text = ""
-            if file_extension == 'pdf':
-                extracted_text = self.extract_text_from_pdf(full_path)
-            elif file_extension in ['docx', 'doc']:
-                extracted_text = self.extract_text_from_docx(full_path)
-            elif file_extension in ['txt', 'md']:
-                extracted_text = self.extract_text_from_txt(full_path)
+            extract_started = time.perf_counter()
+            with self._stage('extract_text'):
+                if file_extension == 'pdf':
+                    extracted_text = self.extract_text_from_pdf(full_path)
+                elif file_extension in ['docx', 'doc']:
+                    extracted_text = self.extract_text_from_docx(full_path)
+                elif file_extension in ['txt', 'md']:
+                    extracted_text = self.extract_text_from_txt(full_path)
+            extract_ms = (time.perf_counter() - extract_started) * 1000
             
             # Generate file hash for deduplication
-            with open(full_path, 'rb') as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()
+            with self._stage('hash'):
+                with open(full_path, 'rb') as f:
+                    file_hash = hashlib.md5(f.read()).hexdigest()
+            
+            with self._stage('summary'):
+                summary = self._generate_summary(extracted_text)
+            with self._stage('keywords'):
+                keywords = self._extract_keywords(extracted_text)
             
             # Create processed file record
             processed_file = {
@@ -82,18 +127,25 @@ class FileProcessor:
                 'text_length': len(extracted_text),
                 'processed_at': datetime.now().isoformat(),
                 'word_count': len(extracted_text.split()) if extracted_text else 0,
-                'summary': self._generate_summary(extracted_text),
-                'keywords': self._extract_keywords(extracted_text)
+                'summary': summary,
+                'keywords': keywords
             }
             
             # Store in memory index
-            self.processed_files[file_hash] = processed_file
-            self.file_index[original_filename] = file_hash
+            with self._lock:
+                previous = self.processed_files.get(file_hash)
+                if previous is not None:
+                    self._index_remove(previous)
+                self.processed_files[file_hash] = processed_file
+                self.file_index[original_filename] = file_hash
+                self._index_add(processed_file)
+            self.ingestion.record(file_size, extract_ms)
             
             return processed_file
             
         except Exception as e:
             print(f"Error processing file {file_path}: {e}")
+            self.ingestion.record(0, 0, ok=False)
             return {
                 'error': str(e),
                 'file_path': file_path,
@@ -149,6 +201,87 @@ class FileProcessor:
         """Get all processed files"""
         return list(self.processed_files.values())
     
+    def _index_add(self, file_data: Dict):
+        """Fold a file into the index version and aggregates (caller holds _lock)"""
+        self._index_digest ^= file_version(file_data)
+        self._totals['files'] += 1
+        self._totals['size'] += file_data['file_size']
+        self._totals['words'] += file_data['word_count']
+        file_type = file_data['file_type']
+        self._file_types[file_type] = self._file_types.get(file_type, 0) + 1
+    
+    def _index_remove(self, file_data: Dict):
+        """Undo _index_add for a file leaving the index (caller holds _lock)"""
+        self._index_digest ^= file_version(file_data)
+        self._totals['files'] -= 1
+        self._totals['size'] -= file_data['file_size']
+        self._totals['words'] -= file_data['word_count']
+        file_type = file_data['file_type']
+        self._file_types[file_type] -= 1
+        if not self._file_types[file_type]:
+            del self._file_types[file_type]
+    
+    def get_stats(self) -> Dict:
+        """Corpus aggregates as one consistent snapshot, plus recent ingestion rates; O(1) in corpus size"""
+        with self._lock:
+            stats = {
+                'index_version': self.index_version(),
+                'total_files': self._totals['files'],
+                'total_size': self._totals['size'],
+                'total_words': self._totals['words'],
+                'file_types': dict(self._file_types)
+            }
+        stats['ingested'] = self.ingestion.totals()
+        stats['ingestion'] = self.ingestion.snapshot()
+        return stats
+    
+    def index_version(self) -> str:
+        """Version of the whole index, for ETags on file listings"""
+        return f'{self._index_digest:016x}'
+    
+    def get_indexed_files(self):
+        """(index_version(), all processed files), read together so the version matches the list"""
+        with self._lock:
+            return self.index_version(), list(self.processed_files.values())
+    
+    def list_files(self, sort: str = 'processed_at', descending: bool = True,
+                   after: Optional[List] = None, limit: int = 50):
+        """One page of processed files in `sort` order, after the keyset `after` ([value, id]).
+        
+        Returns (index version, files, keyset of the next page or None, totals).
+        The sorted keys are cached per index version, so a page costs a
+        binary search plus `limit` lookups.
+        """
+        with self._lock:
+            version = self._index_digest
+            cached = self._sorted.get(sort)
+            if cached is None or cached[0] != version:
+                files = [f for f in self.processed_files.values() if 'error' not in f]
+                cached = (version, sorted((SORT_KEYS[sort](f), f['id']) for f in files))
+                self._sorted[sort] = cached
+            keys = cached[1]
+            totals = {
+                'total_files': self._totals['files'],
+                'total_size': self._totals['size'],
+                'total_words': self._totals['words']
+            }
+            
+            try:
+                if descending:
+                    end = len(keys) if after is None else bisect_left(keys, tuple(after))
+                    page_keys = keys[max(0, end - limit):end][::-1]
+                    has_more = end > limit
+                else:
+                    start = 0 if after is None else bisect_right(keys, tuple(after))
+                    page_keys = keys[start:start + limit]
+                    has_more = start + limit < len(keys)
+            except TypeError:
+                raise ValueError(f"Cursor does not match sort key '{sort}'")
+            page = [self.processed_files[file_id] for _, file_id in page_keys]
+        
+        next_after = list(page_keys[-1]) if has_more and page_keys else None
+        return f'{version:016x}', page, next_after, totals
+    
     def get_file_by_id(self, file_id: str) -> Optional[Dict]:
         """Get a specific processed file by ID"""
         return self.processed_files.get(file_id)
@@ -171,31 +304,35 @@ class FileProcessor:
     def delete_file(self, file_id: str) -> bool:
         """Delete a processed file from index and filesystem"""
         try:
-            if file_id in self.processed_files:
-                file_data = self.processed_files[file_id]
-                file_path = os.path.join(self.upload_dir, file_data['file_path'])
-                
-                # Remove from filesystem if exists
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                
-                # Remove from indexes
-                del self.processed_files[file_id]
-                
+            # Pop under the lock so the aggregates are updated with the record actually removed
+            with self._lock:
+                file_data = self.processed_files.pop(file_id, None)
+                if file_data is None:
+                    return False
+                self._index_remove(file_data)
+
                 # Remove from filename index
                 for filename, fid in list(self.file_index.items()):
                     if fid == file_id:
                         del self.file_index[filename]
                         break
-                
-                return True
-            return False
+
+            # Remove from filesystem if exists
+            file_path = os.path.join(self.upload_dir, file_data['file_path'])
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+            return True
         except Exception as e:
             print(f"Error deleting file {file_id}: {e}")
             return False
     
     def get_context_for_agent(self, query: str, max_files: int = 5) -> str:
         """Get relevant file content as context for agent queries"""
+        with self._stage('context'):
+            return self._build_context(query, max_files)
+
+    def _build_context(self, query: str, max_files: int) -> str:
         query_keywords = query.lower().split()
         
         # Score files based on keyword relevance
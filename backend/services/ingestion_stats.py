@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+
+# Upper bounds (ms) of the extraction latency histogram; the last bin is open-ended
+LATENCY_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Reported windows: label -> seconds
+WINDOWS = {'1m': 60, '5m': 300, '1h': 3600}
+
+
+class _Bucket:
+    __slots__ = ('slot', 'docs', 'failed', 'bytes', 'latency')
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, slot):
+        self.slot = slot
+        self.docs = 0
+        self.failed = 0
+        self.bytes = 0
+        self.latency = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+
+class IngestionStats:
+    """Time-bucketed FileProcessor ingestion counters.
+
+    A ring of `bucket_seconds` buckets covering `retention` seconds holds
+    documents, failures, bytes and an extraction latency histogram. A
+    snapshot merges the buckets of each window, so its cost depends on the
+    retention and not on how many files were ingested. Successes and
+    failures are also counted since startup (`totals()`).
+    """
+
+    def __init__(self, bucket_seconds=10, retention=3600):
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self._buckets = [_Bucket() for _ in range(max(1, -(-retention // bucket_seconds)))]
+        self._succeeded = 0
+        self._failed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            bucket_seconds=int(os.getenv('FILE_STATS_BUCKET_SECONDS', 10)),
+            retention=int(os.getenv('FILE_STATS_RETENTION_SECONDS', 3600))
+        )
+
+    def record(self, size_bytes, extract_ms, ok=True, now=None):
+        slot = int((time.time() if now is None else now) // self.bucket_seconds)
+        with self._lock:
+            bucket = self._buckets[slot % len(self._buckets)]
+            if bucket.slot != slot:
+                bucket.reset(slot)
+            if ok:
+                self._succeeded += 1
+                bucket.docs += 1
+                bucket.bytes += size_bytes
+                bucket.latency[bisect_left(LATENCY_BOUNDS_MS, extract_ms)] += 1
+            else:
+                self._failed += 1
+                bucket.failed += 1
+
+    def totals(self):
+        """Ingestions that succeeded and failed since startup"""
+        with self._lock:
+            return {'succeeded': self._succeeded, 'failed': self._failed}
+
+    def snapshot(self, now=None):
+        now = time.time() if now is None else now
+        current = int(now // self.bucket_seconds)
+        windows = {}
+        with self._lock:
+            for label, seconds in WINDOWS.items():
+                seconds = min(seconds, self.retention)
+                oldest = current - max(1, -(-seconds // self.bucket_seconds)) + 1
+                docs = failed = size = 0
+                latency = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+                for bucket in self._buckets:
+                    if bucket.slot is not None and oldest <= bucket.slot <= current:
+                        docs += bucket.docs
+                        failed += bucket.failed
+                        size += bucket.bytes
+                        latency = [a + b for a, b in zip(latency, bucket.latency)]
+                windows[label] = {
+                    'docs': docs,
+                    'failed': failed,
+                    'bytes': size,
+                    'docs_per_min': round(docs * 60 / seconds, 3),
+                    'bytes_per_sec': round(size / seconds, 1),
+                    'extract_ms': self._percentiles(latency, (50, 95, 99))
+                }
+        return windows
+
+    @staticmethod
+    def _percentiles(histogram, pcts):
+        """Upper bound of the bin holding each pct-th sample (None without samples).
+
+        The last bin has no upper bound: percentiles landing there are
+        reported as the last finite bound and `overflow` is set, meaning
+        they are lower bounds.
+        """
+        result = {'overflow': False}
+        total = sum(histogram)
+        for pct in pcts:
+            result[f'p{pct}'] = None
+            if not total:
+                continue
+            rank = max(1, round(pct / 100 * total))
+            seen = 0
+            for index, count in enumerate(histogram):
+                seen += count
+                if seen >= rank:
+                    break
+            if index >= len(LATENCY_BOUNDS_MS):
+                result['overflow'] = True
+            result[f'p{pct}'] = LATENCY_BOUNDS_MS[min(index, len(LATENCY_BOUNDS_MS) - 1)]
+        return result
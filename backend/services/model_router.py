@@ -0,0 +1,115 @@
+import os
+import logging
+from middleware.async_logging import log_writer, json_file_handler
+
+STANDARD = 'standard'
+FAST = 'fast'
+
+# Routing decisions and their outcomes, one JSON line each, for offline tuning
+decision_logger = logging.getLogger('veron.routing')
+decision_logger.propagate = False
+_routing_log = os.getenv('BEDROCK_ROUTING_LOG', 'logs/routing.log')
+if _routing_log:
+    decision_logger.addHandler(log_writer.attach(json_file_handler(_routing_log)))
+    decision_logger.setLevel(logging.INFO)
+
+
+def extract_features(operation, message='', history=None, context='', summary='', **extra):
+    """Cheap request features a router can decide on without calling a model"""
+    message = message or ''
+    features = {
+        'operation': operation,
+        'message_chars': len(message),
+        'message_lines': message.count('\n') + 1 if message else 0,
+        'question': message.rstrip().endswith('?'),
+        'history_depth': len(history or []),
+        'has_context': bool(context),
+        'has_summary': bool(summary)
+    }
+    features.update(extra)
+    return features
+
+
+class RoutingDecision:
+    """Which model tier serves a request and how many tokens it may generate"""
+
+    def __init__(self, tier, max_tokens, reason, features):
+        self.tier = tier
+        self.max_tokens = max_tokens
+        self.reason = reason
+        self.features = features
+
+
+class StaticRouter:
+    """Every request on the standard tier with the operation's fixed token budget"""
+
+    name = 'static'
+    MAX_TOKENS = {'generate_response': 2000, 'generate_lesson_plan': 3000, 'analyze_document': 2000}
+
+    def route(self, features):
+        return RoutingDecision(STANDARD, self.MAX_TOKENS.get(features['operation'], 2000), 'static', features)
+
+
+class HeuristicRouter(StaticRouter):
+    """Sends short, self-contained chat turns to the fast tier with a smaller max_tokens.
+
+    A turn is "simple" when it is a single short line with little history
+    and no knowledge-base context or summary to reason over, e.g. "what does
+    IoT stand for?". Only used when the pool has a fast endpoint; everything
+    else stays on the standard tier with the static budgets, so enabling
+    the router never truncates standard-model replies.
+    """
+
+    name = 'heuristic'
+
+    def __init__(self, fast_max_chars=160, fast_max_history=4, fast_max_tokens=600, fast_available=True):
+        self.fast_max_chars = fast_max_chars
+        self.fast_max_history = fast_max_history
+        self.fast_max_tokens = fast_max_tokens
+        self.fast_available = fast_available
+
+    @classmethod
+    def from_env(cls, fast_available=True):
+        return cls(
+            fast_max_chars=int(os.getenv('BEDROCK_ROUTER_FAST_MAX_CHARS', 160)),
+            fast_max_history=int(os.getenv('BEDROCK_ROUTER_FAST_MAX_HISTORY', 4)),
+            fast_max_tokens=int(os.getenv('BEDROCK_ROUTER_FAST_MAX_TOKENS', 600)),
+            fast_available=fast_available
+        )
+
+    def route(self, features):
+        if (self.fast_available and features['operation'] == 'generate_response'
+                and features['message_chars'] <= self.fast_max_chars and features['message_lines'] == 1
+                and features['history_depth'] <= self.fast_max_history
+                and not features['has_context'] and not features['has_summary']):
+            return RoutingDecision(FAST, self.fast_max_tokens, 'short self-contained turn', features)
+        return super().route(features)
+
+
+ROUTERS = {'static': StaticRouter, 'heuristic': HeuristicRouter}
+
+
+def router_from_env(fast_available=False):
+    """Router named by BEDROCK_ROUTER (default static); `fast_available` says whether the pool has a fast endpoint"""
+    name = os.getenv('BEDROCK_ROUTER', 'static').lower()
+    if name not in ROUTERS:
+        raise ValueError(f"Unknown BEDROCK_ROUTER '{name}', expected one of {sorted(ROUTERS)}")
+    router_class = ROUTERS[name]
+    return router_class.from_env(fast_available) if hasattr(router_class, 'from_env') else router_class()
+
+
+def log_decision(decision, router, endpoint, outcome, latency_ms, response_body=None):
+    usage = (response_body or {}).get('usage') or {}
+    decision_logger.info('route', extra={
+        'router': router.name,
+        'operation': decision.features['operation'],
+        'tier': decision.tier,
+        'endpoint': endpoint,
+        'max_tokens': decision.max_tokens,
+        'reason': decision.reason,
+        'features': decision.features,
+        'outcome': outcome,
+        'latency_ms': round(latency_ms, 1),
+        'output_tokens': usage.get('output_tokens'),
+        'stop_reason': (response_body or {}).get('stop_reason')
+    })
@@ -0,0 +1,267 @@
+import os
+import math
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from middleware.deadline import deadline
+from middleware.metrics import metrics
+
+THROTTLE_CODES = ('ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException')
+
+# Shared by every guarded upstream; only used when a call has a deadline or may be hedged
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('UPSTREAM_MAX_THREADS', 32)),
+                               thread_name_prefix='upstream')
+
+
+def is_throttle(error):
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code') in THROTTLE_CODES
+    return False
+
+
+def is_upstream_fault(error):
+    """Errors that say the upstream is unhealthy (5xx, timeouts, connection errors), not that we sent a bad request"""
+    if is_throttle(error):
+        return False
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('ResponseMetadata', {}).get('HTTPStatusCode', 500) >= 500
+    status = getattr(response, 'status_code', None)
+    return status is None or status >= 500
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call was refused or abandoned; routes answer with `status_code` and Retry-After"""
+
+    status_code = 503
+
+    def __init__(self, upstream, retry_after=1, reason='unavailable'):
+        super().__init__(f"{upstream} is {reason}, retry after {retry_after}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class UpstreamOverloaded(UpstreamUnavailable):
+    """The upstream is throttling us or its local wait queue is full"""
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """The upstream has been failing and calls are short-circuited until it recovers"""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """The request's time budget ran out before the upstream answered"""
+
+    status_code = 504
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive upstream faults, then lets one probe through after `reset_timeout`"""
+
+    STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == 'open':
+                waited = time.monotonic() - self.opened_at
+                if waited < self.reset_timeout:
+                    raise CircuitOpen(self.name, math.ceil(self.reset_timeout - waited), 'failing')
+                self._set_state('half_open')
+            if self.state == 'half_open':
+                if self._probing:
+                    raise CircuitOpen(self.name, 1, 'recovering')
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != 'closed':
+                self._set_state('closed')
+
+    def record_abandoned(self):
+        """The caller gave up before the upstream answered: not a fault, but a half-open probe is over"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state('open')
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.set_circuit_state(self.name, self.STATES[state])
+
+
+class UpstreamGuard:
+    """Circuit breaker, deadline and optional hedging around calls to one upstream.
+
+    With a request deadline the call runs on a shared thread pool and is
+    abandoned (DeadlineExceeded) when the budget runs out, freeing the
+    worker. Idempotent calls can be hedged: once enough latencies are known,
+    a duplicate is sent if the first attempt is slower than the p95 for that
+    operation, and the first successful reply wins. Hedges are limited to
+    `hedge_budget` of calls so upstream spend stays bounded.
+
+    A deadline comes from the client, so running out of it does not count
+    against the breaker. Attempts left behind (abandoned or losing hedges)
+    are cancelled if they have not started; ones already running are handed
+    to `lease.hold()` so the caller's concurrency slot stays taken until
+    they return.
+    """
+
+    def __init__(self, name, breaker, hedge=False, hedge_quantile=0.95, hedge_budget=0.05,
+                 min_samples=20, window=200):
+        self.name = name
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_budget = hedge_budget
+        self.min_samples = min_samples
+        self.window = window
+        self.stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'deadline_exceeded': 0, 'short_circuited': 0}
+        self._latencies = {}
+        self._hedge_tokens = 1.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name, prefix):
+        return cls(
+            name,
+            CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv(f'{prefix}_BREAKER_FAILURES', 5)),
+                reset_timeout=float(os.getenv(f'{prefix}_BREAKER_RESET_SECONDS', 30))
+            ),
+            hedge=os.getenv(f'{prefix}_HEDGE', 'false').lower() == 'true',
+            hedge_budget=float(os.getenv(f'{prefix}_HEDGE_BUDGET', 0.05))
+        )
+
+    def call(self, operation, fn, idempotent=False, is_failure=None, lease=None):
+        """Run fn() under the breaker and request deadline; `is_failure(result)` flags non-exception faults"""
+        remaining = deadline.remaining()
+        if remaining is not None and remaining <= 0:
+            self.stats['deadline_exceeded'] += 1
+            raise DeadlineExceeded(self.name, 1, 'out of time')
+        try:
+            self.breaker.before_call()
+        except CircuitOpen:
+            self.stats['short_circuited'] += 1
+            raise
+        self.stats['calls'] += 1
+
+        hedge_after = self._hedge_delay(operation) if idempotent and self.hedge else None
+        try:
+            if remaining is None and hedge_after is None:
+                result = self._timed(operation, fn)
+            else:
+                result = self._call_async(operation, fn, remaining, hedge_after, lease)
+        except DeadlineExceeded:
+            self.stats['deadline_exceeded'] += 1
+            self.breaker.record_abandoned()
+            raise
+        except Exception as e:
+            if is_upstream_fault(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+
+        if is_failure is not None and is_failure(result):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return result
+
+    def snapshot(self):
+        return dict(
+            self.stats,
+            circuit=self.breaker.state,
+            hedge_after={op: self._hedge_delay(op) for op in list(self._latencies)} if self.hedge else {}
+        )
+
+    def _timed(self, operation, fn):
+        started = time.monotonic()
+        result = fn()
+        with self._lock:
+            samples = self._latencies.setdefault(operation, deque(maxlen=self.window))
+            samples.append(time.monotonic() - started)
+        return result
+
+    def _hedge_delay(self, operation):
+        with self._lock:
+            samples = sorted(self._latencies.get(operation, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * self.hedge_quantile))]
+
+    def _take_hedge_token(self):
+        with self._lock:
+            if self._hedge_tokens >= 1:
+                self._hedge_tokens -= 1
+                return True
+            return False
+
+    def _submit(self, operation, fn):
+        # Each attempt gets its own copy of the caller's context (trace span, request)
+        return _executor.submit(contextvars.copy_context().run, self._timed, operation, fn)
+
+    def _leave_behind(self, futures, lease):
+        """Cancel attempts that have not started; running ones keep the caller's lease until they return"""
+        for future in futures:
+            if not future.cancel() and lease is not None:
+                lease.hold(future)
+
+    def _call_async(self, operation, fn, remaining, hedge_after, lease=None):
+        ends_at = None if remaining is None else time.monotonic() + remaining
+        with self._lock:
+            self._hedge_tokens = min(10.0, self._hedge_tokens + self.hedge_budget)
+
+        primary = self._submit(operation, fn)
+        pending = {primary}
+        if hedge_after is not None:
+            first_wait = hedge_after if ends_at is None else min(hedge_after, remaining)
+            done, _ = wait(pending, timeout=first_wait)
+            if not done and (ends_at is None or time.monotonic() < ends_at) and self._take_hedge_token():
+                pending.add(self._submit(operation, fn))
+                self.stats['hedged'] += 1
+                metrics.record_hedge(self.name, 'fired')
+
+        error = None
+        while pending:
+            timeout = None if ends_at is None else ends_at - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self.stats['hedge_wins'] += 1
+                        metrics.record_hedge(self.name, 'won')
+                    self._leave_behind(pending, lease)
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        self._leave_behind(pending, lease)
+        raise DeadlineExceeded(self.name, 1, 'too slow')
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Expiry for entries kept until overwritten (year 9999)
+NEVER = 253402300799.0
+
+
+class ResponseStore:
+    """Generated responses keyed by the request that produced them.
+
+    Stored in SQLite (WAL, one connection per thread, reopened after a fork)
+    so every gunicorn worker shares one copy and it survives restarts, which
+    lets responses be precomputed offline. Entries expire after `ttl` seconds
+    (0 keeps them until overwritten).
+    """
+
+    def __init__(self, path, ttl=0.0, timeout=5.0):
+        self.path = path
+        self.ttl = ttl
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    @staticmethod
+    def key(operation, **params):
+        payload = json.dumps([operation, params], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM responses WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, value, ttl=None):
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO responses (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), now, self._expires_at(now, ttl))
+        )
+
+    def add(self, key, value, ttl=None):
+        """Store `value` only if `key` has no live entry; returns True when it was stored"""
+        now = time.time()
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM responses WHERE key = ? AND expires_at <= ?', (key, now))
+            added = db.execute(
+                'INSERT OR IGNORE INTO responses (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now, self._expires_at(now, ttl))
+            ).rowcount == 1
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return added
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def _expires_at(self, now, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        return now + ttl if ttl else NEVER
+
+    def contains(self, key):
+        return self._connection().execute(
+            'SELECT 1 FROM responses WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone() is not None
+
+    def purge(self):
+        """Delete expired entries; returns how many were removed"""
+        return self._connection().execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def stats(self):
+        count, oldest = self._connection().execute(
+            'SELECT COUNT(*), MIN(created_at) FROM responses WHERE expires_at > ?', (time.time(),)
+        ).fetchone()
+        return {'entries': count, 'oldest': oldest}
+
+
+def lesson_plan_key(topic, level, duration):
+    """Store key for a lesson plan; topics differing only in case or spacing share an entry.
+
+    The model is part of the key so changing BEDROCK_MODEL_ID does not serve
+    plans written by the previous model.
+    """
+    return ResponseStore.key(
+        'generate_lesson_plan',
+        topic=' '.join(topic.lower().split()),
+        level=level,
+        duration=int(duration),
+        model=os.getenv('BEDROCK_MODEL_ID')
+    )
+
+
+# Global instance
+lesson_plan_store = ResponseStore(
+    os.getenv('LESSON_PLAN_STORE_PATH', 'data/lesson_plans.db'),
+    ttl=float(os.getenv('LESSON_PLAN_STORE_TTL', 7 * 24 * 3600))
+)
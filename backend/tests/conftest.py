@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# Importing the services builds their module-level instances; keep them off AWS and the working tree
+os.environ.setdefault('AWS_REGION', 'us-west-2')
+os.environ.setdefault('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
+os.environ.setdefault('BEDROCK_ROUTING_LOG', '')
+os.environ.setdefault('RATE_LIMIT_STORAGE_URI', 'memory://')
+_data_dir = tempfile.mkdtemp(prefix='veron-tests-')
+os.environ.setdefault('LESSON_PLAN_STORE_PATH', os.path.join(_data_dir, 'lesson_plans.db'))
+os.environ.setdefault('CONVERSATION_STORE_PATH', os.path.join(_data_dir, 'conversations.db'))
+os.environ.setdefault('AGENT_TRACE_STORE_PATH', os.path.join(_data_dir, 'agent_traces.db'))
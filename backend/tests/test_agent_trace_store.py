@@ -0,0 +1,42 @@
+from services.agent_trace_store import AgentTraceStore
+
+
+def store(path, **options):
+    return AgentTraceStore(str(path / 'traces.db'), **options)
+
+
+def test_opt_in_and_captures_are_shared_between_instances(tmp_path):
+    first, second = store(tmp_path), store(tmp_path)
+    first.enable_session('s1')
+    assert second.should_capture('s1')
+    assert not second.should_capture('s2')
+
+    second.add('s1', [{'rationale': {'text': 'step'}}])
+    captures = first.get('s1')
+    assert [capture['event_count'] for capture in captures] == [1]
+    assert captures[0]['events'] == [{'rationale': {'text': 'step'}}]
+
+
+def test_captures_per_session_are_bounded(tmp_path):
+    traces = store(tmp_path, max_captures_per_session=2)
+    for count in range(1, 4):
+        traces.add('s1', [{}] * count)
+    assert [capture['event_count'] for capture in traces.get('s1')] == [2, 3]
+
+
+def test_least_recently_used_sessions_are_evicted(tmp_path):
+    traces = store(tmp_path, max_sessions=2)
+    for session_id in ('s1', 's2', 's3'):
+        traces.enable_session(session_id)
+    traces.add('s3', [{}])
+    assert not traces.is_session_enabled('s1')
+    assert traces.is_session_enabled('s2') and traces.is_session_enabled('s3')
+
+
+def test_clear_discards_captures_and_opt_in(tmp_path):
+    traces = store(tmp_path)
+    traces.enable_session('s1')
+    traces.add('s1', [{}])
+    traces.clear('s1')
+    assert traces.get('s1') is None
+    assert not traces.is_session_enabled('s1')
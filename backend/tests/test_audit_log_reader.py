@@ -0,0 +1,20 @@
+from services.audit_log_reader import parse_log_line
+
+
+def test_json_record():
+    line = '{"timestamp": "2024-01-01T00:00:00+00:00", "level": "WARNING", "message": "Blocked IP"}'
+    assert parse_log_line(line) == {
+        'timestamp': '2024-01-01T00:00:00+00:00', 'level': 'WARNING', 'message': 'Blocked IP'
+    }
+
+
+def test_plain_text_record():
+    line = '2024-01-01 00:00:00,123 WARNING: Blocked IP 10.0.0.1'
+    assert parse_log_line(line) == {
+        'timestamp': '2024-01-01 00:00:00,123', 'level': 'WARNING', 'message': 'Blocked IP 10.0.0.1'
+    }
+
+
+def test_json_that_is_not_an_object_falls_back_to_text():
+    assert parse_log_line('123') == {'timestamp': '123', 'level': '', 'message': ''}
+    assert parse_log_line('[1, 2, 3]')['timestamp'] == '[1, 2,'
@@ -0,0 +1,42 @@
+from services.conversation_store import ConversationStore
+
+
+def store(path, **options):
+    return ConversationStore(str(path / 'conversations.db'), **options)
+
+
+def test_conversation_is_shared_between_instances(tmp_path):
+    first, second = store(tmp_path), store(tmp_path)
+    conversation_id, _ = first.get_or_create(None, [{'sender': 'user', 'text': 'Hello.'}])
+    assert second.add_exchange(conversation_id, 'What is IoT?', 'Connected devices.')
+
+    summary, turns = first.get_history(conversation_id)
+    assert summary == ''
+    assert [turn['text'] for turn in turns] == ['Hello.', 'What is IoT?', 'Connected devices.']
+
+
+def test_unknown_id_is_not_replaced(tmp_path):
+    conversations = store(tmp_path)
+    assert conversations.get_or_create('missing') == (None, None)
+    assert len(conversations) == 0
+
+
+def test_old_turns_fold_into_summary(tmp_path):
+    conversations = store(tmp_path, max_turns=2)
+    conversation_id = conversations.create_conversation()
+    conversations.add_exchange(conversation_id, 'First question. More.', 'First answer.')
+    conversations.add_exchange(conversation_id, 'Second question.', 'Second answer.')
+    summary, turns = conversations.get_history(conversation_id)
+    assert summary == '- Teacher: First question.\n- Veron: First answer.'
+    assert len(turns) == 2
+
+
+def test_expired_and_least_recent_conversations_are_dropped(tmp_path):
+    conversations = store(tmp_path, max_conversations=2)
+    ids = [conversations.create_conversation() for _ in range(3)]
+    assert conversations.get_conversation(ids[0]) is None
+    assert conversations.get_conversation(ids[2]) is not None
+
+    conversations.ttl_seconds = -1
+    assert conversations.get_conversation(ids[2]) is None
+    assert not conversations.delete_conversation(ids[2])
@@ -0,0 +1,26 @@
+from services.file_processor import FileProcessor
+
+
+def ingest(processor, tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return processor.process_file(str(path), name)
+
+
+def test_delete_undoes_aggregates(tmp_path):
+    processor = FileProcessor(upload_dir=str(tmp_path))
+    empty_version = processor.index_version()
+    first = ingest(processor, tmp_path, 'sensors.txt', 'Sensors measure temperature and light.')
+    ingest(processor, tmp_path, 'chips.txt', 'Chips contain billions of transistors.')
+
+    assert processor.delete_file(first['id'])
+    assert not processor.delete_file(first['id'])
+    stats = processor.get_stats()
+    assert stats['total_files'] == 1
+    assert stats['file_types'] == {'txt': 1}
+    assert not (tmp_path / 'sensors.txt').exists()
+
+    remaining = processor.get_all_processed_files()[0]
+    assert processor.delete_file(remaining['id'])
+    assert processor.get_stats()['total_files'] == 0
+    assert processor.index_version() == empty_version
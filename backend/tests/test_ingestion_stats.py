@@ -0,0 +1,33 @@
+from services.ingestion_stats import IngestionStats, LATENCY_BOUNDS_MS
+
+
+def test_overflow_bin_has_no_upper_bound():
+    stats = IngestionStats()
+    stats.record(100, 3, now=0)
+    stats.record(100, LATENCY_BOUNDS_MS[-1] + 1, now=0)
+    stats.record(100, LATENCY_BOUNDS_MS[-1] * 4, now=0)
+    extract_ms = stats.snapshot(now=0)['1m']['extract_ms']
+    assert extract_ms == {'p50': LATENCY_BOUNDS_MS[-1], 'p95': LATENCY_BOUNDS_MS[-1],
+                          'p99': LATENCY_BOUNDS_MS[-1], 'overflow': True}
+
+
+def test_percentiles_use_bin_upper_bounds():
+    stats = IngestionStats()
+    for ms in (1, 4, 4, 40):
+        stats.record(100, ms, now=0)
+    extract_ms = stats.snapshot(now=0)['1m']['extract_ms']
+    assert (extract_ms['p50'], extract_ms['p99'], extract_ms['overflow']) == (5, 50, False)
+
+
+def test_no_samples():
+    extract_ms = IngestionStats().snapshot(now=0)['1m']['extract_ms']
+    assert extract_ms == {'p50': None, 'p95': None, 'p99': None, 'overflow': False}
+
+
+def test_failures_are_counted_since_startup():
+    stats = IngestionStats(bucket_seconds=10, retention=60)
+    stats.record(100, 5, now=0)
+    stats.record(0, 0, ok=False, now=0)
+    stats.record(0, 0, ok=False, now=3600)
+    assert stats.snapshot(now=3600)['1m']['failed'] == 1
+    assert stats.totals() == {'succeeded': 1, 'failed': 2}
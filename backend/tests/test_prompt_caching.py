@@ -0,0 +1,77 @@
+import pytest
+
+from emulator.bedrock_runtime import PromptCache, count_tokens
+from services.bedrock_service import BedrockService, VERON_SYSTEM_PROMPT
+
+LONG_CONTEXT = 'Transistors switch current in a chip. ' * 200
+SHORT_CONTEXT = 'Transistors switch current in a chip.'
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv('BEDROCK_PROMPT_CACHING', 'true')
+    monkeypatch.setenv('BEDROCK_CACHE_MIN_TOKENS', '1024')
+    return BedrockService(client=object())
+
+
+def marked(system):
+    return [block for block in system if 'cache_control' in block]
+
+
+def request_body(system, message='What is a transistor?'):
+    return {'system': system, 'messages': [{'role': 'user', 'content': message}]}
+
+
+def test_fixed_prompt_alone_gets_no_checkpoint(service):
+    assert count_tokens(VERON_SYSTEM_PROMPT) < service.cache_min_tokens
+    assert marked(service._build_system_prompt()) == []
+    assert marked(service._build_system_prompt(SHORT_CONTEXT)) == []
+
+
+def test_checkpoint_on_context_once_prefix_is_long_enough(service):
+    system = service._build_system_prompt(LONG_CONTEXT, 'We covered sensors.')
+    assert [block['text'] for block in system][0] == VERON_SYSTEM_PROMPT
+    assert marked(system) == [system[1]]
+    assert 'cache_control' not in system[2]
+
+
+def test_minimum_is_configurable(service):
+    service.cache_min_tokens = 1
+    system = service._build_system_prompt(SHORT_CONTEXT, 'We covered sensors.')
+    assert marked(system) == system[:2]
+
+
+def test_caching_disabled_returns_plain_text(monkeypatch):
+    monkeypatch.setenv('BEDROCK_PROMPT_CACHING', 'false')
+    system = BedrockService(client=object())._build_system_prompt(LONG_CONTEXT)
+    assert isinstance(system, str)
+    assert system.startswith(VERON_SYSTEM_PROMPT)
+
+
+def test_emulator_ignores_checkpoints_below_minimum():
+    cache = PromptCache(min_tokens=1024)
+    body = request_body([{'type': 'text', 'text': VERON_SYSTEM_PROMPT, 'cache_control': {'type': 'ephemeral'}}])
+    total = sum(cache.account(body))
+    assert cache.account(body) == (total, 0, 0)
+    assert cache.account(body) == (total, 0, 0)
+
+
+def test_emulator_writes_then_reads_long_prefix(service):
+    cache = PromptCache(min_tokens=service.cache_min_tokens)
+    system = service._build_system_prompt(LONG_CONTEXT)
+    prefix = count_tokens(system[0]['text']) + count_tokens(system[1]['text'])
+
+    uncached, written, read = cache.account(request_body(system))
+    assert (written, read) == (prefix, 0)
+    assert uncached == count_tokens('What is a transistor?')
+
+    uncached, written, read = cache.account(request_body(system, 'And a diode?'))
+    assert (written, read) == (0, prefix)
+    assert uncached == count_tokens('And a diode?')
+
+
+def test_emulator_cache_expires(service):
+    cache = PromptCache(ttl_seconds=0, min_tokens=service.cache_min_tokens)
+    body = request_body(service._build_system_prompt(LONG_CONTEXT))
+    _, written, _ = cache.account(body)
+    assert cache.account(body)[1:] == (written, 0)
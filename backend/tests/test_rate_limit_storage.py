@@ -0,0 +1,39 @@
+import sqlite3
+
+from middleware.rate_limit_storage import SQLiteStorage
+
+
+def storage(path, **options):
+    return SQLiteStorage(f'sqlite:///{path}', **options)
+
+
+def test_purge_keeps_longer_windows_of_other_workers(tmp_path):
+    path = tmp_path / 'rl.db'
+    hourly, default = storage(path, purge_every=1), storage(path, purge_every=1)
+    assert hourly.acquire_entry('security', 1, 3600)
+    # 20 minutes old: outside a 15 minute window, still inside the hourly one
+    hourly._connection().execute('UPDATE window_entries SET ts = ts - 1200, expires_at = expires_at - 1200')
+
+    assert default.acquire_entry('chat', 100, 900)
+    assert hourly.get_moving_window('security', 1, 3600)[1] == 1
+    assert not hourly.acquire_entry('security', 1, 3600)
+
+
+def test_purge_drops_expired_entries(tmp_path):
+    path = tmp_path / 'rl.db'
+    limits = storage(path, purge_every=1)
+    limits.acquire_entry('chat', 100, 900)
+    limits._connection().execute('UPDATE window_entries SET expires_at = 0')
+    limits.acquire_entry('voice', 100, 900)
+    keys = [row[0] for row in limits._connection().execute('SELECT key FROM window_entries')]
+    assert keys == ['voice']
+
+
+def test_migrates_window_entries_without_expiry(tmp_path):
+    path = tmp_path / 'rl.db'
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE window_entries (key TEXT NOT NULL, ts REAL NOT NULL)')
+    db.close()
+    limits = storage(path)
+    assert limits.acquire_entry('chat', 1, 60)
+    assert not limits.acquire_entry('chat', 1, 60)
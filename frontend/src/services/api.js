@@ -33,18 +33,18 @@ api.interceptors.response.use(
 );
 
 export const chatAPI = {
-  sendMessage: async (message, conversationHistory = [], context = '') => {
+  sendMessage: async (message, conversationId = null, context = '') => {
     try {
       const response = await api.post('/api/chat/message', {
         message,
-        conversationHistory: conversationHistory.slice(-10),
-        context,
-        timestamp: new Date().toISOString()
+        conversationId,
+        context
       });
       
       if (response.data.success) {
         return {
           text: response.data.data.message,
+          conversationId: response.data.data.conversationId,
           timestamp: response.data.data.timestamp,
           usage: response.data.data.usage
         };
@@ -52,6 +52,10 @@ export const chatAPI = {
         throw new Error(response.data.error || 'Failed to send message');
       }
     } catch (error) {
+      // The server-side conversation expired: start a new one
+      if (error.response?.status === 404 && conversationId) {
+        return chatAPI.sendMessage(message, null, context);
+      }
       console.error('Chat API error:', error);
       if (error.response?.data?.error) {
         throw new Error(error.response.data.error);
@@ -206,7 +210,7 @@ export const agentAPI = {
           message: response.data.data.message,
           sessionId: response.data.data.session_id,
           timestamp: response.data.data.timestamp,
-          traceInfo: response.data.data.trace_info
+          traceCaptured: response.data.data.trace_captured
         };
       } else {
         throw new Error(response.data.error || 'Failed to send message to agent');
@@ -260,6 +264,24 @@ export const agentAPI = {
     }
   },
 
+  getSessionTraces: async (sessionId) => {
+    try {
+      const response = await api.get(`/api/agent/session/${sessionId}/traces`);
+      
+      if (response.data.success) {
+        return response.data.data;
+      } else {
+        throw new Error(response.data.error || 'Failed to get session traces');
+      }
+    } catch (error) {
+      console.error('Get session traces error:', error);
+      if (error.response?.data?.error) {
+        throw new Error(error.response.data.error);
+      }
+      throw new Error('Failed to get session traces');
+    }
+  },
+
   listActiveSessions: async () => {
     try {
       const response = await api.get('/api/agent/sessions');